@@ -1,11 +1,12 @@
 import os
 import pandas as pd
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, has_request_context
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, has_request_context, Response, stream_with_context
 import plotly.graph_objects as go
 import plotly.express as px
 from plotly.subplots import make_subplots
 import json
 import traceback
+import uuid
 from werkzeug.utils import secure_filename
 from datetime import datetime
 from flask_babel import Babel, _, lazy_gettext as _l, get_locale as get_current_locale
@@ -30,6 +31,9 @@ from data_processing import (
     _get_missing_ranges,
     gaps_time_series_viz,
     generate_plot_stats_over_period_plotly,
+    plot_columns,
+    set_station_column,
+    concat_station_frames,
 )
 
 # Importations de la configuration
@@ -37,7 +41,10 @@ from config import METADATA_VARIABLES, PALETTE_DEFAUT, DATA_LIMITS, ALLOWED_EXTE
 
 # Importations de la base de données
 from db import (
-    initialize_database, save_to_database, get_connection,get_stations_with_data)
+    initialize_database, save_to_database, get_connection,get_stations_with_data, db_connection,
+    reset_processed_data, save_station_outputs_concurrently, find_ingested_file, CATALOG_PROCESSING_TYPES)
+from pipeline import ingest_uploaded_files, process_stations, file_sha256
+from jobs import submit_job, get_job
    # get_stations_list, get_station_data, delete_station_data, reset_processed_data)
 
 from dotenv import load_dotenv
@@ -808,6 +815,8 @@ def upload_file():
 
     # 'processing_type' est déjà la clé courte que get_connection attend !
     processing_type = request.form.get('processing_type', 'raw') # Cette variable est parfaite !
+    # Fichier corrigé: les lignes existantes dont une valeur a changé sont mises à jour
+    ingest_method = 'merge' if request.form.get('update_existing') else 'copy'
 
     # Vérifiez que processing_type est une clé valide avant de l'utiliser
     # (Optional, but good for robustness)
@@ -821,97 +830,76 @@ def upload_file():
     # NOUVELLE LIGNE: Passez directement processing_type qui est la clé courte
     db_key_for_connection = processing_type # <--- C'EST LA CORRECTION ICI
 
-    conn = None
-    successfully_processed_and_uploaded_stations = [] 
-
-    try:
-        # Utilisez la clé courte db_key_for_connection ici
-        conn = get_connection(db_key_for_connection) # <--- UTILISEZ LA CLÉ COURTE
-        if not conn:
-            flash(_(f'Erreur: Impossible de se connecter à la base de données {db_key_for_connection}'), 'error')
-            return redirect(url_for('index'))
-
-        for file, station in zip(uploaded_files, stations):
-            if not file or file.filename == '':
-                flash(_("Fichier vide reçu."), 'error')
-                continue
-
-            if not allowed_file(file.filename):
-                flash(_("Type de fichier non autorisé pour '%s'.") % file.filename, 'error')
-                continue
-
-            temp_path = None
-            df = None 
-            try:
-                filename = secure_filename(file.filename)
-                temp_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                file.save(temp_path)
-                app.logger.info(f"Fichier {filename} sauvegardé temporairement")
-
-                file_extension = filename.lower().rsplit('.', 1)[1]
-                
-                skip_rows_count = 1 if station == 'Ouriyori 1' else 0
-
-                if file_extension == 'csv':
-                    df = pd.read_csv(temp_path, encoding_errors='replace', low_memory=False, skiprows=skip_rows_count)
-                elif file_extension == 'xlsx':
-                    df = pd.read_excel(temp_path, skiprows=skip_rows_count)
-                else:
-                    flash(_("Type de fichier non supporté pour '%s'.") % filename, 'error')
-                    os.unlink(temp_path)
-                    continue 
-                
-                if df is None or df.empty:
-                    flash(_("Le fichier '%s' est vide, corrompu ou d'un type non supporté.") % filename, 'error')
-                    os.unlink(temp_path)
-                    continue 
-
-                df = apply_station_specific_preprocessing(df, station)
+    files_to_ingest = []
+
+    # Les fichiers sont d'abord enregistrés sous un nom unique, puis ingérés par un job en arrière-plan
+    for file, station in zip(uploaded_files, stations):
+        if not file or file.filename == '':
+            flash(_("Fichier vide reçu."), 'error')
+            continue
+
+        if not allowed_file(file.filename):
+            flash(_("Type de fichier non autorisé pour '%s'.") % file.filename, 'error')
+            continue
+
+        filename = secure_filename(file.filename)
+        file_extension = filename.lower().rsplit('.', 1)[1]
+        if file_extension not in ('csv', 'xlsx'):
+            flash(_("Type de fichier non supporté pour '%s'.") % filename, 'error')
+            continue
+
+        temp_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{uuid.uuid4().hex[:8]}_{filename}")
+        file.save(temp_path)
+        app.logger.info(f"Fichier {filename} sauvegardé temporairement")
+        files_to_ingest.append((temp_path, filename, station))
+
+    # Empreinte du contenu: un fichier identique à un fichier déjà ingéré pour la station est ignoré
+    file_hashes = {}
+    if processing_type in CATALOG_PROCESSING_TYPES and files_to_ingest:
+        file_hashes = {temp_path: file_sha256(temp_path) for temp_path, _filename, _station in files_to_ingest}
+        try:
+            with db_connection(processing_type) as conn:
+                conn.autocommit = True
+                already_ingested = {temp_path: find_ingested_file(conn, station, file_hashes[temp_path])
+                                    for temp_path, _filename, station in files_to_ingest}
+        except Exception as e:
+            app.logger.warning(f"Registre des fichiers ingérés indisponible: {e}")
+            already_ingested = {}
+
+        for temp_path, filename, station in list(files_to_ingest):
+            previous = already_ingested.get(temp_path)
+            if previous:
+                flash(_("Le fichier '%s' a déjà été importé pour %s le %s (%d lignes): ignoré.") % (
+                    filename, station, previous['ingested_at'].strftime('%d/%m/%Y %H:%M'), previous['rows_read']), 'info')
+                files_to_ingest.remove((temp_path, filename, station))
+                os.unlink(temp_path)
+
+    if not files_to_ingest:
+        return redirect(url_for('index'))
 
-                if df.empty:
-                    flash(_("Après prétraitement, le DataFrame pour '%s' est vide. Aucune donnée à sauvegarder.") % station, 'warning')
+    def run_upload_job(progress):
+        try:
+            with app.app_context():
+                print(f"\n--- Ingestion parallèle de {len(files_to_ingest)} fichiers ---")
+                report = ingest_uploaded_files(files_to_ingest, processing_type, method=ingest_method,
+                                               progress=progress.update, file_hashes=file_hashes)
+                return {**report, 'method': ingest_method}
+        finally:
+            for temp_path, _filename, _station in files_to_ingest:
+                if os.path.exists(temp_path):
                     os.unlink(temp_path)
-                    continue
-
-                app.logger.info(f"Colonnes avant sauvegarde pour {station}: {df.columns.tolist()}")
-                app.logger.info(f"Premières lignes:\n{df.head(2).to_string()}")
 
-                print(f"\n--- Traitement de la station : {station} ({len(df)} lignes à insérer) ---")
-                
-                try:
-                    success = save_to_database(df, station, conn, processing_type)
-                    if success:
-                        flash(_("Données pour %s sauvegardées avec succès!") % station, 'success')
-                        successfully_processed_and_uploaded_stations.append(station) 
-                        app.logger.info(f"DEBUG: Station '{station}' ajoutée à successfully_processed_and_uploaded_stations. Liste actuelle: {successfully_processed_and_uploaded_stations}")
-
-                    else:
-                        flash(_("Échec  de sauvegarde pour %s") % station, 'warning')
-                        app.logger.warning(f"DEBUG: save_to_database pour '{station}' a renvoyé False.")
-
-                except Exception as e:
-                    app.logger.error(f"Erreur sauvegarde {station}: {str(e)}", exc_info=True)
-                    flash(_("Erreur base de données pour %s: %s") % (station, str(e)), 'error')
-
-            except Exception as e:
-                app.logger.error(f"Erreur lecture fichier {filename}: {str(e)}", exc_info=True)
-                flash(_("Erreur de lecture du fichier '%s': %s") % (filename, str(e)), 'error')
-            finally:
-                if temp_path and os.path.exists(temp_path):
-                    os.unlink(temp_path)
-        
+    try:
+        job_id = submit_job('upload', run_upload_job, list(dict.fromkeys(station for _p, _f, station in files_to_ingest)))
     except Exception as e:
+        for temp_path, _filename, _station in files_to_ingest:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
         flash(_(f'Une erreur inattendue est survenue lors du traitement global: {str(e)}'), 'error')
         traceback.print_exc()
-    finally:
-        if conn:
-            conn.close()
-            app.logger.info("Connexion à la base de données fermée après traitement de toutes les stations.")
-            app.logger.info(f"DEBUG: Contenu final de successfully_processed_and_uploaded_stations avant session: {successfully_processed_and_uploaded_stations}")
-            session['recently_uploaded_stations'] = list(set(successfully_processed_and_uploaded_stations))
-            app.logger.info(f"DEBUG: Contenu de 'recently_uploaded_stations' dans la session: {session.get('recently_uploaded_stations')}")
+        return redirect(url_for('index'))
 
-    return redirect(url_for('select_stations'))
+    return redirect(url_for('job_progress_page', job_id=job_id))
 
 # from  db  import load_raw_station_data
 # @app.route('/process_selected_data', methods=['POST'])
@@ -1748,7 +1736,7 @@ import warnings
 
 ##################### Dimanche 27 Juillet 2025 #####################
 
-from db import get_station_columns, load_station_data
+from db import get_station_columns, load_station_data, get_station_variables, iter_station_data_chunks, load_missing_ranges
 
 # Variable GLOBALE pour stocker les stations traitées avec succès pour les analyses ultérieures
 # IMPORTANT : Dans Flask, pour les variables globales qui doivent persister à travers les requêtes
@@ -1803,107 +1791,118 @@ def process_selected_stations():
         flash(_('Aucune station sélectionnée pour le traitement.'), 'danger')
         return redirect(url_for('select_stations'))
 
-    # Réinitialiser la variable globale pour cette nouvelle exécution
-    app.config['PROCESSED_STATIONS_FOR_VIZ_GLOBAL'] = []
-    processed_stations_successful_current_run = [] # Liste pour contenir les noms des stations traitées avec succès pour cette exécution
+    df_gps = GLOBAL_GPS_DATA_DF # Utiliser les données GPS globales
+    if df_gps.empty:
+        flash(_("Erreur: Impossible de charger les données GPS des stations. Le traitement ne peut pas continuer."), 'danger')
+        return redirect(url_for('select_stations'))
 
-    # Initialiser les connexions à None en dehors de la boucle
-    conn_before = None
-    conn_after = None
-    conn_missing_before = None
-    conn_missing_after = None
+    def run_processing_job(progress):
+        # Interpolation et écritures hors de la requête HTTP, une station par processus
+        with app.app_context():
+            results = process_stations(selected_stations, df_gps, progress=progress.update)
+        return {'stations': results,
+                'processed': [r['station'] for r in results if r['status'] in ('success', 'partial')]}
 
     try:
-        df_gps = GLOBAL_GPS_DATA_DF # Utiliser les données GPS globales
-        if df_gps.empty:
-            flash(_("Erreur: Impossible de charger les données GPS des stations. Le traitement ne peut pas continuer."), 'danger')
-            return redirect(url_for('select_stations'))
+        job_id = submit_job('processing', run_processing_job, selected_stations)
+    except Exception as e:
+        logging.error(f"Impossible de lancer le traitement en arrière-plan: {e}", exc_info=True)
+        flash(_('Une erreur inattendue est survenue lors de la préparation du traitement: %s') % str(e), 'danger')
+        return redirect(url_for('select_stations'))
 
-        conn_before = get_connection('before')  
-        conn_after = get_connection('after')
-        conn_missing_before = get_connection('missing_before')
-        conn_missing_after = get_connection('missing_after')
+    return redirect(url_for('job_progress_page', job_id=job_id))
 
-        if not conn_before or  not conn_after or not conn_missing_before or not conn_missing_after:
-            flash(_(f'Erreur: Impossible d\'établir toutes les connexions aux bases de données nécessaires.'), 'danger')
-            return redirect(url_for('select_stations'))
 
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """État JSON d'un job: statut global, avancement et étape par station, erreurs."""
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'error': _('Job introuvable.')}), 404
+    return jsonify(job)
 
-        for station_name in selected_stations:
-            logging.info(f"Début du traitement pour la station: {station_name}")
-            try:
-                # Utiliser load_station_data pour charger les données brutes
-                df_raw = load_station_data(station_name, processing_type='raw')
-                if df_raw.empty:
-                    flash(_('Aucune donnée brute trouvée pour la station %s.') % station_name, 'warning')
-                    continue
-
-                if 'Station' not in df_raw.columns:
-                    df_raw['Station'] = station_name
-                # S'assurer que Datetime est l'index pour la fonction d'interpolation
-                if not isinstance(df_raw.index, pd.DatetimeIndex):
-                    if 'Datetime' in df_raw.columns:
-                        df_raw = df_raw.set_index('Datetime')
-                    else:
-                        raise ValueError(f"Colonne 'Datetime' manquante pour la station {station_name}")
 
+@app.route('/jobs/<job_id>/suivi')
+def job_progress_page(job_id):
+    """Page de suivi d'un job; l'état est interrogé périodiquement sur /jobs/<job_id>."""
+    job = get_job(job_id)
+    if job is None:
+        flash(_('Job introuvable.'), 'error')
+        return redirect(url_for('index'))
+    return render_template('job_progress.html', job=job)
 
-                df_before_interp_temp, df_after_interp_temp, missing_before_temp, missing_after_temp = \
-                    interpolation(df_raw, DATA_LIMITS, df_gps)
 
-                if df_after_interp_temp.empty:
-                    flash(_('Le pipeline d\'interpolation n\'a retourné aucune donnée pour la station %s.') % station_name, 'warning')
-                    continue
-                
-                save_before_processing_success = save_to_database(df_before_interp_temp, station_name, conn_before, processing_type='before')
-                save_main_data_success = save_to_database(df_after_interp_temp, station_name, conn_after, processing_type='after')
-                save_missing_before_success = save_to_database(missing_before_temp, station_name, conn_missing_before, processing_type='missing_before')
-                save_missing_after_success = save_to_database(missing_after_temp, station_name, conn_missing_after, processing_type='missing_after')
-
-                if save_before_processing_success and save_main_data_success and save_missing_before_success and save_missing_after_success:
-                    flash(_('Traitement et sauvegarde réussis pour la station %s, y compris les données manquantes.') % station_name, 'success')
-                    processed_stations_successful_current_run.append(station_name) # Ajouter à la liste des stations réussies de cette exécution
-                elif save_main_data_success: # Les données principales ont été sauvegardées, mais les données manquantes ont pu échouer
-                    flash(_('Traitement réussi pour la station %s, mais certaines données manquantes n\'ont pas pu être sauvegardées.') % station_name, 'warning')
-                    processed_stations_successful_current_run.append(station_name) # Considérer le succès partiel comme "suffisamment réussi" pour la viz
+@app.route('/jobs/<job_id>/terminer')
+def finish_job(job_id):
+    """Reporte le résultat d'un job terminé (messages, stations traitées) puis redirige vers l'étape suivante."""
+    job = get_job(job_id)
+    if job is None:
+        flash(_('Job introuvable.'), 'error')
+        return redirect(url_for('index'))
+    if not job['done']:
+        return redirect(url_for('job_progress_page', job_id=job_id))
+    if job['status'] != 'succeeded':
+        flash(_("Le traitement en arrière-plan a échoué: %s") % (job['error'] or job['status']), 'danger')
+
+    result = job['result'] or {}
+    if job['kind'] == 'upload':
+        successfully_processed_and_uploaded_stations = []
+        for file_result in result.get('files', []):
+            station, filename = file_result['station'], file_result['filename']
+            if file_result['error']:
+                flash(_("Erreur base de données pour %s: %s") % (station, file_result['error']), 'error')
+            elif file_result['rows_read'] == 0:
+                flash(_("Le fichier '%s' est vide, corrompu ou d'un type non supporté.") % filename, 'error')
+            elif file_result.get('rows_covered') and file_result['rows_saved'] == 0 and file_result['success']:
+                flash(_("Le fichier '%s' ne contient que des mesures déjà importées pour %s (%d lignes): rien à écrire.") % (
+                    filename, station, file_result['rows_covered']), 'info')
+            elif file_result['rows_saved'] == 0 and file_result['success']:
+                flash(_("Après prétraitement, le DataFrame pour '%s' est vide. Aucune donnée à sauvegarder.") % station, 'warning')
+            elif file_result['success']:
+                if result.get('method') == 'merge':
+                    flash(_("Données pour %s fusionnées: %d insérées, %d mises à jour, %d inchangées.") % (
+                        station, file_result['rows_inserted'], file_result['rows_updated'], file_result['rows_unchanged']), 'success')
                 else:
-                    flash(_('Échec de la sauvegarde pour la station %s. Voir les logs du serveur pour plus de détails.') % station_name, 'danger')
-
-                logging.info(f"Plages manquantes AVANT interpolation pour {station_name}:\n{missing_before_temp.to_string()}")
-                logging.info(f"Plages manquantes APRÈS interpolation pour {station_name}:\n{missing_after_temp.to_string()}")
-
-            except Exception as e:
-                logging.error(f"Erreur lors du traitement de la station {station_name}: {e}", exc_info=True)
-                flash(_('Erreur lors du traitement de la station %s: %s') % (station_name, str(e)), 'danger')
-
-    except Exception as e:
-        logging.error(f"Erreur générale lors du chargement des données GPS ou de l'initialisation: {e}", exc_info=True)
-        flash(_('Une erreur inattendue est survenue lors de la préparation du traitement: %s') % str(e), 'danger')
+                    flash(_("Données pour %s sauvegardées avec succès! (%d lignes lues, %d insérées, %.1f s)") % (
+                        station, file_result['rows_read'], file_result['rows_inserted'], file_result['elapsed_seconds']), 'success')
+                if file_result.get('rows_overlapping'):
+                    if result.get('method') == 'merge':
+                        flash(_("%s: %d lignes déjà présentes en base, dont %d avec des valeurs modifiées.") % (
+                            filename, file_result['rows_overlapping'], file_result['rows_conflicting']), 'info')
+                    elif file_result.get('rows_conflicting'):
+                        flash(_("%s: %d lignes déjà présentes en base, dont %d avec des valeurs différentes non mises à jour. "
+                                "Cochez « Mettre à jour les mesures existantes » pour les remplacer.") % (
+                            filename, file_result['rows_overlapping'], file_result['rows_conflicting']), 'warning')
+                    else:
+                        flash(_("%s: %d lignes déjà présentes en base et identiques, ignorées.") % (
+                            filename, file_result['rows_overlapping']), 'info')
+                if file_result.get('rows_covered'):
+                    flash(_("%s: %d lignes déjà couvertes par un fichier importé précédemment, non réécrites.") % (
+                        filename, file_result['rows_covered']), 'info')
+                successfully_processed_and_uploaded_stations.append(station)
+            else:
+                flash(_("Échec  de sauvegarde pour %s") % station, 'warning')
+        session['recently_uploaded_stations'] = list(set(successfully_processed_and_uploaded_stations))
+        return redirect(url_for('select_stations'))
 
-    finally:
-        if conn_before:
-            conn_before.close()
-            app.logger.info("Connexion 'before_processing_db' à la base de données fermée.")
-        # Fermer toutes les connexions qui ont été ouvertes
-        if conn_after:
-            conn_after.close()
-            app.logger.info("Connexion 'after_processing_db' à la base de données fermée.")
-        if conn_missing_before:
-            conn_missing_before.close()
-            app.logger.info("Connexion 'missing_ranges_before_db' à la base de données fermée.")
-        if conn_missing_after:
-            conn_missing_after.close()
-            app.logger.info("Connexion 'missing_ranges_after_db' à la base de données fermée.")
+    for station_result in result.get('stations', []):
+        station_name = station_result['station']
+        if station_result.get('mode') == 'up_to_date':
+            flash(_('Aucune nouvelle donnée pour la station %s depuis le dernier traitement: résultats inchangés.') % station_name, 'info')
+        elif station_result['status'] == 'success':
+            flash(_('Traitement et sauvegarde réussis pour la station %s, y compris les données manquantes.') % station_name, 'success')
+        elif station_result['status'] == 'partial':
+            flash(_('Traitement réussi pour la station %s, mais certaines données manquantes n\'ont pas pu être sauvegardées.') % station_name, 'warning')
+        elif station_result['status'] == 'empty':
+            flash(_('Aucune donnée pour la station %s: %s') % (station_name, station_result['message']), 'warning')
+        else:
+            flash(_('Erreur lors du traitement de la station %s: %s') % (station_name, station_result['message']), 'danger')
 
     # Mettre à jour la variable globale avec la liste des stations traitées avec succès
-    app.config['PROCESSED_STATIONS_FOR_VIZ_GLOBAL'] = processed_stations_successful_current_run
-
-    if not processed_stations_successful_current_run:
-            flash(_("Aucune station n'a été traitée avec succès pour la visualisation."), 'warning')
-            # If no stations were processed, redirect to select_stations or a summary page without viz
-            return redirect(url_for('select_stations')) # Or a more generic summary page
-
-    # Rediriger directement vers la page de visualisation
+    app.config['PROCESSED_STATIONS_FOR_VIZ_GLOBAL'] = result.get('processed', [])
+    if not app.config['PROCESSED_STATIONS_FOR_VIZ_GLOBAL']:
+        flash(_("Aucune station n'a été traitée avec succès pour la visualisation."), 'warning')
+        return redirect(url_for('select_stations'))
     return redirect(url_for('visualiser_resultats_pretraitement'))
 
 
@@ -3091,15 +3090,10 @@ def visualiser_resultats_pretraitement():
         flash(_l("La station sélectionnée n'a pas été traitée ou n'est pas disponible."), 'warning')
         return redirect(url_for('visualiser_resultats_pretraitement', station=processed_stations[0]))
 
-    df_before = load_station_data(station_selected, processing_type='before')
-    df_after = load_station_data(station_selected, processing_type='after')
-    if df_before.empty or df_after.empty:
-        flash(_l("Impossible de charger les données 'avant' ou 'après' pour la station %s.") % station_selected, 'danger')
-        return redirect(url_for('select_stations'))
-
+    # Variables proposées d'après le schéma de la table, sans lire les données
     available_variables = [
-        col for col in df_after.columns
-        if pd.api.types.is_numeric_dtype(df_after[col]) and col not in EXCLUDED_VARIABLES
+        col for col in get_station_variables(station_selected, 'after')
+        if col not in EXCLUDED_VARIABLES
     ]
     available_variables.sort()
 
@@ -3112,6 +3106,14 @@ def visualiser_resultats_pretraitement():
     if not variable_selected and available_variables:
         variable_selected = available_variables[0]
 
+    # Seule la variable affichée est lue en base (index Datetime inclus)
+    variable_columns = [variable_selected] if variable_selected else []
+    df_before = load_station_data(station_selected, processing_type='before', columns=variable_columns)
+    df_after = load_station_data(station_selected, processing_type='after', columns=variable_columns)
+    if df_before.empty or df_after.empty:
+        flash(_l("Impossible de charger les données 'avant' ou 'après' pour la station %s.") % station_selected, 'danger')
+        return redirect(url_for('select_stations'))
+
     missing_data_plot_html = None
     outliers_plot_html = None
     missing_ranges_plot_html = None
@@ -3190,17 +3192,12 @@ def visualiser_resultats_pretraitement():
                     f"Les graphiques des données manquantes et des outliers ne sont pas disponibles pour '{get_var_label(METADATA_VARIABLES, variable_selected)}' en raison de données manquantes dans le dataset source ou traité."
                 ), 'info')
 
-            df_missing_ranges_before_full = load_station_data(station_selected, 'missing_before')
-            df_missing_ranges_after_full = load_station_data(station_selected, 'missing_after')
+            # Filtrage station/variable fait en SQL sur la table consolidée (index station, variable, start_time)
+            df_missing_ranges_before = load_missing_ranges('missing_before', station=station_selected, variables=[variable_selected])
+            df_missing_ranges_after = load_missing_ranges('missing_after', station=station_selected, variables=[variable_selected])
             missing_ranges_fig = visualize_missing_ranges(
-                df_missing_ranges_before_full[
-                    (df_missing_ranges_before_full['station'] == station_selected) &
-                    (df_missing_ranges_before_full['variable'] == variable_selected)
-                ],
-                df_missing_ranges_after_full[
-                    (df_missing_ranges_after_full['station'] == station_selected) &
-                    (df_missing_ranges_after_full['variable'] == variable_selected)
-                ],
+                df_missing_ranges_before,
+                df_missing_ranges_after,
                 station_selected,
                 variable_selected
             )
@@ -3211,8 +3208,10 @@ def visualiser_resultats_pretraitement():
             )
 
             # --- Bloc du tableau corrigé pour éviter le problème de lazy string sur l'index name ---
-            if not df_after.empty:
-                df_to_display = df_after.head(20).copy()
+            # Aperçu tabulaire: 20 premières lignes, toutes colonnes, limitées côté SQL
+            df_after_head = load_station_data(station_selected, processing_type='after', limit=20)
+            if not df_after_head.empty:
+                df_to_display = df_after_head.copy()
 
                 # Gérer la colonne Datetime selon index ou colonnes
                 if isinstance(df_to_display.index, pd.DatetimeIndex):
@@ -3222,9 +3221,9 @@ def visualiser_resultats_pretraitement():
                 if 'Datetime' in df_to_display.columns:
                     datetime_series = pd.to_datetime(df_to_display['Datetime'])
 
-                    if all(col in df_after.columns for col in ['Year', 'Month', 'Day', 'Hour', 'Minute']):
+                    if all(col in df_after_head.columns for col in ['Year', 'Month', 'Day', 'Hour', 'Minute']):
                         df_to_display['Datetime'] = datetime_series.dt.strftime('%Y-%m-%d %H:%M')
-                    elif 'Date' in df_after.columns:
+                    elif 'Date' in df_after_head.columns:
                         df_to_display['Datetime'] = datetime_series.dt.strftime('%Y-%m-%d')
                     else:
                         df_to_display['Datetime'] = datetime_series.dt.strftime('%Y-%m-%d %H:%M:%S')
@@ -3299,31 +3298,41 @@ from io import BytesIO
 
 @app.route('/download_csv')
 def download_csv():
-    """Permet de télécharger les données interpolées au format CSV, sans colonnes inutiles."""
+    """
+    Télécharge les données interpolées au format CSV, sans colonnes inutiles.
+    Les données sont lues par blocs (curseur serveur) et envoyées au fil de l'eau:
+    la mémoire utilisée ne dépend pas de la taille des tables exportées.
+    """
     processed_stations = app.config.get('PROCESSED_STATIONS_FOR_VIZ_GLOBAL', [])
+    station_arg = request.args.get('station')
+    stations_to_export = [station_arg] if station_arg else processed_stations
 
-    if GLOBAL_PROCESSED_DATA_DF.empty:
+    if not stations_to_export:
         flash(_('Aucune donnée disponible pour le téléchargement.'), 'error')
-        return redirect(url_for('data_preview'))
+        return redirect(url_for('index'))
 
-    try:
-        excluded_columns = ['sunset_time_utc', 'Is_Daylight', 'Daylight_Duration', 'sunrise_time_utc']
-        filtered_df = GLOBAL_PROCESSED_DATA_DF.drop(columns=[col for col in excluded_columns if col in GLOBAL_PROCESSED_DATA_DF.columns])
+    excluded_columns = ['sunset_time_utc', 'Is_Daylight', 'Daylight_Duration', 'sunrise_time_utc']
 
-        output = BytesIO()
-        filtered_df.to_csv(output, index=False)
-        output.seek(0)
+    def generate_csv():
+        header_written = False
+        for station in stations_to_export:
+            export_columns = [col for col in get_station_columns(station, 'after') if col not in excluded_columns]
+            try:
+                for chunk in iter_station_data_chunks(station, 'after', columns=export_columns):
+                    chunk = chunk.reset_index()
+                    chunk.insert(0, 'Station', station)
+                    yield chunk.to_csv(index=False, header=not header_written)
+                    header_written = True
+            except Exception as e:
+                # Les en-têtes HTTP sont déjà partis: on journalise et on passe à la station suivante
+                app.logger.error(f'Erreur CSV pour {station} : {str(e)}', exc_info=True)
 
-        return send_file(
-            output,
-            mimetype='text/csv',
-            download_name='donnees_interpolees.csv',
-            as_attachment=True
-        )
-    except Exception as e:
-        app.logger.error(f'Erreur CSV : {str(e)}')
-        flash(_('Erreur lors du téléchargement CSV : %s') % str(e), 'error')
-        return redirect(url_for('data_preview'))
+    download_name = f"donnees_interpolees_{secure_filename(station_arg)}.csv" if station_arg else 'donnees_interpolees.csv'
+    return Response(
+        stream_with_context(generate_csv()),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename="{download_name}"'}
+    )
 
 
 @app.route('/download_excel')
@@ -3953,24 +3962,20 @@ def visualisations_options():
         return redirect(url_for('select_stations'))
     
     station_selected_for_sample = processed_stations[0]
-    df_sample = load_station_data(station_selected_for_sample, processing_type='after')
+    # Une seule ligne suffit pour vérifier que la station a des données traitées
+    df_sample = load_station_data(station_selected_for_sample, processing_type='after', limit=1)
     
     if df_sample.empty:
         flash(_('Impossible de charger les données traitées pour la visualisation.'), 'error')
         return redirect(url_for('index'))
 
-    if 'Station' not in df_sample.columns:
-        if 'Station' in df_sample.index.names:
-            df_sample = df_sample.reset_index(level='Station')
-        else:
-            df_sample['Station'] = station_selected_for_sample
-    
     excluded_cols = {'Station', 'Is_Daylight', 'Daylight_Duration',
                      'Year', 'Month', 'Day', 'Hour', 'Minute', 'Date', 'Rain_01_mm', 'Rain_02_mm'}
 
+    # Variables numériques connues par le schéma de la station
     available_vars = [
-        col for col in df_sample.columns
-        if col not in excluded_cols and pd.api.types.is_numeric_dtype(df_sample[col])
+        col for col in get_station_variables(station_selected_for_sample, 'after')
+        if col not in excluded_cols
     ]
 
     # daily_stats_df = calculate_daily_summary_table(df_sample)
@@ -4008,24 +4013,21 @@ def statistiques():
             return redirect(url_for('visualisations_options'))
         
         # Charger et ajouter la colonne 'Station' à chaque DF avant de les concaténer
+        columns = plot_columns(generate_plot_stats_over_period_plotly, [variable])
         all_processed_dfs = []
         for station in processed_stations:
-            df = load_station_data(station, processing_type='after')
+            df = load_station_data(station, processing_type='after', columns=columns)
             if not df.empty:
-                if 'Station' not in df.columns:
-                    df['Station'] = station
-                all_processed_dfs.append(df)
-        df_processed_full = pd.concat(all_processed_dfs, ignore_index=False)
+                all_processed_dfs.append(set_station_column(df, station))
+        df_processed_full = concat_station_frames(all_processed_dfs, label=f"statistiques {variable} (after)")
         
         all_before_dfs = []
         try:
             for station in processed_stations:
-                df = load_station_data(station, processing_type='before')
+                df = load_station_data(station, processing_type='before', columns=columns)
                 if not df.empty:
-                    if 'Station' not in df.columns:
-                        df['Station'] = station
-                    all_before_dfs.append(df)
-            df_before_interpolation_full = pd.concat(all_before_dfs, ignore_index=False)
+                    all_before_dfs.append(set_station_column(df, station))
+            df_before_interpolation_full = concat_station_frames(all_before_dfs, label=f"statistiques {variable} (before)")
         except Exception as e:
             app.logger.warning(f"Impossible de charger les données brutes pour les statistiques : {e}")
             df_before_interpolation_full = pd.DataFrame()
@@ -4201,23 +4203,20 @@ def generate_plot():
                 flash(_('Veuillez sélectionner une variable pour la comparaison.'), 'error')
                 return redirect(url_for('visualisations_options'))
             
+            columns = plot_columns(generer_graphique_comparatif, [variable])
             all_processed_dfs = []
             for station in processed_stations:
-                df = load_station_data(station, processing_type='after')
+                df = load_station_data(station, processing_type='after', columns=columns)
                 if not df.empty:
-                    if 'Station' not in df.columns:
-                        df['Station'] = station
-                    all_processed_dfs.append(df)
-            df_processed_full = pd.concat(all_processed_dfs, ignore_index=False)
+                    all_processed_dfs.append(set_station_column(df, station))
+            df_processed_full = concat_station_frames(all_processed_dfs, label=f"comparaison {variable} (after)")
             
             all_before_dfs = []
             for station in processed_stations:
-                df = load_station_data(station, processing_type='before')
+                df = load_station_data(station, processing_type='before', columns=columns)
                 if not df.empty:
-                    if 'Station' not in df.columns:
-                        df['Station'] = station
-                    all_before_dfs.append(df)
-            df_before_interpolation_full = pd.concat(all_before_dfs, ignore_index=False)
+                    all_before_dfs.append(set_station_column(df, station))
+            df_before_interpolation_full = concat_station_frames(all_before_dfs, label=f"comparaison {variable} (before)")
 
             fig = generer_graphique_comparatif(
                 df=df_processed_full,
@@ -4248,13 +4247,14 @@ def generate_plot():
                 flash(_('Veuillez sélectionner au moins une variable à visualiser.'), 'error')
                 return redirect(url_for('visualisations_options'))
 
-            df_processed_single = load_station_data(station, processing_type='after')
+            columns = plot_columns(generer_graphique_par_variable_et_periode, variables)
+            df_processed_single = load_station_data(station, processing_type='after', columns=columns)
             if not df_processed_single.empty and 'Station' not in df_processed_single.columns:
-                df_processed_single['Station'] = station
+                set_station_column(df_processed_single, station)
                 
-            df_before_interpolation_single = load_station_data(station, processing_type='before')
+            df_before_interpolation_single = load_station_data(station, processing_type='before', columns=columns)
             if not df_before_interpolation_single.empty and 'Station' not in df_before_interpolation_single.columns:
-                df_before_interpolation_single['Station'] = station
+                set_station_column(df_before_interpolation_single, station)
 
             fig = generer_graphique_par_variable_et_periode(
                 df=df_processed_single,
@@ -4301,13 +4301,13 @@ def generate_multi_variable_plot_route():
         
         translated_periode = get_period_label(periode_key)
         
-        df_processed_single = load_station_data(station, processing_type='after')
+        df_processed_single = load_station_data(station, processing_type='after', columns=variables)
         if not df_processed_single.empty and 'Station' not in df_processed_single.columns:
-            df_processed_single['Station'] = station
+            set_station_column(df_processed_single, station)
             
-        df_before_interpolation_single = load_station_data(station, processing_type='before')
+        df_before_interpolation_single = load_station_data(station, processing_type='before', columns=variables)
         if not df_before_interpolation_single.empty and 'Station' not in df_before_interpolation_single.columns:
-            df_before_interpolation_single['Station'] = station
+            set_station_column(df_before_interpolation_single, station)
 
         fig = generate_multi_variable_station_plot(
             df=df_processed_single,
@@ -5046,7 +5046,8 @@ def allowed_file(filename):
 @app.context_processor
 def inject_globals():
     return {
-        'data_available': len(get_stations_with_data('after')) > 0,
+        # Servi par le catalogue des stations (cache en mémoire), sans requête par station
+        'data_available': any(get_stations_with_data('after').values()),
         'now': datetime.now(),
         'babel_locale': str(get_current_locale()),
         'get_stations_list': get_stations_with_data
@@ -671,4 +671,100 @@ METEO_DTYPES = {
     'Wind_Dir_Deg': 'float32',    # 0-360°
     # Station (catégorielle)
     'Station': 'category'         # Optimise le stockage des noms
-}
\ No newline at end of file
+}
+
+# Profils de prétraitement des fichiers bruts, par station.
+# Chaque profil est compilé une seule fois (data_processing.get_station_profile) en une transformation
+# en un seul passage. Ajouter une station = ajouter une entrée ici.
+# Clés d'un profil:
+#   'bassin':            bassin de la station
+#   'skip_rows':         lignes à ignorer en tête de fichier avant l'en-tête
+#   'drop':              colonnes supprimées
+#   'select':            colonnes retenues avant renommage (les absentes sont créées vides)
+#   'rename':            renommage {colonne source: colonne finale}
+#   'columns':           colonnes finales après renommage (les absentes sont créées vides)
+#   'date_source':       'TIMESTAMP' pour dériver Year/Month/Day/Hour/Minute d'une colonne TIMESTAMP;
+#                        sinon Datetime est construit depuis Year..Minute, puis 'Date', puis 'TIMESTAMP'
+#   'timestamp_markers': valeurs de TIMESTAMP qui signalent une ligne d'en-tête répétée (ligne supprimée)
+_SPLIT_DATE_COLUMNS = ['Year', 'Month', 'Day', 'Hour', 'Minute']
+
+_PROFILE_SPLIT_FULL = {
+    'select': _SPLIT_DATE_COLUMNS + ['Rain_01_mm', 'Rain_02_mm', 'Air_Temp_Deg_C', 'Rel_H_%',
+                                     'Solar_R_W/m^2', 'Wind_Sp_m/sec', 'Wind_Dir_Deg'],
+}
+
+_PROFILE_SPLIT_RAIN = {
+    'select': _SPLIT_DATE_COLUMNS + ['Rain_01_mm', 'Rain_02_mm'],
+}
+
+_PROFILE_VEA_SINGLE_GAUGE = {
+    'drop': ['SlrkJ_Tot', 'WS_ms_Avg', 'WindDir', 'Rain_01_mm_Tot', 'Rain_02_mm_Tot'],
+    'rename': {'Rain_mm_Tot': 'Rain_mm', 'AirTC_Avg': 'Air_Temp_Deg_C', 'RH': 'Rel_H_Pct',
+               'SlrW_Avg': 'Solar_R_W/m^2', 'WS_ms_S_WVT': 'Wind_Sp_m/sec', 'WindDir_D1_WVT': 'Wind_Dir_Deg'},
+    'columns': ['Date', 'Rain_mm', 'Air_Temp_Deg_C', 'Rel_H_Pct', 'Solar_R_W/m^2', 'Wind_Sp_m/sec',
+                'Wind_Dir_Deg', 'BP_mbar_Avg'],
+}
+
+STATION_PROFILES = {
+    # Bassin DANO
+    'Dreyer Foundation': {'bassin': 'DANO', **_PROFILE_SPLIT_FULL},
+    'Bankandi': {'bassin': 'DANO', **_PROFILE_SPLIT_FULL},
+    'Wahablé': {'bassin': 'DANO', **_PROFILE_SPLIT_FULL},
+    'Fafo': {'bassin': 'DANO', **_PROFILE_SPLIT_FULL},
+    'Yabogane': {'bassin': 'DANO', **_PROFILE_SPLIT_FULL},
+    'Lare': {'bassin': 'DANO', **_PROFILE_SPLIT_RAIN},
+    'Tambiri 2': {'bassin': 'DANO', **_PROFILE_SPLIT_RAIN},
+    'Tambiri 1': {
+        'bassin': 'DANO',
+        'select': _SPLIT_DATE_COLUMNS + ['AirTC_Avg', 'RH', 'WS_ms_S_WVT', 'WindDir_D1_WVT', 'Rain_mm_Tot', 'BP_mbar_Avg'],
+        'rename': {'AirTC_Avg': 'Air_Temp_Deg_C', 'RH': 'Rel_H_Pct', 'WS_ms_S_WVT': 'Wind_Sp_m/sec',
+                   'WindDir_D1_WVT': 'Wind_Dir_Deg', 'Rain_mm_Tot': 'Rain_mm'},
+    },
+
+    # Bassin DASSARI
+    'Nagasséga': {'bassin': 'DASSARI', **_PROFILE_SPLIT_FULL},
+    'Koundri': {'bassin': 'DASSARI', **_PROFILE_SPLIT_FULL},
+    'Koupendri': {'bassin': 'DASSARI', **_PROFILE_SPLIT_FULL},
+    'Pouri': {'bassin': 'DASSARI', **_PROFILE_SPLIT_FULL},
+    'Fandohoun': {'bassin': 'DASSARI', **_PROFILE_SPLIT_FULL},
+    'Ouriyori 1': {
+        'bassin': 'DASSARI',
+        'skip_rows': 1,
+        'date_source': 'TIMESTAMP',
+        'timestamp_markers': ['TS', 'NaN', 'nan'],
+        'drop': ['TIMESTAMP', 'RECORD', 'WSDiag', 'Intensity_RT_Avg', 'Acc_RT_NRT_Tot', 'Pluvio_Status',
+                 'BP_mbar_Avg', 'SR01Up_Avg', 'SR01Dn_Avg', 'IR01Up_Avg', 'IR01Dn_Avg', 'NR01TC_Avg',
+                 'IR01UpCo_Avg', 'IR01DnCo_Avg', 'Acc_NRT_Tot', 'Acc_totNRT', 'Bucket_RT_Avg', 'Bucket_NRT',
+                 'Temp_load_cell_Avg', 'Heater_Status'],
+        'rename': {'Rain_mm_Tot': 'Rain_mm', 'AirTC_Avg': 'Air_Temp_Deg_C', 'RH': 'Rel_H_Pct',
+                   'SlrW_Avg': 'Solar_R_W/m^2', 'WS_ms_S_WVT': 'Wind_Sp_m/sec', 'WindDir_D1_WVT': 'Wind_Dir_Deg'},
+    },
+
+    # Bassin VEA_SISSILI
+    'Oualem': {'bassin': 'VEA_SISSILI', **_PROFILE_VEA_SINGLE_GAUGE},
+    'Nebou': {'bassin': 'VEA_SISSILI', **_PROFILE_VEA_SINGLE_GAUGE},
+    'Nabugubulle': {'bassin': 'VEA_SISSILI', **_PROFILE_VEA_SINGLE_GAUGE},
+    'Gwosi': {'bassin': 'VEA_SISSILI', **_PROFILE_VEA_SINGLE_GAUGE},
+    'Doninga': {'bassin': 'VEA_SISSILI', **_PROFILE_VEA_SINGLE_GAUGE},
+    'Bongo Soe': {'bassin': 'VEA_SISSILI', **_PROFILE_VEA_SINGLE_GAUGE},
+    'Manyoro': {
+        'bassin': 'VEA_SISSILI',
+        'drop': ['SlrkJ_Tot'],
+        'rename': {'Rain_01_mm_Tot': 'Rain_01_mm', 'Rain_02_mm_Tot': 'Rain_02_mm', 'AirTC_Avg': 'Air_Temp_Deg_C',
+                   'RH': 'Rel_H_%', 'SlrW_Avg': 'Solar_R_W/m^2', 'WS_ms_Avg': 'Wind_Sp_m/sec', 'WindDir': 'Wind_Dir_Deg'},
+        'columns': ['Date', 'Rain_01_mm', 'Rain_02_mm', 'Air_Temp_Deg_C', 'Rel_H_%', 'Solar_R_W/m^2',
+                    'Wind_Sp_m/sec', 'Wind_Dir_Deg'],
+    },
+    'Aniabisi': {
+        'bassin': 'VEA_SISSILI',
+        'drop': ['Intensity_RT_Avg', 'Acc_NRT_Tot', 'Acc_RT_NRT_Tot', 'SR01Up_Avg', 'SR01Dn_Avg', 'IR01Up_Avg',
+                 'IR01Dn_Avg', 'IR01UpCo_Avg', 'IR01DnCo_Avg'],
+        'rename': {'Rain_mm_Tot': 'Rain_mm', 'AirTC_Avg': 'Air_Temp_Deg_C', 'RH': 'Rel_H_Pct',
+                   'SlrW_Avg': 'Solar_R_W/m^2', 'WS_ms_S_WVT': 'Wind_Sp_m/sec', 'WindDir_D1_WVT': 'Wind_Dir_Deg'},
+    },
+    'Atampisi': {
+        'bassin': 'VEA_SISSILI',
+        'rename': {'Rain_01_mm_Tot': 'Rain_01_mm', 'Rain_02_mm_Tot': 'Rain_02_mm', 'AirTC_Avg': 'Air_Temp_Deg_C',
+                   'RH': 'Rel_H_Pct', 'SlrW_Avg': 'Solar_R_W/m^2', 'WS_ms_Avg': 'Wind_Sp_m/sec', 'WindDir': 'Wind_Dir_Deg'},
+    },
+}
@@ -17,14 +17,20 @@ import seaborn as sns
 import traceback
 import math
 from datetime import timedelta
-from typing import Dict
+from typing import Dict, List, NamedTuple, Optional, Tuple
 import warnings
 from plotly.subplots import make_subplots
 import plotly.express as px
 import time
-from functools import reduce
+import re
+import tempfile
+import hashlib
+import threading
+from functools import reduce, lru_cache
 from concurrent.futures import ThreadPoolExecutor
-from config import METADATA_VARIABLES, PALETTE_DEFAUT, DATA_LIMITS, PALETTE_COULEUR, PERIOD_LABELS
+import logging
+from pandas.api.types import union_categoricals
+from config import METADATA_VARIABLES, PALETTE_DEFAUT, DATA_LIMITS, PALETTE_COULEUR, PERIOD_LABELS, STATION_PROFILES, METEO_DTYPES
 
 # Importation pour Flask-Babel
 from flask_babel import lazy_gettext as _l, get_locale
@@ -983,9 +989,215 @@ def filter_colonnes(df, renamed_columns, delete_columns=None):
 ############# Fin bon code #############
 
 
+class StationProfile(NamedTuple):
+    """Profil de prétraitement compilé d'une station (voir config.STATION_PROFILES)."""
+    station: str
+    bassin: str
+    skip_rows: int
+    drop: frozenset
+    select: Optional[tuple]
+    rename: Dict[str, str]
+    columns: Optional[tuple]
+    date_source: Optional[str]
+    timestamp_markers: tuple
+
+
+def _compile_station_profile(station: str, spec: Dict) -> StationProfile:
+    """Valide une entrée de STATION_PROFILES et la fige en StationProfile."""
+    unknown_keys = set(spec) - {'bassin', 'skip_rows', 'drop', 'select', 'rename', 'columns',
+                                'date_source', 'timestamp_markers'}
+    if unknown_keys:
+        raise ValueError(f"Clés inconnues dans le profil de la station '{station}': {sorted(unknown_keys)}")
+    if spec.get('date_source') not in (None, 'TIMESTAMP'):
+        raise ValueError(f"date_source invalide pour '{station}': {spec['date_source']!r}")
+    return StationProfile(
+        station=station.strip(),
+        bassin=spec['bassin'],
+        skip_rows=int(spec.get('skip_rows', 0)),
+        drop=frozenset(spec.get('drop', ())),
+        select=tuple(spec['select']) if spec.get('select') else None,
+        rename=dict(spec.get('rename', {})),
+        columns=tuple(spec['columns']) if spec.get('columns') else None,
+        date_source=spec.get('date_source'),
+        timestamp_markers=tuple(spec.get('timestamp_markers', ())),
+    )
+
+
+# Profils compilés une seule fois au chargement du module
+STATION_PROFILE_REGISTRY = {station.strip(): _compile_station_profile(station, spec)
+                            for station, spec in STATION_PROFILES.items()}
+
+
+def get_station_profile(station: str) -> Optional[StationProfile]:
+    """Retourne le profil compilé d'une station, ou None si elle n'a pas de profil."""
+    return STATION_PROFILE_REGISTRY.get(station.strip())
+
+
+@lru_cache(maxsize=None)
+def _profile_column_conversion(col: str) -> Optional[str]:
+    """Conversion de type appliquée à une colonne prétraitée, d'après son nom (mise en cache par nom)."""
+    if any(time_part in col for time_part in _DATETIME_PARTS):
+        return 'Int64'
+    if any(metric in col for metric in ['Rain', 'Temp', 'Rel_H_Pct', 'Solar', 'Wind', 'BP_']):
+        return 'float'
+    if col in ('Date', 'TIMESTAMP'):
+        return col
+    return None
+
+
+def _convert_profile_column(col: str, series: pd.Series) -> pd.Series:
+    """Applique à une colonne la conversion de type déterminée par _profile_column_conversion."""
+    conversion = _profile_column_conversion(col)
+    if conversion == 'Int64':
+        return pd.to_numeric(series, errors='coerce').astype('Int64')
+    if conversion == 'float':
+        return pd.to_numeric(series, errors='coerce').astype(float)
+    if conversion == 'Date':
+        converted = pd.to_datetime(series, errors='coerce', format='mixed')
+        if converted.isna().any():
+            nan_count = converted.isna().sum()
+            sample_errors = series[converted.isna()].head(3).tolist()
+            warnings.warn(f"{nan_count} erreurs de conversion Date. Exemples : {sample_errors}")
+        return converted
+    if conversion == 'TIMESTAMP':
+        return pd.to_datetime(series, errors='coerce')
+    return series
+
+
+def _resolve_profile_columns(profile: StationProfile, source_columns: List[str]) -> List[Tuple[str, Optional[str]]]:
+    """
+    Calcule, à partir des seules colonnes sources, la liste ordonnée (colonne finale, colonne source)
+    produite par le profil: suppression, sélection, renommage puis projection finale.
+    Une colonne source None désigne une colonne absente, créée vide.
+    """
+    # Étapes appliquées à des paires (nom courant, source) sans toucher aux données
+    plan = [(col, col) for col in source_columns]
+    if profile.date_source == 'TIMESTAMP' and 'TIMESTAMP' in source_columns:
+        plan += [(part, f"__{part}") for part in _DATETIME_PARTS if part not in source_columns]
+    if profile.drop:
+        plan = [(name, src) for name, src in plan if name not in profile.drop]
+    if profile.select:
+        available = dict(plan)
+        plan = [(col, available.get(col)) for col in profile.select]
+    if profile.rename:
+        plan = [(profile.rename.get(name, name), src) for name, src in plan]
+    if profile.columns:
+        available = dict(plan)
+        plan = [(col, available.get(col)) for col in profile.columns]
+    return plan
+
+
+def _apply_station_profile(df: pd.DataFrame, profile: StationProfile) -> pd.DataFrame:
+    """
+    Transformation en un seul passage: chaque colonne finale est lue une fois depuis df (ou créée
+    vide), convertie, puis le DataFrame résultat est alloué en une fois avant l'ajout de Datetime.
+    """
+    rows = None
+    derived = {}
+    index = df.index
+    if profile.date_source == 'TIMESTAMP' and 'TIMESTAMP' in df.columns:
+        raw_timestamps = df['TIMESTAMP']
+        keep = ~raw_timestamps.astype(str).isin(profile.timestamp_markers).to_numpy()
+        timestamps = pd.to_datetime(raw_timestamps[keep], errors='coerce')
+        parsed = timestamps.notna().to_numpy()
+        rows = np.flatnonzero(keep)[parsed]
+        timestamps = timestamps[parsed].reset_index(drop=True)
+        index = pd.RangeIndex(len(rows))
+        derived = {f"__{part}": getattr(timestamps.dt, part.lower()) for part in _DATETIME_PARTS}
+
+    output = {}
+    for name, src in _resolve_profile_columns(profile, list(df.columns)):
+        if src is None:
+            values = pd.Series(np.nan, index=index)
+        elif src in derived:
+            values = derived[src]
+        elif rows is not None:
+            values = df[src].iloc[rows].reset_index(drop=True)
+        else:
+            values = df[src]
+        output[name] = _convert_profile_column(name, values)
+
+    return pd.DataFrame(output, index=index)
+
+
+def frame_memory_mb(df: pd.DataFrame) -> float:
+    """Mémoire occupée par un DataFrame (index et chaînes compris), en Mo."""
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
+
+
+def apply_meteo_dtypes(df: pd.DataFrame, dtypes: Optional[Dict[str, str]] = None, label: Optional[str] = None) -> pd.DataFrame:
+    """
+    Applique la politique de types de config.METEO_DTYPES: mesures en float32, 'Station' en catégorie.
+    Les colonnes absentes sont ignorées et celles déjà au bon type ne sont pas recopiées.
+
+    Args:
+        df: DataFrame à convertir (non modifié)
+        dtypes: Types par colonne (par défaut METEO_DTYPES)
+        label: Si fourni, la mémoire avant/après est journalisée sous ce libellé (ex: nom de la station)
+
+    Returns:
+        DataFrame aux types compacts (df lui-même si aucune conversion n'est nécessaire)
+    """
+    dtypes = METEO_DTYPES if dtypes is None else dtypes
+    to_convert = {col: dtype for col, dtype in dtypes.items() if col in df.columns and df[col].dtype != dtype}
+    if not to_convert:
+        return df
+
+    memory_before = frame_memory_mb(df) if label else None
+    df_typed = df.copy(deep=False)
+    for col, dtype in to_convert.items():
+        values = df_typed[col]
+        if dtype != 'category' and not pd.api.types.is_numeric_dtype(values):
+            values = pd.to_numeric(values, errors='coerce')
+        df_typed[col] = values.astype(dtype)
+
+    if label:
+        logging.info(f"Mémoire {label}: {memory_before:.1f} Mo -> {frame_memory_mb(df_typed):.1f} Mo "
+                     f"({len(df_typed)} lignes, {len(to_convert)} colonnes converties).")
+    return df_typed
+
+
+def set_station_column(df: pd.DataFrame, station: str) -> pd.DataFrame:
+    """
+    Ajoute (sur place) la colonne 'Station' si elle est absente, en catégorie à une seule modalité:
+    un code int8 par ligne au lieu d'une chaîne Python répétée.
+    """
+    if 'Station' not in df.columns:
+        df['Station'] = pd.Categorical.from_codes(np.zeros(len(df), dtype='int8'), categories=[station])
+    return df
+
+
+def concat_station_frames(frames: List[pd.DataFrame], label: Optional[str] = None) -> pd.DataFrame:
+    """
+    Concatène les DataFrames de plusieurs stations en conservant les colonnes catégorielles:
+    les modalités sont d'abord unifiées, sinon pd.concat retomberait sur des chaînes (object).
+
+    Args:
+        frames: DataFrames par station (même format que load_station_data)
+        label: Si fourni, la mémoire du résultat est journalisée sous ce libellé
+    """
+    categorical_cols = [col for col, dtype in METEO_DTYPES.items() if dtype == 'category']
+    frames = list(frames)
+    for col in categorical_cols:
+        columns = [frame[col] for frame in frames
+                   if col in frame.columns and isinstance(frame[col].dtype, pd.CategoricalDtype)]
+        if len(columns) < 2:
+            continue
+        categories = union_categoricals(columns, ignore_order=True).categories
+        frames = [frame.assign(**{col: frame[col].cat.set_categories(categories)})
+                  if col in frame.columns and isinstance(frame[col].dtype, pd.CategoricalDtype) else frame
+                  for frame in frames]
+
+    df = pd.concat(frames, ignore_index=False)
+    if label:
+        logging.info(f"Mémoire {label}: {frame_memory_mb(df):.1f} Mo pour {len(frames)} station(s), {len(df)} lignes.")
+    return df
+
+
 def apply_station_specific_preprocessing(df: pd.DataFrame, station: str) -> pd.DataFrame:
     """
     Prétraite les données d'une station spécifique et crée une colonne Datetime standardisée.
+    Le traitement est décrit par le profil de la station (config.STATION_PROFILES).
     
     Args:
         df: DataFrame brut contenant les données
@@ -997,26 +1209,8 @@ def apply_station_specific_preprocessing(df: pd.DataFrame, station: str) -> pd.D
     # Nettoyage du nom de la station
     station = station.strip()
 
-    # Mapping des stations vers leurs bassins
-    STATION_TO_BASIN = {
-        # Stations Dano
-        'Dreyer Foundation': 'DANO', 'Bankandi': 'DANO', 'Wahablé': 'DANO', 'Fafo': 'DANO',
-        'Yabogane': 'DANO', 'Lare': 'DANO', 'Tambiri 2': 'DANO', 'Tambiri 1': 'DANO',
-
-        # Stations Dassari
-        'Nagasséga': 'DASSARI', 'Koundri': 'DASSARI', 'Koupendri': 'DASSARI', 'Pouri': 'DASSARI',
-        'Fandohoun': 'DASSARI', 'Ouriyori 1': 'DASSARI',
-
-        # Stations Vea Sissili
-        'Oualem': 'VEA_SISSILI', 'Nebou': 'VEA_SISSILI', 'Nabugubulle': 'VEA_SISSILI', 'Manyoro': 'VEA_SISSILI',
-        'Gwosi': 'VEA_SISSILI', 'Doninga': 'VEA_SISSILI', 'Bongo Soe': 'VEA_SISSILI', 'Aniabisi': 'VEA_SISSILI',
-        'Atampisi': 'VEA_SISSILI'
-    }
-
-    # Détermination du bassin
-    bassin = STATION_TO_BASIN.get(station)
-    
-    if not bassin:
+    profile = get_station_profile(station)
+    if profile is None:
         warnings.warn(f"Station {station} non reconnue dans aucun bassin. Prétraitement standard appliqué.")
         df_copy = df.copy()
         try:
@@ -1024,243 +1218,178 @@ def apply_station_specific_preprocessing(df: pd.DataFrame, station: str) -> pd.D
         except ValueError as e:
             warnings.warn(f"Impossible de créer Datetime pour station non reconnue {station}: {str(e)}")
         return df_copy
-    
-    df_copy = df.copy()
-    
-    # Traitement pour le bassin Dano
-    if bassin == 'DANO':
-        if station in ['Dreyer Foundation', 'Bankandi', 'Wahablé', 'Fafo', 'Yabogane']:
-            colonnes_attendues = [
-                'Year', 'Month', 'Day', 'Hour', 'Minute', 'Rain_01_mm', 'Rain_02_mm',
-                'Air_Temp_Deg_C', 'Rel_H_%', 'Solar_R_W/m^2', 'Wind_Sp_m/sec', 'Wind_Dir_Deg'
-            ]
-            
-            for col in colonnes_attendues:
-                if col not in df_copy.columns:
-                    df_copy[col] = np.nan
-            
-            df_copy = df_copy[colonnes_attendues]
-
-        elif station in ['Lare', 'Tambiri 2']:
-            colonnes_attendues = [
-                'Year', 'Month', 'Day', 'Hour', 'Minute', 'Rain_01_mm', 'Rain_02_mm'
-            ]
-            
-            for col in colonnes_attendues:
-                if col not in df_copy.columns:
-                    df_copy[col] = np.nan
-            
-            df_copy = df_copy[colonnes_attendues]
-
-        elif station == 'Tambiri 1':
-            colonnes_select = ['Year', 'Month', 'Day', 'Hour', 'Minute', 'AirTC_Avg', 'RH', 
-                             'WS_ms_S_WVT', 'WindDir_D1_WVT', 'Rain_mm_Tot', 'BP_mbar_Avg']
-            colonnes_renommage = {
-                'AirTC_Avg': 'Air_Temp_Deg_C', 
-                'RH': 'Rel_H_Pct',
-                'WS_ms_S_WVT': 'Wind_Sp_m/sec', 
-                'WindDir_D1_WVT': 'Wind_Dir_Deg', 
-                'Rain_mm_Tot': 'Rain_mm'
-            }
-            
-            for col in colonnes_select:
-                if col not in df_copy.columns:
-                    df_copy[col] = np.nan
-            
-            df_copy = df_copy[colonnes_select]
-            df_copy.rename(columns=colonnes_renommage, inplace=True)
-    
-    # Traitement pour le bassin Dassari
-    elif bassin == 'DASSARI':
-        if station in ['Nagasséga', 'Koundri', 'Koupendri', 'Pouri', 'Fandohoun']:
-            colonnes_attendues = [
-                'Year', 'Month', 'Day', 'Hour', 'Minute', 'Rain_01_mm', 'Rain_02_mm',
-                'Air_Temp_Deg_C', 'Rel_H_%', 'Solar_R_W/m^2', 'Wind_Sp_m/sec', 'Wind_Dir_Deg'
-            ]
-            
-            for col in colonnes_attendues:
-                if col not in df_copy.columns:
-                    df_copy[col] = np.nan
-            
-            df_copy = df_copy[colonnes_attendues]
-
-        elif station == 'Ouriyori 1':
-            colonnes_sup = ['TIMESTAMP', 'RECORD', 'WSDiag', 'Intensity_RT_Avg', 'Acc_RT_NRT_Tot', 
-                          'Pluvio_Status', 'BP_mbar_Avg', 'SR01Up_Avg', 'SR01Dn_Avg', 'IR01Up_Avg', 
-                          'IR01Dn_Avg', 'NR01TC_Avg', 'IR01UpCo_Avg', 'IR01DnCo_Avg',
-                          'Acc_NRT_Tot', 'Acc_totNRT', 'Bucket_RT_Avg', 'Bucket_NRT',
-                          'Temp_load_cell_Avg', 'Heater_Status']
-            
-            colonnes_renommage = {
-                'Rain_mm_Tot': 'Rain_mm',
-                'AirTC_Avg': 'Air_Temp_Deg_C',
-                'RH': 'Rel_H_Pct',
-                'SlrW_Avg': 'Solar_R_W/m^2',
-                'WS_ms_S_WVT': 'Wind_Sp_m/sec',
-                'WindDir_D1_WVT': 'Wind_Dir_Deg'
-            }
-            
-            df_copy = df_copy[~df_copy["TIMESTAMP"].astype(str).isin(["TS", "NaN", "nan"])]
-            df_copy.reset_index(drop=True, inplace=True)
-            if 'TIMESTAMP' in df_copy.columns:
-                df_copy["TIMESTAMP"] = pd.to_datetime(df_copy["TIMESTAMP"], errors="coerce")
-                df_copy.dropna(subset=["TIMESTAMP"], inplace=True)
-                
-                df_copy["Year"] = df_copy["TIMESTAMP"].dt.year
-                df_copy["Month"] = df_copy["TIMESTAMP"].dt.month
-                df_copy["Day"] = df_copy["TIMESTAMP"].dt.day
-                df_copy["Hour"] = df_copy["TIMESTAMP"].dt.hour
-                df_copy["Minute"] = df_copy["TIMESTAMP"].dt.minute
-                
-            df_copy.drop(columns=[col for col in colonnes_sup if col in df_copy.columns], inplace=True, errors='ignore')
-            df_copy.rename(columns=colonnes_renommage, inplace=True)
-    
-    # Traitement pour le bassin Vea Sissili
-    elif bassin == 'VEA_SISSILI':        
-        if station in ['Oualem', 'Nebou', 'Nabugubulle', 'Gwosi', 'Doninga', 'Bongo Soe']:
-            colonnes_renommage = {
-                'Rain_mm_Tot': 'Rain_mm',
-                'AirTC_Avg': 'Air_Temp_Deg_C',
-                'RH': 'Rel_H_Pct',
-                'SlrW_Avg': 'Solar_R_W/m^2',
-                'WS_ms_S_WVT': 'Wind_Sp_m/sec',
-                'WindDir_D1_WVT': 'Wind_Dir_Deg',
-            }
-            colonnes_sup = ['SlrkJ_Tot', 'WS_ms_Avg', 'WindDir', 'Rain_01_mm_Tot', 'Rain_02_mm_Tot']
-            
-            df_copy.drop(columns=[col for col in colonnes_sup if col in df_copy.columns], inplace=True, errors='ignore')
-            df_copy.rename(columns=colonnes_renommage, inplace=True)
-            
-            colonnes_finales = [
-                'Date', 'Rain_mm', 'Air_Temp_Deg_C', 'Rel_H_Pct',
-                'Solar_R_W/m^2', 'Wind_Sp_m/sec', 'Wind_Dir_Deg', 'BP_mbar_Avg'
-            ]
-            df_copy = df_copy[colonnes_finales]
-        
-        elif station == 'Manyoro':
-            colonnes_renommage = {
-                'Rain_01_mm_Tot': 'Rain_01_mm',
-                'Rain_02_mm_Tot': 'Rain_02_mm',
-                'AirTC_Avg': 'Air_Temp_Deg_C',
-                'RH': 'Rel_H_%',
-                'SlrW_Avg': 'Solar_R_W/m^2',
-                'WS_ms_Avg': 'Wind_Sp_m/sec',
-                'WindDir': 'Wind_Dir_Deg',
-            }
-            colonnes_sup = ['SlrkJ_Tot']
-            #colonnes_sup = ['SlrkJ_Tot', 'WS_ms_Avg', 'WindDir', 'Rain_01_mm_Tot', 'Rain_02_mm_Tot']
 
-            
-            df_copy.drop(columns=[col for col in colonnes_sup if col in df_copy.columns], inplace=True, errors='ignore')
-            df_copy.rename(columns=colonnes_renommage, inplace=True)
-            
-            colonnes_finales = [
-                'Date', 'Rain_01_mm', 'Rain_02_mm', 'Air_Temp_Deg_C', 'Rel_H_%', 
-                'Solar_R_W/m^2', 'Wind_Sp_m/sec', 'Wind_Dir_Deg'
-            ]
-            df_copy = df_copy[colonnes_finales]
-            
-        elif station == 'Aniabisi':
-            colonnes_renommage = {
-                'Rain_mm_Tot': 'Rain_mm',
-                'AirTC_Avg': 'Air_Temp_Deg_C',
-                'RH': 'Rel_H_Pct',
-                'SlrW_Avg': 'Solar_R_W/m^2',
-                'WS_ms_S_WVT': 'Wind_Sp_m/sec',
-                'WindDir_D1_WVT': 'Wind_Dir_Deg',
-            }
-            colonnes_sup = ['Intensity_RT_Avg', 'Acc_NRT_Tot', 'Acc_RT_NRT_Tot', 'SR01Up_Avg', 
-                          'SR01Dn_Avg', 'IR01Up_Avg', 'IR01Dn_Avg', 'IR01UpCo_Avg', 'IR01DnCo_Avg']
-            
-            df_copy.drop(columns=[col for col in colonnes_sup if col in df_copy.columns], inplace=True, errors='ignore')
-            df_copy.rename(columns=colonnes_renommage, inplace=True)
-    
-        elif station in ['Bongo Atampisi', 'Atampisi']:
-            colonnes_renommage = {
-                'Rain_01_mm_Tot': 'Rain_01_mm',
-                'Rain_02_mm_Tot': 'Rain_02_mm',
-                'AirTC_Avg': 'Air_Temp_Deg_C',
-                'RH': 'Rel_H_Pct',
-                'SlrW_Avg': 'Solar_R_W/m^2',
-                'WS_ms_Avg': 'Wind_Sp_m/sec',
-                'WindDir': 'Wind_Dir_Deg',
-            }
-            df_copy.rename(columns=colonnes_renommage, inplace=True)
+    df_profiled = _apply_station_profile(df, profile)
 
-    # Conversion des types de données (logique générale appliquée après le prétraitement spécifique)
-    # Assurez-vous que les noms de colonnes sont déjà les noms finaux (ex: Rel_H_Pct)
-    for col in df_copy.columns:
-        if any(time_part in col for time_part in ['Year', 'Month', 'Day', 'Hour', 'Minute']):
-            df_copy[col] = pd.to_numeric(df_copy[col], errors='coerce').astype('Int64')
-        
-        elif any(metric in col for metric in ['Rain', 'Temp', 'Rel_H_Pct', 'Solar', 'Wind', 'BP_']): # Utilise 'Rel_H_Pct'
-            df_copy[col] = pd.to_numeric(df_copy[col], errors='coerce').astype(float)
-        
-        elif col == 'Date':
-            df_copy[col] = pd.to_datetime(
-                df_copy[col],
-                errors='coerce',
-                format='mixed'
-            )
-            if df_copy[col].isna().any():
-                nan_count = df_copy[col].isna().sum()
-                sample_errors = df_copy[df_copy[col].isna()][col].head(3).tolist()
-                warnings.warn(
-                    f"{nan_count} erreurs de conversion Date. Exemples : {sample_errors}"
-                )
-        
-        elif col == 'TIMESTAMP':
-            df_copy[col] = pd.to_datetime(df_copy[col], errors='coerce')
-        
     # Création de Datetime (et Date) à partir des colonnes préparées
     try:
-        df_copy = create_datetime_column(df_copy)
+        df_profiled = _insert_datetime_column(df_profiled)
     except ValueError as e:
         warnings.warn(f"Erreur création Datetime pour {station}: {str(e)}")
     
-    return df_copy
+    return apply_meteo_dtypes(df_profiled, label=f"{station} (prétraitement)")
 
 
 
+# Composantes de date/heure séparées des fichiers logger
+_DATETIME_PARTS = ['Year', 'Month', 'Day', 'Hour', 'Minute']
+
+
+def _build_datetime_series(df: pd.DataFrame) -> Tuple[pd.Series, Optional[np.ndarray]]:
+    """
+    Construit la série Datetime (datetime64 tronquée à la minute) sans modifier df. Sources par
+    ordre de priorité: colonnes Year..Minute, puis 'Date', puis 'TIMESTAMP'.
+
+    Returns:
+        Tuple (série Datetime, masque booléen des lignes conservées ou None si toutes le sont).
+        Avec les composantes séparées, les lignes dont une composante est manquante sont exclues
+        et la série ne contient que les lignes conservées.
+    Raises:
+        ValueError si aucune source n'est disponible ou si toutes les valeurs sont invalides.
+    """
+    datetime_series = None
+    valid_rows = None
+
+    if all(col in df.columns for col in _DATETIME_PARTS):
+        parts = {col: pd.to_numeric(df[col], errors='coerce') for col in _DATETIME_PARTS}
+        valid_rows = np.logical_and.reduce([parts[col].notna().to_numpy() for col in _DATETIME_PARTS])
+        if valid_rows.any():
+            datetime_series = pd.to_datetime({
+                'year': parts['Year'][valid_rows],
+                'month': parts['Month'][valid_rows],
+                'day': parts['Day'][valid_rows],
+                'hour': parts['Hour'][valid_rows],
+                'minute': parts['Minute'][valid_rows]
+            }, errors='coerce')
+
+    elif 'Date' in df.columns:
+        datetime_series = pd.to_datetime(df['Date'], errors='coerce', format='mixed')
+
+    elif 'TIMESTAMP' in df.columns:
+        datetime_series = pd.to_datetime(df['TIMESTAMP'], errors='coerce', format='mixed')
+
+    if datetime_series is None or datetime_series.isnull().all():
+        raise ValueError("Impossible de créer la colonne 'Datetime'. Les informations temporelles sont incomplètes ou invalides.")
+
+    # Colonne datetime64 native tronquée à la minute (plus d'aller-retour par des chaînes)
+    if not pd.api.types.is_datetime64_any_dtype(datetime_series):
+        # Décalages horaires hétérogènes (dtype objet): on conserve l'heure locale de chaque valeur
+        datetime_series = pd.to_datetime(
+            datetime_series.map(lambda x: x.replace(tzinfo=None) if pd.notna(x) else pd.NaT),
+            errors='coerce')
+    datetime_series = datetime_series.dt.floor('min')
+
+    if valid_rows is not None and valid_rows.all():
+        valid_rows = None
+    return datetime_series, valid_rows
+
+
+def _insert_datetime_column(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Ajoute 'Datetime' en première colonne de df (modifié sur place, sauf filtrage des lignes
+    sans composantes de date qui produit un nouveau DataFrame).
+    """
+    datetime_series, valid_rows = _build_datetime_series(df)
+    if valid_rows is not None:
+        df = df[valid_rows]
+    if 'Datetime' in df.columns:
+        df = df.drop(columns='Datetime')
+    df.insert(0, 'Datetime', datetime_series.array)
+    return df
+
+
 # Cette fonction devrait être dans data_processing.py
 def create_datetime_column(df: pd.DataFrame) -> pd.DataFrame:
     df_copy = df.copy()
-    datetime_col_created = False
 
-    if all(col in df_copy.columns for col in ['Year', 'Month', 'Day', 'Hour', 'Minute']):
-        for col in ['Year', 'Month', 'Day', 'Hour', 'Minute']:
+    if all(col in df_copy.columns for col in _DATETIME_PARTS):
+        for col in _DATETIME_PARTS:
             df_copy[col] = pd.to_numeric(df_copy[col], errors='coerce')
-        
-        df_copy.dropna(subset=['Year', 'Month', 'Day', 'Hour', 'Minute'], inplace=True)
-
-        if not df_copy.empty:
-            df_copy['Datetime'] = pd.to_datetime({
-                'year': df_copy['Year'],
-                'month': df_copy['Month'],
-                'day': df_copy['Day'],
-                'hour': df_copy['Hour'],
-                'minute': df_copy['Minute']
-            }, errors='coerce')
-            datetime_col_created = True
 
-    elif not datetime_col_created and 'Date' in df_copy.columns:
-        df_copy['Datetime'] = pd.to_datetime(df_copy['Date'], errors='coerce', format='mixed')
-        datetime_col_created = True
-        
-    elif not datetime_col_created and 'TIMESTAMP' in df_copy.columns:
-        df_copy['Datetime'] = pd.to_datetime(df_copy['TIMESTAMP'], errors='coerce', format='mixed')
-        datetime_col_created = True
-        
-    if not datetime_col_created or df_copy['Datetime'].isnull().all():
-        raise ValueError("Impossible de créer la colonne 'Datetime'. Les informations temporelles sont incomplètes ou invalides.")
+    return _insert_datetime_column(df_copy)
 
-    df_copy['Datetime'] = df_copy['Datetime'].apply(lambda x: x.strftime('%Y-%m-%d %H:%M') if pd.notna(x) else None)
-    
-    if 'Datetime' in df_copy.columns:
-        cols_order = ['Datetime'] + [col for col in df_copy.columns if col != 'Datetime']
-        df_copy = df_copy[cols_order]
+def _write_benchmark_logger_csv(file_path: str, n_rows: int, seed: int = 0):
+    """
+    Écrit un fichier CSV au format d'un logger (Year..Minute + 7 mesures, pas de 5 minutes), avec
+    des trous d'enregistrement et quelques lignes aux composantes de date vides, comme les exports réels.
+    """
+    rng = np.random.default_rng(seed)
+    # ~2 % de pas sautés (coupures du logger)
+    steps = np.cumsum(np.where(rng.random(n_rows) < 0.02, rng.integers(2, 288, n_rows), 1))
+    timestamps = pd.Timestamp('2015-01-01') + pd.to_timedelta(steps * 5, unit='min')
+    df = pd.DataFrame({'Year': timestamps.year, 'Month': timestamps.month, 'Day': timestamps.day,
+                       'Hour': timestamps.hour, 'Minute': timestamps.minute}, dtype='float64')
+    for col in ['Rain_01_mm', 'Rain_02_mm', 'Air_Temp_Deg_C', 'Rel_H_%', 'Solar_R_W/m^2',
+                'Wind_Sp_m/sec', 'Wind_Dir_Deg']:
+        df[col] = np.round(rng.random(n_rows) * 100, 2)
+    df.loc[rng.random(n_rows) < 0.001, 'Hour'] = np.nan
+    df.to_csv(file_path, index=False)
+
+
+def _legacy_datetime_column(df: pd.DataFrame) -> pd.Series:
+    """Ancienne construction de 'Datetime' (référence du benchmark): chaînes 'YYYY-MM-DD HH:MM' ligne à ligne."""
+    parts = {col: pd.to_numeric(df[col], errors='coerce') for col in _DATETIME_PARTS}
+    valid_rows = np.logical_and.reduce([parts[col].notna().to_numpy() for col in _DATETIME_PARTS])
+    assembled = pd.to_datetime({col.lower(): parts[col][valid_rows] for col in _DATETIME_PARTS}, errors='coerce')
+    return assembled.apply(lambda x: x.strftime('%Y-%m-%d %H:%M') if pd.notna(x) else None)
+
+
+def benchmark_datetime_pipeline(n_rows: int = 500_000, file_path: Optional[str] = None,
+                                repeat: int = 3) -> Dict[str, object]:
+    """
+    Mesure create_datetime_column sur un fichier de logger lu comme à l'ingestion (pd.read_csv),
+    et la compare à l'ancienne construction par chaînes suivie de la nouvelle analyse qu'elle
+    imposait en aval (validation, interpolation).
+
+    Args:
+        n_rows: Nombre de lignes du fichier généré si `file_path` n'est pas fourni
+        file_path: Fichier CSV réel à utiliser (colonnes Year, Month, Day, Hour, Minute)
+        repeat: Nombre de passages par étape; la meilleure durée est retenue
+    Returns:
+        Dictionnaire {'rows', 'read_seconds',
+                      'current': {'create_datetime_column', 'downstream_parse', 'total'},
+                      'legacy': {'build_strings', 'downstream_parse', 'total'},
+                      'speedup'} (durées en secondes)
+    """
+    def best_of(func):
+        durations = []
+        for _attempt in range(max(1, repeat)):
+            start = time.perf_counter()
+            output = func()
+            durations.append(time.perf_counter() - start)
+        return min(durations), output
+
+    generated_path = None
+    if file_path is None:
+        fd, generated_path = tempfile.mkstemp(suffix='.csv')
+        os.close(fd)
+        _write_benchmark_logger_csv(generated_path, n_rows)
+        file_path = generated_path
+    try:
+        read_seconds, df_raw = best_of(lambda: pd.read_csv(file_path, encoding_errors='replace'))
+    finally:
+        if generated_path is not None:
+            os.unlink(generated_path)
+
+    current = {}
+    current['create_datetime_column'], df_current = best_of(lambda: create_datetime_column(df_raw))
+    current['downstream_parse'], _parsed = best_of(lambda: pd.to_datetime(df_current['Datetime'], errors='coerce'))
+    current['total'] = current['create_datetime_column'] + current['downstream_parse']
+
+    legacy = {}
+    legacy['build_strings'], legacy_strings = best_of(lambda: _legacy_datetime_column(df_raw))
+    legacy['downstream_parse'], _parsed = best_of(lambda: pd.to_datetime(legacy_strings, errors='coerce'))
+    legacy['total'] = legacy['build_strings'] + legacy['downstream_parse']
+
+    results = {'rows': len(df_raw), 'read_seconds': read_seconds, 'current': current, 'legacy': legacy,
+               'speedup': legacy['total'] / current['total'] if current['total'] else float('inf')}
+    logging.info(f"Benchmark Datetime ({results['rows']} lignes, lecture {read_seconds:.2f} s): "
+                 f"create_datetime_column {current['create_datetime_column']:.3f} s "
+                 f"+ analyse aval {current['downstream_parse']:.3f} s, "
+                 f"ancienne version {legacy['build_strings']:.3f} s + {legacy['downstream_parse']:.3f} s "
+                 f"(x{results['speedup']:.1f})")
+    return results
 
-    return df_copy
 
 def create_rain_mm(df: pd.DataFrame) -> pd.DataFrame:
     """
@@ -1283,6 +1412,52 @@ def create_rain_mm(df: pd.DataFrame) -> pd.DataFrame:
 
 
 
+
+# Valeurs par défaut des composantes de date/heure absentes du fichier
+DATETIME_COMPONENT_DEFAULTS = {'Year': 2000, 'Month': 1, 'Day': 1, 'Hour': 0, 'Minute': 0}
+
+# Bornes valides de chaque composante (années limitées à la plage de datetime64[ns])
+_DATETIME_COMPONENT_BOUNDS = {'Year': (1678, 2261), 'Month': (1, 12), 'Day': (1, 31), 'Hour': (0, 23), 'Minute': (0, 59)}
+
+
+def _assemble_datetime_from_components(df: pd.DataFrame) -> Tuple[pd.Series, int]:
+    """
+    Assemble arithmétiquement des datetime64 à partir des colonnes Year, Month, Day, Hour, Minute,
+    sans boucle Python ni passage par des chaînes. Une colonne absente prend sa valeur de
+    DATETIME_COMPONENT_DEFAULTS; une valeur manquante, non entière ou hors bornes (ex: 31 avril)
+    rend la ligne invalide.
+
+    Returns:
+        Tuple (Série datetime64[ns] alignée sur l'index de df avec NaT pour les lignes invalides,
+        nombre de lignes invalides).
+    """
+    n_rows = len(df)
+    valid = np.ones(n_rows, dtype=bool)
+    components = {}
+    for col, default in DATETIME_COMPONENT_DEFAULTS.items():
+        if col in df.columns:
+            values = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+        else:
+            values = np.full(n_rows, default, dtype='float64')
+        low, high = _DATETIME_COMPONENT_BOUNDS[col]
+        with np.errstate(invalid='ignore'):
+            valid &= np.isfinite(values) & (values == np.floor(values)) & (values >= low) & (values <= high)
+        components[col] = values
+
+    # Les lignes invalides reçoivent les valeurs par défaut le temps du calcul, puis NaT
+    ints = {col: np.where(valid, values, DATETIME_COMPONENT_DEFAULTS[col]).astype(np.int64)
+            for col, values in components.items()}
+    months = ((ints['Year'] - 1970) * 12 + (ints['Month'] - 1)).astype('datetime64[M]')
+    days = months.astype('datetime64[D]') + (ints['Day'] - 1).astype('timedelta64[D]')
+    # Un jour au-delà de la fin du mois déborde sur le mois suivant: ligne invalide
+    valid &= days.astype('datetime64[M]') == months
+    minutes = (ints['Hour'] * 60 + ints['Minute']).astype('timedelta64[m]')
+    assembled = (days.astype('datetime64[m]') + minutes).astype('datetime64[ns]')
+    assembled[~valid] = np.datetime64('NaT')
+
+    return pd.Series(assembled, index=df.index), int(n_rows - valid.sum())
+
+
 def create_datetime(df: pd.DataFrame, bassin: str = None, station: str = None) -> pd.DataFrame:
     """
     Crée la colonne 'Datetime' à partir de colonnes séparées (Year, Month, Day, Hour, Minute)
@@ -1322,15 +1497,9 @@ def create_datetime(df: pd.DataFrame, bassin: str = None, station: str = None) -
                 # Traduction de l'erreur
                 raise ValueError(_l("Aucune colonne de composantes de date/heure (Year, Month, Day, Hour, Minute) trouvée."))
 
-            date_strings = df_copy.apply(
-                lambda row: f"{int(row.get('Year', 2000))}-"
-                           f"{int(row.get('Month', 1)):02d}-"
-                           f"{int(row.get('Day', 1)):02d} "
-                           f"{int(row.get('Hour', 0)):02d}:"
-                           f"{int(row.get('Minute', 0)):02d}",
-                axis=1
-            )
-            df_copy['Datetime'] = pd.to_datetime(date_strings, errors='coerce')
+            df_copy['Datetime'], invalid_count = _assemble_datetime_from_components(df_copy)
+            if invalid_count:
+                warnings.warn(_l("%d lignes avec des composantes de date/heure manquantes ou invalides (Datetime mis à NaT).") % invalid_count)
             
         except Exception as e:
             # Traduction de l'avertissement
@@ -1567,7 +1736,8 @@ import numpy as np
 #     return df_resultat
 
 
-def traiter_outliers_meteo(df: pd.DataFrame, colonnes: list = None, coef: float = 1.5) -> pd.DataFrame:
+def traiter_outliers_meteo(df: pd.DataFrame, colonnes: list = None, coef: float = 1.5,
+                           bornes: Optional[Dict[str, tuple]] = None) -> pd.DataFrame:
     """
     Remplace les outliers dans un DataFrame en utilisant la méthode IQR,
     en les remplaçant par les bornes (inférieure ou supérieure) plutôt que NaN.
@@ -1576,6 +1746,9 @@ def traiter_outliers_meteo(df: pd.DataFrame, colonnes: list = None, coef: float
         df (pd.DataFrame): Le DataFrame contenant les données à traiter.
         colonnes (list, optional): Liste des colonnes à traiter. 
         coef (float): Facteur multiplicatif de l'IQR. Par défaut 1.5.
+        bornes (dict, optional): Bornes (inférieure, supérieure) par colonne. Les colonnes présentes
+            sont traitées avec ces bornes au lieu des quantiles du DataFrame; les bornes calculées
+            pour les autres colonnes y sont ajoutées (traitement incrémental d'une station).
 
     Returns:
         pd.DataFrame: Une copie du DataFrame avec les outliers remplacés par les bornes IQR.
@@ -1601,19 +1774,24 @@ def traiter_outliers_meteo(df: pd.DataFrame, colonnes: list = None, coef: float
 
     for col in colonnes_existantes:
         try:
-            # Calcul des quantiles en s'assurant d'avoir des valeurs scalaires
-            Q1 = df_resultat[col].quantile(0.25)
-            Q3 = df_resultat[col].quantile(0.75)
-            
-            # Conversion explicite en float si nécessaire
-            Q1 = float(Q1) if hasattr(Q1, '__iter__') else Q1
-            Q3 = float(Q3) if hasattr(Q3, '__iter__') else Q3
-            
-            IQR = float(Q3 - Q1)
-            
-            # Calcul des bornes
-            borne_inf = float(Q1) - coef * IQR
-            borne_sup = float(Q3) + coef * IQR
+            if bornes is not None and col in bornes:
+                borne_inf, borne_sup = (float(borne) for borne in bornes[col])
+            else:
+                # Calcul des quantiles en s'assurant d'avoir des valeurs scalaires
+                Q1 = df_resultat[col].quantile(0.25)
+                Q3 = df_resultat[col].quantile(0.75)
+
+                # Conversion explicite en float si nécessaire
+                Q1 = float(Q1) if hasattr(Q1, '__iter__') else Q1
+                Q3 = float(Q3) if hasattr(Q3, '__iter__') else Q3
+
+                IQR = float(Q3 - Q1)
+
+                # Calcul des bornes
+                borne_inf = float(Q1) - coef * IQR
+                borne_sup = float(Q3) + coef * IQR
+                if bornes is not None:
+                    bornes[col] = (borne_inf, borne_sup)
 
             # Application des bornes
             mask_bas = df_resultat[col] < borne_inf
@@ -3749,61 +3927,92 @@ import traceback # For printing full tracebacks on errors
 
 
 
+MISSING_RANGES_COLUMNS = ['station', 'variable', 'start_time', 'end_time', 'duration', 'unit', 'count']
+
+# Unité de durée des plages manquantes selon le format temporel d'origine:
+# (unité, résolution des bornes, nanosecondes par unité, format d'affichage)
+_MISSING_RANGE_UNITS = {
+    'ymdh': ('minutes', 'min', 60 * 10**9, '%Y-%m-%d %H:%M'),
+    'date': ('days', 'D', 86400 * 10**9, '%Y-%m-%d'),
+    'default': ('hours', 's', 3600 * 10**9, '%Y-%m-%d %H:%M:%S'),
+}
+
+
+def _missing_range_unit(time_format_info: dict) -> tuple:
+    if time_format_info['has_ymdh_columns']:
+        return _MISSING_RANGE_UNITS['ymdh']
+    if time_format_info['has_date_column']:
+        return _MISSING_RANGE_UNITS['date']
+    return _MISSING_RANGE_UNITS['default']
+
+
+def encode_missing_runs(is_missing: np.ndarray, segment_starts: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Encodage par plages (run-length) des valeurs manquantes de toutes les colonnes en une passe.
+
+    Args:
+        is_missing: Masque booléen 2-D (lignes, variables)
+        segment_starts: Positions des lignes qui commencent un nouveau segment (station): une plage
+                        ne déborde jamais d'un segment sur le suivant
+    Returns:
+        Tuple (colonne, position de début, position de fin incluse) des plages, triées par colonne
+        puis par début. Le nombre de valeurs d'une plage vaut fin - début + 1.
+    """
+    is_missing = np.asarray(is_missing, dtype=bool)
+    if is_missing.ndim == 1:
+        is_missing = is_missing[:, None]
+    previous_missing = np.zeros_like(is_missing)
+    previous_missing[1:] = is_missing[:-1]
+    next_missing = np.zeros_like(is_missing)
+    next_missing[:-1] = is_missing[1:]
+    if segment_starts is not None and len(segment_starts):
+        previous_missing[segment_starts] = False
+        segment_ends = np.asarray(segment_starts)[np.asarray(segment_starts) > 0] - 1
+        next_missing[segment_ends] = False
+
+    # Parcours colonne par colonne (transposée): débuts et fins d'une colonne alternent, dans l'ordre
+    columns, starts = np.nonzero((is_missing & ~previous_missing).T)
+    _, ends = np.nonzero((is_missing & ~next_missing).T)
+    return columns, starts, ends
+
+
+def _missing_ranges_frame(stations: np.ndarray, variables: np.ndarray, start_times: pd.DatetimeIndex,
+                          end_times: pd.DatetimeIndex, counts: np.ndarray, time_format_info: dict) -> pd.DataFrame:
+    """
+    Assemble les plages manquantes: bornes horodatées (arrondies à la résolution du format d'origine),
+    durée entière dans l'unité du format et nombre de valeurs manquantes. Le formatage texte des
+    bornes est laissé à l'affichage.
+    """
+    unit, resolution, unit_ns, _ = _missing_range_unit(time_format_info)
+    durations = (end_times.asi8 - start_times.asi8) // unit_ns
+    return pd.DataFrame({
+        'station': stations,
+        'variable': variables,
+        'start_time': start_times.floor(resolution),
+        'end_time': end_times.floor(resolution),
+        'duration': durations.astype('int64'),
+        'unit': unit,
+        'count': counts.astype('int64'),
+    }, columns=MISSING_RANGES_COLUMNS)
+
+
 def _get_missing_ranges(series: pd.Series, station_name: str, variable_name: str, time_format_info: dict) -> list:
     """
     Detects ranges of missing values (NaN) in a time series.
     Returns a list of dictionaries, each representing a missing range,
     with time format, duration, and the exact count of missing values.
     """
-    missing_ranges = []
-    if series.isnull().any():
-        is_nan = series.isnull()
-
-        start_nan_mask = is_nan & (~is_nan.shift(1, fill_value=False))
-        end_nan_mask = is_nan & (~is_nan.shift(-1, fill_value=False))
-
-        start_times = series.index[start_nan_mask].tolist()
-        end_times = series.index[end_nan_mask].tolist()
-
-        for start, end in zip(start_times, end_times):
-            duration_value = 0
-            duration_unit = "hours" # Default unit
-            formatted_start = None
-            formatted_end = None
-            
-            # --- PRECISE CALCULATION OF MISSING VALUES COUNT ---
-            # Select the portion of the original series' index that falls within the missing range.
-            # .loc[start:end] is inclusive for DatetimeIndex.
-            # Then, count the NaNs directly in this segment.
-            missing_segment_series = series.loc[start:end]
-            count_missing_values = missing_segment_series.isnull().sum()
-
-            if time_format_info['has_ymdh_columns']:
-                formatted_start = start.strftime('%Y-%m-%d %H:%M')
-                formatted_end = end.strftime('%Y-%m-%d %H:%M')
-                duration_value = int((end - start).total_seconds() / 60)
-                duration_unit = "minutes"
-            elif time_format_info['has_date_column']:
-                formatted_start = start.strftime('%Y-%m-%d')
-                formatted_end = end.strftime('%Y-%m-%d')
-                duration_value = int((end - start).days)
-                duration_unit = "days"
-            else:
-                formatted_start = start.strftime('%Y-%m-%d %H:%M:%S')
-                formatted_end = end.strftime('%Y-%m-%d %H:%M:%S')
-                duration_value = int((end - start).total_seconds() / 3600)
-                duration_unit = "hours"
-
-            missing_ranges.append({
-                'station': station_name,
-                'variable': variable_name,
-                'start_time': formatted_start,
-                'end_time': formatted_end,
-                'duration': duration_value,
-                'unit': duration_unit,
-                'count': count_missing_values # Exact count of NaN values in this segment
-            })
-    return missing_ranges
+    _, starts, ends = encode_missing_runs(series.isnull().to_numpy())
+    if len(starts) == 0:
+        return []
+    index = pd.DatetimeIndex(series.index)
+    ranges = _missing_ranges_frame(np.full(len(starts), station_name, dtype=object),
+                                   np.full(len(starts), variable_name, dtype=object),
+                                   index[starts], index[ends], ends - starts + 1, time_format_info)
+    time_format = _missing_range_unit(time_format_info)[3]
+    for col in ('start_time', 'end_time'):
+        ranges[col] = ranges[col].dt.strftime(time_format)
+    return ranges.to_dict('records')
 
 def _validate_and_clean_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     """Performs initial validation and cleaning of the input DataFrame."""
@@ -3857,10 +4066,368 @@ def _apply_limits_and_coercions(df: pd.DataFrame, limits: dict, numerical_cols:
                     df_processed.loc[df_processed[col] < min_val, col] = np.nan
                 if max_val is not None:
                     df_processed.loc[df_processed[col] > max_val, col] = np.nan
-    return df_processed
+    return apply_meteo_dtypes(df_processed)
+
+# Moteur solaire vectorisé: mêmes équations NOAA qu'astral.sun.time_of_transit, évaluées sur des
+# tableaux de dates et de coordonnées au lieu d'une boucle Python par couple (station, jour).
+# Angle zénithal du lever/coucher: 90° + rayon apparent du soleil, plus la réfraction atmosphérique
+# calculée par astral pour cet angle (observateur au niveau de l'horizon).
+_SUNRISE_ZENITH = 90.0 + sun.SUN_APPARENT_RADIUS
+_SUNRISE_ZENITH_REFRACTED = _SUNRISE_ZENITH + sun.refraction_at_zenith(_SUNRISE_ZENITH)
+# Aube/crépuscule civils (soleil 6° sous l'horizon): Astral échoue aussi les jours où ils n'existent pas
+_CIVIL_TWILIGHT_ZENITH = 96.0
+_CIVIL_TWILIGHT_ZENITH_REFRACTED = _CIVIL_TWILIGHT_ZENITH + sun.refraction_at_zenith(_CIVIL_TWILIGHT_ZENITH)
+
+# Écart maximal toléré avec astral pour les heures de lever et de coucher
+SOLAR_ENGINE_TOLERANCE_SECONDS = 1.0
+
+
+def _noaa_transit_minutes_utc(julian_day: np.ndarray, lat: np.ndarray, lon: np.ndarray, rising: bool,
+                              zenith: float = _SUNRISE_ZENITH_REFRACTED) -> np.ndarray:
+    """
+    Minutes UTC (depuis 0 h UTC du jour julien) du passage montant (rising=True) ou descendant du
+    soleil à l'angle zénithal `zenith` (lever/coucher par défaut), NaN s'il n'est pas atteint ce jour-là.
+    """
+    lat_rad = np.radians(np.clip(lat, -89.8, 89.8))
+    cos_zenith = np.cos(np.radians(zenith))
+    adjustment = np.zeros_like(julian_day)
+    time_utc = np.zeros_like(julian_day)
+
+    # Deux itérations: la position du soleil est réévaluée à l'heure estimée de l'événement
+    for _ in range(2):
+        jc = (julian_day + adjustment - 2451545.0) / 36525.0
+        omega_rad = np.radians(125.04 - 1934.136 * jc)
+        l0 = (280.46646 + jc * (36000.76983 + 0.0003032 * jc)) % 360.0
+        m_rad = np.radians(357.52911 + jc * (35999.05029 - 0.0001537 * jc))
+        eccentricity = 0.016708634 - jc * (0.000042037 + 0.0000001267 * jc)
+        center = (np.sin(m_rad) * (1.914602 - jc * (0.004817 + 0.000014 * jc))
+                  + np.sin(2.0 * m_rad) * (0.019993 - 0.000101 * jc)
+                  + np.sin(3.0 * m_rad) * 0.000289)
+        apparent_long_rad = np.radians(l0 + center - 0.00569 - 0.00478 * np.sin(omega_rad))
+        mean_obliquity = 23.0 + (26.0 + (21.448 - jc * (46.815 + jc * (0.00059 - jc * 0.001813))) / 60.0) / 60.0
+        obliquity_rad = np.radians(mean_obliquity + 0.00256 * np.cos(omega_rad))
+        declination_rad = np.arcsin(np.sin(obliquity_rad) * np.sin(apparent_long_rad))
+
+        with np.errstate(invalid='ignore'):
+            hour_angle = np.arccos((cos_zenith - np.sin(lat_rad) * np.sin(declination_rad))
+                                   / (np.cos(lat_rad) * np.cos(declination_rad)))
+        if not rising:
+            hour_angle = -hour_angle
+
+        y = np.tan(obliquity_rad / 2.0) ** 2
+        l0_rad = np.radians(l0)
+        eq_time = 4.0 * np.degrees(
+            y * np.sin(2.0 * l0_rad)
+            - 2.0 * eccentricity * np.sin(m_rad)
+            + 4.0 * eccentricity * y * np.sin(m_rad) * np.cos(2.0 * l0_rad)
+            - 0.5 * y * y * np.sin(4.0 * l0_rad)
+            - 1.25 * eccentricity * eccentricity * np.sin(2.0 * m_rad))
+
+        offset = (-lon - np.degrees(hour_angle)) * 4.0 - eq_time
+        offset = np.where(offset < -720.0, offset + 1440.0, offset)
+        time_utc = 720.0 + offset
+        adjustment = time_utc / 1440.0
+
+    return time_utc
+
+
+def _local_dates(times_utc: pd.Series, timezone: str) -> pd.Series:
+    """Date civile locale (minuit naïf) d'horodatages UTC."""
+    return times_utc.dt.tz_convert(timezone).dt.tz_localize(None).dt.normalize()
+
+
+def solar_event_times(dates: pd.Series, lat: pd.Series, lon: pd.Series, timezone: pd.Series,
+                      rising: bool, zenith: float = _SUNRISE_ZENITH_REFRACTED) -> pd.Series:
+    """
+    Heure UTC du lever (rising=True) ou du coucher du soleil pour chaque ligne, le jour civil local
+    `dates` (minuit naïf) de chaque site. Comme astral.sun.sunrise/sunset, un événement qui tombe
+    un autre jour civil local est recalculé pour le jour voisin, et NaT est retourné s'il n'existe
+    pas ce jour-là.
+
+    Args:
+        dates, lat, lon, timezone: Séries alignées (un couple site/jour par ligne)
+        rising: True pour le lever, False pour le coucher
+        zenith: Angle zénithal réfracté de l'événement (lever/coucher par défaut,
+                _CIVIL_TWILIGHT_ZENITH_REFRACTED pour l'aube et le crépuscule civils)
+    Returns:
+        Série datetime64[ns, UTC] alignée sur `dates`
+    """
+    day_values = np.asarray(dates, dtype='datetime64[D]')
+    lat_values = lat.to_numpy(dtype='float64')
+    lon_values = lon.to_numpy(dtype='float64')
+
+    def event_on(days: np.ndarray) -> pd.Series:
+        julian_day = days.astype('int64').astype('float64') + 2440587.5
+        minutes = _noaa_transit_minutes_utc(julian_day, lat_values, lon_values, rising, zenith)
+        missing = np.isnan(minutes)
+        # Troncature à la microseconde, comme astral.sun.minutes_to_timedelta
+        seconds = np.where(missing, 0.0, minutes) * 60.0
+        whole_seconds = np.trunc(seconds)
+        microseconds = whole_seconds.astype('int64') * 1_000_000 + np.trunc((seconds - whole_seconds) * 1e6).astype('int64')
+        events = days.astype('datetime64[ns]') + (microseconds * 1000).view('timedelta64[ns]')
+        events[missing] = np.datetime64('NaT')
+        return pd.Series(events, index=dates.index).dt.tz_localize('UTC')
+
+    target = pd.Series(day_values.astype('datetime64[ns]'), index=dates.index)
+    events = event_on(day_values)
+    local_dates = pd.Series(pd.NaT, index=dates.index, dtype='datetime64[ns]')
+    for tz_name, positions in timezone.groupby(timezone, sort=False).groups.items():
+        local_dates.loc[positions] = _local_dates(events.loc[positions], tz_name)
+
+    mismatch = (local_dates != target) & events.notna()
+    if mismatch.any():
+        shift = np.where(local_dates < target, 1, -1).astype('timedelta64[D]')
+        retry = event_on(day_values + shift)
+        for tz_name, positions in timezone[mismatch].groupby(timezone[mismatch], sort=False).groups.items():
+            retry_local = _local_dates(retry.loc[positions], tz_name)
+            events.loc[positions] = retry.loc[positions].where(retry_local == target.loc[positions])
+    return events
+
+
+def _compute_sun_times(days: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Évalue le moteur solaire pour des couples (station, jour) aux coordonnées valides.
+
+    Args:
+        days: DataFrame avec 'Date_UTC_Naive', 'Lat', 'Long' et 'Timezone'
+    Returns:
+        Tuple (lever, coucher en datetime64[ns] UTC naïfs, NaT si indicateur fixe; masque de l'indicateur fixe)
+    """
+    sunrise = solar_event_times(days['Date_UTC_Naive'], days['Lat'], days['Long'], days['Timezone'], rising=True)
+    sunset = solar_event_times(days['Date_UTC_Naive'], days['Lat'], days['Long'], days['Timezone'], rising=False)
+
+    # Comme avec Astral (sun.sun calcule aussi l'aube et le crépuscule civils), un jour sans lever,
+    # coucher, aube ou crépuscule (hautes latitudes) bascule sur l'indicateur fixe
+    fixed = sunrise.isna() | sunset.isna()
+    for rising in (True, False):
+        fixed |= solar_event_times(days['Date_UTC_Naive'], days['Lat'], days['Long'], days['Timezone'],
+                                   rising=rising, zenith=_CIVIL_TWILIGHT_ZENITH_REFRACTED).isna()
+    sunrise = sunrise.mask(fixed).dt.tz_localize(None).to_numpy(dtype='datetime64[ns]')
+    sunset = sunset.mask(fixed).dt.tz_localize(None).to_numpy(dtype='datetime64[ns]')
+    return sunrise, sunset, fixed.to_numpy()
+
+
+############################ Cache des heures de lever et de coucher ############################
+# Les heures du soleil ne dépendent que des coordonnées de la station et de la date: elles sont
+# conservées par station dans un fichier .npz (colonnes date, lever, coucher, indicateur fixe),
+# complété au fil des traitements. L'empreinte des coordonnées (station_coordinates.json) et de
+# la version du moteur est stockée avec les données: un changement invalide le fichier.
+
+SUN_TIMES_CACHE_DIR = os.getenv('SUN_TIMES_CACHE_DIR', os.path.join('data', 'sun_times'))
+_SUN_TIMES_ENGINE_VERSION = 1 # À incrémenter si le calcul des heures du soleil change
+_SUN_TIMES_CACHE_LOCK = threading.Lock()
+
+
+def _sun_times_fingerprint(lat: float, lon: float, timezone: str) -> str:
+    """Empreinte des paramètres dont dépendent les heures du soleil d'une station."""
+    return hashlib.sha1(f"{_SUN_TIMES_ENGINE_VERSION}|{float(lat)!r}|{float(lon)!r}|{timezone}".encode()).hexdigest()
+
+
+def _sun_times_cache_path(station: str) -> str:
+    """Fichier de cache d'une station (nom lisible suivi d'un hachage du nom exact)."""
+    slug = re.sub(r'[^\w-]+', '_', station.strip()) or 'station'
+    return os.path.join(SUN_TIMES_CACHE_DIR, f"{slug}_{hashlib.sha1(station.encode()).hexdigest()[:8]}.npz")
+
+
+def _load_sun_times(station: str, fingerprint: str) -> Optional[Dict[str, np.ndarray]]:
+    """Lit le cache d'une station; None s'il est absent, illisible ou calculé avec d'autres coordonnées."""
+    path = _sun_times_cache_path(station)
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as cached:
+            if str(cached['fingerprint']) != fingerprint:
+                return None
+            return {key: cached[key] for key in ('dates', 'sunrise', 'sunset', 'fixed')}
+    except (OSError, ValueError, KeyError) as e:
+        warnings.warn(f"Cache des heures du soleil illisible pour {station} ({path}): {e}")
+        return None
+
+
+def _store_sun_times(station: str, fingerprint: str, dates: np.ndarray, sunrise: np.ndarray,
+                     sunset: np.ndarray, fixed: np.ndarray):
+    """
+    Ajoute des jours au cache d'une station (les jours déjà présents sont conservés) et l'écrit
+    de façon atomique (fichier temporaire puis remplacement).
+    """
+    with _SUN_TIMES_CACHE_LOCK:
+        cached = _load_sun_times(station, fingerprint)
+        if cached is not None:
+            new_days = ~np.isin(dates, cached['dates'])
+            dates = np.concatenate([cached['dates'], dates[new_days]])
+            sunrise = np.concatenate([cached['sunrise'], sunrise[new_days]])
+            sunset = np.concatenate([cached['sunset'], sunset[new_days]])
+            fixed = np.concatenate([cached['fixed'], fixed[new_days]])
+        order = np.argsort(dates, kind='stable')
+
+        os.makedirs(SUN_TIMES_CACHE_DIR, exist_ok=True)
+        path = _sun_times_cache_path(station)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, 'wb') as file:
+                np.savez(file, fingerprint=np.array(fingerprint), dates=dates[order], sunrise=sunrise[order],
+                         sunset=sunset[order], fixed=fixed[order])
+            os.replace(temp_path, path)
+        except OSError as e:
+            warnings.warn(f"Cache des heures du soleil non enregistré pour {station}: {e}")
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+
+
+def _cached_sun_times(days: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Comme _compute_sun_times, mais en lisant d'abord le cache de chaque station en bloc: seuls les
+    jours absents du cache sont calculés, puis ajoutés au cache.
+    """
+    sunrise = np.full(len(days), np.datetime64('NaT'), dtype='datetime64[ns]')
+    sunset = sunrise.copy()
+    fixed = np.zeros(len(days), dtype=bool)
+    missing = np.ones(len(days), dtype=bool)
+    day_values = days['Date_UTC_Naive'].to_numpy(dtype='datetime64[D]')
+
+    fingerprints = {}
+    for station, positions in days.groupby('Station', sort=False).indices.items():
+        first = days.iloc[positions[0]]
+        fingerprints[station] = _sun_times_fingerprint(first['Lat'], first['Long'], first['Timezone'])
+        cached = _load_sun_times(station, fingerprints[station])
+        if cached is None or len(cached['dates']) == 0:
+            continue
+        slots = np.searchsorted(cached['dates'], day_values[positions])
+        slots_clipped = np.minimum(slots, len(cached['dates']) - 1)
+        hits = cached['dates'][slots_clipped] == day_values[positions]
+        sunrise[positions[hits]] = cached['sunrise'][slots_clipped[hits]]
+        sunset[positions[hits]] = cached['sunset'][slots_clipped[hits]]
+        fixed[positions[hits]] = cached['fixed'][slots_clipped[hits]]
+        missing[positions[hits]] = False
+
+    if missing.any():
+        to_compute = np.flatnonzero(missing)
+        computed = _compute_sun_times(days.iloc[to_compute])
+        sunrise[to_compute], sunset[to_compute], fixed[to_compute] = computed
+        computed_stations = days['Station'].to_numpy()[to_compute]
+        for station in pd.unique(computed_stations):
+            rows = computed_stations == station
+            _store_sun_times(station, fingerprints[station], day_values[to_compute][rows],
+                             computed[0][rows], computed[1][rows], computed[2][rows])
+
+    return sunrise, sunset, fixed
+
+
+def _calculate_astral_data(df: pd.DataFrame, df_gps: pd.DataFrame, use_cache: bool = True) -> pd.DataFrame:
+    """
+    Calcule le lever, le coucher du soleil et la durée du jour pour chaque couple (station, jour),
+    en une seule évaluation vectorisée des équations NOAA (voir solar_event_times). Le résultat a
+    les mêmes colonnes et valeurs (à SOLAR_ENGINE_TOLERANCE_SECONDS près) que le calcul Astral
+    de référence (_calculate_astral_data_reference).
+
+    Args:
+        use_cache: Lit et complète le cache par station (SUN_TIMES_CACHE_DIR): seuls les jours absents
+                   du cache sont calculés.
+    """
+    required_gps_cols = ['Station', 'Lat', 'Long', 'Timezone']
+    if not all(col in df_gps.columns for col in required_gps_cols):
+        raise ValueError(
+            str(_l("df_gps doit contenir les colonnes %s. Colonnes actuelles dans df_gps : %s") % \
+            (required_gps_cols, df_gps.columns.tolist()))
+        )
+
+    df_gps_unique = df_gps.drop_duplicates(subset=['Station'], keep='first').copy()
+    if len(df_gps) > len(df_gps_unique):
+        warnings.warn(str(_l("Suppression de %d doublons dans df_gps (en gardant la première occurrence).") % (len(df_gps) - len(df_gps_unique))))
+
+    df_days = pd.DataFrame({
+        'Station': df['Station'].to_numpy(),
+        'Date_UTC_Naive': df.index.normalize().tz_localize(None) if isinstance(df.index, pd.DatetimeIndex)
+                          else df['Datetime'].dt.normalize().dt.tz_localize(None).to_numpy(),
+    }).drop_duplicates()
+    df_days['Station'] = df_days['Station'].astype(object)
+    astral_df = pd.merge(df_days, df_gps_unique[required_gps_cols], on='Station', how='left')
+
+    # Sites sans coordonnées ou au fuseau horaire inconnu: indicateur jour/nuit fixe
+    usable = astral_df[['Lat', 'Long', 'Timezone']].notna().all(axis=1)
+    for tz_name in astral_df.loc[usable, 'Timezone'].unique():
+        try:
+            pytz.timezone(tz_name)
+        except pytz.UnknownTimeZoneError:
+            usable &= astral_df['Timezone'] != tz_name
+    for station_name in astral_df.loc[~usable, 'Station'].unique():
+        warnings.warn(str(_l("Coordonnées ou Fuseau horaire manquants/invalides pour le site '%s'. Indicateur jour/nuit fixe sera utilisé.") % station_name))
+
+    sunrise = np.full(len(astral_df), np.datetime64('NaT'), dtype='datetime64[ns]')
+    sunset = sunrise.copy()
+    fixed = ~usable.to_numpy()
+    if usable.any():
+        usable_rows = np.flatnonzero(usable.to_numpy())
+        compute = _cached_sun_times if use_cache else _compute_sun_times
+        sunrise[usable_rows], sunset[usable_rows], fixed[usable_rows] = compute(astral_df.iloc[usable_rows])
+
+    sunrise = pd.Series(sunrise, index=astral_df.index).dt.tz_localize('UTC')
+    sunset = pd.Series(sunset, index=astral_df.index).dt.tz_localize('UTC')
+    duration_hours = (sunset - sunrise).dt.total_seconds() / 3600
+    return pd.DataFrame({
+        'Station': astral_df['Station'],
+        'Date_UTC_Naive': astral_df['Date_UTC_Naive'],
+        'sunrise_time_utc_calc': sunrise,
+        'sunset_time_utc_calc': sunset,
+        'Daylight_Duration_h_calc': duration_hours.where(duration_hours > 0),
+        'fixed_daylight_applied': fixed,
+    })
+
+
+
+def verify_solar_engine_against_astral(df_gps: pd.DataFrame, start: str = '2015-01-01', days: int = 3650,
+                                       tolerance_seconds: float = SOLAR_ENGINE_TOLERANCE_SECONDS) -> Dict:
+    """
+    Vérifie que le moteur vectorisé (_calculate_astral_data) reproduit le calcul Astral de référence
+    pour toutes les stations de df_gps sur `days` jours à partir de `start`, et mesure les deux durées.
+
+    Returns:
+        Dictionnaire {'pairs', 'max_sunrise_diff_s', 'max_sunset_diff_s', 'fixed_mismatches',
+                      'vectorized_seconds', 'astral_seconds', 'speedup', 'passed'}
+    Raises:
+        AssertionError: Si un écart dépasse tolerance_seconds ou si les jours en indicateur fixe diffèrent.
+    """
+    stations = df_gps['Station'].dropna().unique()
+    dates = pd.date_range(start, periods=days, freq='D', tz='UTC')
+    df = pd.DataFrame({'Station': np.repeat(stations, len(dates))},
+                      index=pd.DatetimeIndex(np.tile(dates.to_numpy(), len(stations)), name='Datetime'))
+
+    start_time = time.perf_counter()
+    vectorized = _calculate_astral_data(df, df_gps, use_cache=False)
+    vectorized_seconds = time.perf_counter() - start_time
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        start_time = time.perf_counter()
+        reference = _calculate_astral_data_reference(df, df_gps)
+        astral_seconds = time.perf_counter() - start_time
+
+    compared = vectorized.merge(reference, on=['Station', 'Date_UTC_Naive'], suffixes=('', '_astral'))
+    sunrise_diff = (compared['sunrise_time_utc_calc'] - pd.to_datetime(compared['sunrise_time_utc_calc_astral'], utc=True)).dt.total_seconds().abs()
+    sunset_diff = (compared['sunset_time_utc_calc'] - pd.to_datetime(compared['sunset_time_utc_calc_astral'], utc=True)).dt.total_seconds().abs()
+    result = {
+        'pairs': len(compared),
+        'max_sunrise_diff_s': float(sunrise_diff.max()) if sunrise_diff.notna().any() else 0.0,
+        'max_sunset_diff_s': float(sunset_diff.max()) if sunset_diff.notna().any() else 0.0,
+        'fixed_mismatches': int((compared['fixed_daylight_applied'] != compared['fixed_daylight_applied_astral'].astype(bool)).sum()),
+        'vectorized_seconds': vectorized_seconds,
+        'astral_seconds': astral_seconds,
+        'speedup': astral_seconds / vectorized_seconds if vectorized_seconds > 0 else float('inf'),
+    }
+    result['passed'] = (len(compared) == len(reference) and result['fixed_mismatches'] == 0
+                        and result['max_sunrise_diff_s'] <= tolerance_seconds
+                        and result['max_sunset_diff_s'] <= tolerance_seconds)
+    print(f"Moteur solaire: {result['pairs']} couples station/jour, écart max lever {result['max_sunrise_diff_s']:.3f} s, "
+          f"coucher {result['max_sunset_diff_s']:.3f} s; {vectorized_seconds:.3f} s contre {astral_seconds:.2f} s "
+          f"avec Astral (x{result['speedup']:.0f})")
+    assert result['passed'], f"Le moteur vectorisé s'écarte d'Astral au-delà de {tolerance_seconds} s: {result}"
+    return result
 
-def _calculate_astral_data(df: pd.DataFrame, df_gps: pd.DataFrame) -> pd.DataFrame:
-    """Calculates sunrise, sunset, and daylight duration using Astral."""
+
+def _calculate_astral_data_reference(df: pd.DataFrame, df_gps: pd.DataFrame) -> pd.DataFrame:
+    """
+    Calcul de référence, jour par jour avec Astral (une boucle Python par couple station/jour).
+    Conservé pour vérifier le moteur vectorisé (verify_solar_engine_against_astral).
+    """
     required_gps_cols = ['Station', 'Lat', 'Long', 'Timezone']
     if not all(col in df_gps.columns for col in required_gps_cols):
         raise ValueError(
@@ -4010,26 +4577,37 @@ def _collect_missing_ranges_for_df(df: pd.DataFrame, numerical_cols_to_check: li
     """
     Collects missing ranges for a given DataFrame across stations and variables,
     applying the specified time formatting and duration calculation, and includes unit and count.
+
+    Toutes les stations et variables sont encodées en une passe (encode_missing_runs); start_time et
+    end_time sont des horodatages arrondis à la résolution du format d'origine (voir _get_missing_ranges
+    pour la version texte).
     """
-    all_missing_ranges_list = []
-    for station_name, group in df.groupby('Station'):
-        for var in numerical_cols_to_check:
-            if var in group.columns:
-                all_missing_ranges_list.extend(_get_missing_ranges(group[var], station_name, var, time_format_info))
-
-    df_missing_ranges = pd.DataFrame(all_missing_ranges_list)
-    if not df_missing_ranges.empty:
-        df_missing_ranges = df_missing_ranges.sort_values(by=['station', 'variable', 'start_time'])
-    else:
-        # Ensure 'duration', 'unit', and 'count' columns are present even if empty
-        df_missing_ranges = pd.DataFrame(columns=['station', 'variable', 'start_time', 'end_time', 'duration', 'unit', 'count'])
-    return df_missing_ranges
+    variables = [var for var in numerical_cols_to_check if var in df.columns]
+    if df.empty or not variables or 'Station' not in df.columns:
+        return pd.DataFrame(columns=MISSING_RANGES_COLUMNS)
+
+    # Lignes regroupées par station en conservant leur ordre, comme un groupby
+    station_codes, station_names = pd.factorize(df['Station'])
+    order = np.argsort(station_codes, kind='stable')
+    order = order[station_codes[order] >= 0]
+    sorted_codes = station_codes[order]
+    segment_starts = np.flatnonzero(np.diff(sorted_codes, prepend=-1) != 0)
+
+    columns, starts, ends = encode_missing_runs(df[variables].isna().to_numpy()[order], segment_starts)
+    if len(starts) == 0:
+        return pd.DataFrame(columns=MISSING_RANGES_COLUMNS)
+
+    index = pd.DatetimeIndex(df.index)[order]
+    df_missing_ranges = _missing_ranges_frame(
+        np.asarray(station_names, dtype=object)[sorted_codes[starts]], np.asarray(variables, dtype=object)[columns],
+        index[starts], index[ends], ends - starts + 1, time_format_info)
+    return df_missing_ranges.sort_values(by=['station', 'variable', 'start_time']).reset_index(drop=True)
 
 def _interpolate_data_by_station(df: pd.DataFrame, numerical_cols_to_interpolate: list) -> pd.DataFrame:
     """Applies interpolation logic to data, grouped by station."""
     df_interpolated = df.copy()
 
-    for station_name, group in df_interpolated.groupby('Station'):
+    for station_name, group in df_interpolated.groupby('Station', observed=True):
         if 'Station' in group.columns:
             group_copy_for_interp = group.drop(columns=['Station']).copy()
         else:
@@ -4075,7 +4653,67 @@ def _drop_derived_columns(df: pd.DataFrame) -> pd.DataFrame:
 
     return df_cleaned
 
-def interpolation(df: pd.DataFrame, limits: dict, df_gps: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+# Version des traitements d'interpolation(): à incrémenter à toute modification qui change leurs
+# résultats, afin que chaque station soit retraitée entièrement (voir pipeline.process_station)
+INTERPOLATION_ALGORITHM_VERSION = 1
+
+INTERPOLATION_NUMERICAL_COLUMNS = [
+    'Air_Temp_Deg_C', 'Rel_H_%', 'BP_mbar_Avg',
+    'Rain_01_mm', 'Rain_02_mm', 'Rain_mm', 'Wind_Sp_m/sec',
+    'Solar_R_W/m^2', 'Wind_Dir_Deg', 'BP_mbar_Avg'
+]
+
+
+def _time_format_info(df: pd.DataFrame) -> dict:
+    """Format temporel d'origine des données (détermine l'unité des plages manquantes)."""
+    return {
+        'has_ymdh_columns': all(col in df.columns for col in ['Year', 'Month', 'Day', 'Hour', 'Minute']),
+        'has_date_column': 'Date' in df.columns
+    }
+
+
+def find_reprocessing_anchor(df_before: pd.DataFrame, new_data_start: pd.Timestamp,
+                             time_format_info: dict) -> Optional[pd.Timestamp]:
+    """
+    Cherche, dans une fenêtre traitée par interpolation() (sortie 'avant interpolation' d'une seule
+    station), la ligne à partir de laquelle les résultats sont identiques à ceux de l'historique
+    complet: la dernière ligne A antérieure ou égale à `new_data_start` telle que
+    - la ligne précédente a toutes les variables renseignées (aucune plage manquante ne traverse A,
+      et l'interpolation après A ne dépend que de valeurs de la fenêtre);
+    - la dernière ligne de jour avant A a une radiation solaire renseignée (interpolée de jour à jour);
+    - la ligne précédente tombe dans une autre unité de temps des plages manquantes (minute, jour ou
+      seconde), afin que les plages arrondies avant et après A ne se confondent pas.
+
+    Returns:
+        Horodatage de A, ou None si la fenêtre ne contient aucun point de reprise
+    """
+    columns = [col for col in dict.fromkeys(INTERPOLATION_NUMERICAL_COLUMNS) if col in df_before.columns]
+    if len(df_before) < 2 or not columns:
+        return None
+    times = pd.DatetimeIndex(df_before.index)
+    resolution = _missing_range_unit(time_format_info)[1]
+
+    candidate = np.zeros(len(df_before), dtype=bool)
+    all_present = df_before[columns].notna().all(axis=1).to_numpy()
+    floors = times.floor(resolution).asi8
+    candidate[1:] = all_present[:-1] & (floors[:-1] < floors[1:])
+    candidate &= np.asarray(times <= new_data_start)
+
+    if 'Solar_R_W/m^2' in columns and 'Is_Daylight' in df_before.columns:
+        is_day = df_before['Is_Daylight'].fillna(False).to_numpy(dtype=bool)
+        solar_present = df_before['Solar_R_W/m^2'].notna().to_numpy()
+        positions = np.arange(len(df_before))
+        # Dernière ligne de jour strictement avant chaque ligne (-1 s'il n'y en a pas)
+        last_day = np.maximum.accumulate(np.where(is_day, positions, -1))
+        last_day_before = np.concatenate([[-1], last_day[:-1]])
+        candidate &= (last_day_before >= 0) & solar_present[np.maximum(last_day_before, 0)]
+
+    positions = np.flatnonzero(candidate)
+    return times[positions[-1]] if len(positions) else None
+
+
+def interpolation(df: pd.DataFrame, limits: dict, df_gps: pd.DataFrame,
+                  processing_params: Optional[Dict] = None) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
     """
     Performs data cleaning, limit application, outlier treatment, and interpolation of meteorological data.
     Returns four DataFrames:
@@ -4089,6 +4727,12 @@ def interpolation(df: pd.DataFrame, limits: dict, df_gps: pd.DataFrame) -> tuple
         limits (dict): Dictionary defining value limits for each variable.
         df_gps (pd.DataFrame): DataFrame containing station information
                                ('Station', 'Lat', 'Long', 'Timezone' columns).
+        processing_params (dict, optional): Paramètres dépendant de tout l'historique de la station:
+                               'rain_mm_created' (Rain_mm recréée à partir des deux capteurs) et
+                               'outlier_bounds' (bornes IQR par variable, voir traiter_outliers_meteo).
+                               Les paramètres présents sont réutilisés tels quels, afin qu'une fenêtre
+                               de données soit traitée comme dans l'historique complet; les absents
+                               sont calculés puis ajoutés au dictionnaire.
 
     Returns:
         tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
@@ -4098,26 +4742,24 @@ def interpolation(df: pd.DataFrame, limits: dict, df_gps: pd.DataFrame) -> tuple
             - The fourth is a DataFrame summarizing missing ranges AFTER interpolation.
     """
 
-    numerical_cols = [
-        'Air_Temp_Deg_C', 'Rel_H_%', 'BP_mbar_Avg',
-        'Rain_01_mm', 'Rain_02_mm', 'Rain_mm', 'Wind_Sp_m/sec',
-        'Solar_R_W/m^2', 'Wind_Dir_Deg', 'BP_mbar_Avg'
-    ]
+    numerical_cols = list(INTERPOLATION_NUMERICAL_COLUMNS)
 
-    time_format_info = {
-        'has_ymdh_columns': all(col in df.columns for col in ['Year', 'Month', 'Day', 'Hour', 'Minute']),
-        'has_date_column': 'Date' in df.columns
-    }
+    time_format_info = _time_format_info(df)
 
     df_initial_clean = _validate_and_clean_dataframe(df)
     if df_initial_clean.empty:
         return (pd.DataFrame(), pd.DataFrame(),
-                pd.DataFrame(columns=['station', 'variable', 'start_time', 'end_time', 'duration', 'unit', 'count']),
-                pd.DataFrame(columns=['station', 'variable', 'start_time', 'end_time', 'duration', 'unit', 'count']))
+                pd.DataFrame(columns=MISSING_RANGES_COLUMNS), pd.DataFrame(columns=MISSING_RANGES_COLUMNS))
 
     df_limited = _apply_limits_and_coercions(df_initial_clean, limits, numerical_cols)
 
-    if 'Rain_mm' not in df_limited.columns or df_limited['Rain_mm'].isnull().all():
+    if processing_params is not None and 'rain_mm_created' in processing_params:
+        create_rain = processing_params['rain_mm_created']
+    else:
+        create_rain = 'Rain_mm' not in df_limited.columns or bool(df_limited['Rain_mm'].isnull().all())
+        if processing_params is not None:
+            processing_params['rain_mm_created'] = create_rain
+    if create_rain:
         df_limited = create_rain_mm(df_limited)
         warnings.warn(str(_l("Colonne Rain_mm créée à partir des deux capteurs (pré-interpolation).")))
 
@@ -4128,7 +4770,9 @@ def interpolation(df: pd.DataFrame, limits: dict, df_gps: pd.DataFrame) -> tuple
 
     df_before_interpolation = df_pre_outlier_treatment.copy()
 
-    df_after_outlier_treatment = traiter_outliers_meteo(df_pre_outlier_treatment, colonnes=numerical_cols, coef=1.5)
+    outlier_bounds = processing_params.setdefault('outlier_bounds', {}) if processing_params is not None else None
+    df_after_outlier_treatment = traiter_outliers_meteo(df_pre_outlier_treatment, colonnes=numerical_cols, coef=1.5,
+                                                        bornes=outlier_bounds)
     warnings.warn(str(_l("Outliers traités via 'capping' avant interpolation.")))
 
     numerical_cols_to_check_for_missing = [col for col in numerical_cols if col in df_before_interpolation.columns]
@@ -4139,8 +4783,9 @@ def interpolation(df: pd.DataFrame, limits: dict, df_gps: pd.DataFrame) -> tuple
 
     df_missing_ranges_after_interp = _collect_missing_ranges_for_df(df_fully_interpolated, numerical_cols_to_check_for_missing, time_format_info)
 
-    df_before_interpolation = _drop_derived_columns(df_before_interpolation)
-    df_after_interpolation = _drop_derived_columns(df_fully_interpolated)
+    # La fusion avec les données astronomiques ramène 'Station' en chaînes: types compacts rétablis
+    df_before_interpolation = apply_meteo_dtypes(_drop_derived_columns(df_before_interpolation))
+    df_after_interpolation = apply_meteo_dtypes(_drop_derived_columns(df_fully_interpolated))
 
     return df_before_interpolation, df_after_interpolation, df_missing_ranges_before_interp, df_missing_ranges_after_interp
 
@@ -4164,6 +4809,71 @@ from flask_babel import Babel, _, lazy_gettext as _l, get_locale as get_current_
         
          #Fin du code qui est juste avec les floats pousl es jours
 
+def summarize_station_chunks(chunks, variables: list = None) -> pd.DataFrame:
+    """
+    Calcule des statistiques descriptives en un seul passage sur une suite de DataFrames
+    (ex: db.iter_station_data_chunks), sans jamais réunir toute la série en mémoire.
+
+    Args:
+        chunks: Itérable de DataFrames indexés par Datetime.
+        variables: Colonnes à résumer; par défaut toutes les colonnes numériques du premier bloc.
+
+    Returns:
+        DataFrame indexé par variable: count, missing, mean, std, min, max, first_datetime, last_datetime.
+    """
+    accumulators = {}
+    first_datetime, last_datetime = None, None
+
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        if variables is None:
+            variables = [col for col in chunk.columns if pd.api.types.is_numeric_dtype(chunk[col])
+                         and not pd.api.types.is_bool_dtype(chunk[col])]
+        if isinstance(chunk.index, pd.DatetimeIndex):
+            chunk_min, chunk_max = chunk.index.min(), chunk.index.max()
+            first_datetime = chunk_min if first_datetime is None else min(first_datetime, chunk_min)
+            last_datetime = chunk_max if last_datetime is None else max(last_datetime, chunk_max)
+
+        for var in variables:
+            if var not in chunk.columns:
+                continue
+            values = pd.to_numeric(chunk[var], errors='coerce').to_numpy(dtype='float64')
+            valid = values[~np.isnan(values)]
+            acc = accumulators.setdefault(var, {'count': 0, 'missing': 0, 'mean': 0.0, 'm2': 0.0,
+                                                'min': np.inf, 'max': -np.inf})
+            acc['missing'] += len(values) - len(valid)
+            if len(valid):
+                # Fusion moyenne/variance par blocs (Chan et al.), stable même pour des séries
+                # à forte moyenne et faible dispersion (ex: pression en mbar)
+                n_chunk = len(valid)
+                mean_chunk = valid.mean()
+                m2_chunk = np.square(valid - mean_chunk).sum()
+                n_total = acc['count'] + n_chunk
+                delta = mean_chunk - acc['mean']
+                acc['mean'] += delta * n_chunk / n_total
+                acc['m2'] += m2_chunk + delta ** 2 * acc['count'] * n_chunk / n_total
+                acc['count'] = n_total
+                acc['min'] = min(acc['min'], valid.min())
+                acc['max'] = max(acc['max'], valid.max())
+
+    rows = {}
+    for var, acc in accumulators.items():
+        n = acc['count']
+        rows[var] = {
+            'count': n,
+            'missing': acc['missing'],
+            'mean': acc['mean'] if n else np.nan,
+            # Écart-type d'échantillon (ddof=1) comme pandas.Series.std
+            'std': np.sqrt(acc['m2'] / (n - 1)) if n > 1 else np.nan,
+            'min': acc['min'] if n else np.nan,
+            'max': acc['max'] if n else np.nan,
+            'first_datetime': first_datetime,
+            'last_datetime': last_datetime,
+        }
+    return pd.DataFrame.from_dict(rows, orient='index')
+
+
 def _calculate_rainy_season_stats_yearly(df_daily_rain_station: pd.DataFrame) -> pd.DataFrame:
     """
     Calcule les statistiques de la saison des pluies (début, fin, durée, moyenne) sur une base annuelle.
@@ -4444,7 +5154,8 @@ def generate_plot_stats_over_period_plotly(df: pd.DataFrame, variable: str, stat
             logger.warning(f"df_processed is empty after initial filtering for variable {variable}.")
             return go.Figure().add_annotation(x=0.5, y=0.5, text=_("Aucune donnée valide pour la période ou la variable sélectionnée."), showarrow=False, font=dict(size=16)).update_layout(title=_("Statistiques par période"))
 
-        df_processed[variable] = pd.to_numeric(df_processed[variable], errors='coerce')
+        # Les mesures sont stockées en float32; les cumuls et moyennes sur plusieurs années sont calculés en float64
+        df_processed[variable] = pd.to_numeric(df_processed[variable], errors='coerce').astype('float64')
         df_processed = df_processed.dropna(subset=[variable])
 
         if df_processed.empty:
@@ -5031,6 +5742,30 @@ def generate_plot_stats_over_period_plotly(df: pd.DataFrame, variable: str, stat
 ############# Fin du code fonctionnel pour  les statistiques  ##########################
 
 
+# Colonnes auxiliaires lues par une fonction de tracé, par variable tracée, en plus de la variable
+# (Is_Daylight restreint les statistiques de radiation solaire aux heures de jour réelles)
+PLOT_AUXILIARY_COLUMNS = {
+    generate_plot_stats_over_period_plotly: {'Solar_R_W/m^2': ['Is_Daylight']},
+}
+
+
+def plot_columns(plot_function, variables: list) -> list:
+    """
+    Colonnes à charger pour tracer `variables` avec `plot_function` (pour load_station_data(columns=...)).
+
+    Args:
+        plot_function: Fonction de tracé qui recevra les données
+        variables: Variables tracées
+    Returns:
+        Liste sans doublon: les variables puis les colonnes auxiliaires déclarées dans PLOT_AUXILIARY_COLUMNS
+    """
+    auxiliary = PLOT_AUXILIARY_COLUMNS.get(plot_function, {})
+    columns = list(variables)
+    for variable in variables:
+        columns.extend(auxiliary.get(variable, []))
+    return list(dict.fromkeys(columns))
+
+
 
 
 
@@ -5079,7 +5814,7 @@ def outliers_viz(df: pd.DataFrame, coef: float = 1.5) -> go.Figure:
     for col in numeric_cols:
         df_out[f'{col}_is_outlier'] = False
 
-    for station, group in df.groupby('Station'):
+    for station, group in df.groupby('Station', observed=True):
         for col in numeric_cols:
             if group[col].count() > 1:
                 Q1, Q3 = group[col].quantile([0.25, 0.75])
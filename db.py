@@ -4,9 +4,18 @@ import psycopg2
 from psycopg2 import sql
 from psycopg2.extras import execute_batch
 from dotenv import load_dotenv
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, NamedTuple
 import traceback
 import numpy as np # Assurez-vous que numpy est importé pour np.nan
+import hashlib
+import io
+import json
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from psycopg2 import pool as pg_pool
 
 
 def get_stations_list(processing_type: str = 'before') -> List[str]:
@@ -81,49 +90,36 @@ def delete_station_data(station: str, processing_type: str = 'after'):
         return False
 
 def reset_processed_data():
-    """Réinitialise toutes les données traitées (supprime toutes les tables dans after_processing)"""
+    """Réinitialise toutes les données traitées (supprime les tables de stations de la base 'after')"""
+    from config import STATIONS_BY_BASSIN
+    station_tables = sorted({name.strip() for names in STATIONS_BY_BASSIN.values() for name in names})
     try:
-        with get_connection('after_processing_db') as conn:
+        with db_connection('after') as conn:
             with conn.cursor() as cursor:
-                # Récupérer la liste de toutes les tables
+                # Récupérer la liste des tables de stations présentes
                 cursor.execute("""
                     SELECT table_name 
                     FROM information_schema.tables 
-                    WHERE table_schema = 'meteo'
-                """)
+                    WHERE table_schema = 'public' AND table_name = ANY(%s)
+                """, (station_tables,))
                 tables = cursor.fetchall()
                 
                 # Supprimer chaque table
                 for table in tables:
-                    cursor.execute(sql.SQL('DROP TABLE IF EXISTS meteo.{}').format(
+                    cursor.execute(sql.SQL('DROP TABLE IF EXISTS {}').format(
                         sql.Identifier(table[0])))
+
+                # Le catalogue ne doit plus annoncer de données pour ces stations
+                _ensure_station_catalog_table(cursor)
+                cursor.execute(sql.SQL('DELETE FROM {}').format(sql.Identifier(STATION_CATALOG_TABLE)))
                 
                 conn.commit()
                 return True
     except Exception as e:
         print(f"Erreur lors de la réinitialisation des données traitées: {e}")
         return False
-
-def check_data_exists(station: str, datetime_values: List, processing_type: str = 'before') -> List:
-    """Vérifie si des données existent déjà pour les dates données"""
-    db_name = 'before_processing_db' if processing_type == 'before' else 'after_processing_db'
-    table_name = station.replace(' ', '_').replace('-', '_')
-    
-    try:
-        with get_connection(db_name) as conn:
-            with conn.cursor() as cursor:
-                placeholders = ','.join(['%s'] * len(datetime_values))
-                query = f"""
-                    SELECT Datetime FROM meteo."{table_name}" 
-                    WHERE Datetime IN ({placeholders})
-                """
-                cursor.execute(query, datetime_values)
-                existing = cursor.fetchall()
-                return [row[0] for row in existing]
-    except Exception as e:
-        print(f"Erreur lors de la vérification des données existantes: {e}")
-        return []
-
+    finally:
+        invalidate_station_catalog('after')
 
 import os
 import pandas as pd
@@ -6860,8 +6856,10 @@ def get_stations_with_data(processing_type: str = 'before') -> Dict[str, List[st
     """
     Récupère un dictionnaire des bassins, avec une liste des stations non vides pour chaque bassin.
     Une station est considérée "non vide" si sa table correspondante contient des enregistrements.
+    La réponse provient du catalogue des stations (une requête, mise en cache), pas d'un
+    COUNT(*) par table.
     Args:
-        processing_type: 'before' ou 'after' pour choisir la base de données.
+        processing_type: 'raw', 'before' ou 'after' pour choisir la base de données.
     Returns:
         Dictionnaire {bassin: [station1, station2, ...]} des stations non vides.
     """
@@ -6872,60 +6870,24 @@ def get_stations_with_data(processing_type: str = 'before') -> Dict[str, List[st
     stations_by_bassin_with_data = {bassin: [] for bassin in STATIONS_BY_BASSIN.keys()}
     
     # Validation du processing_type
-    if processing_type not in ['raw', 'after']:
-        print(f"Erreur: Le 'processing_type' '{processing_type}' est invalide. Utilisez 'before' ou 'after'.")
+    if processing_type not in CATALOG_PROCESSING_TYPES:
+        print(f"Erreur: Le 'processing_type' '{processing_type}' est invalide. Utilisez 'raw', 'before' ou 'after'.")
         return {}
 
-    # PAS DE target_db_name_env_var ou os.getenv() ici pour la clé !
-    # On passe directement la clé courte à get_connection
-    db_key_for_connection = processing_type # <--- CHANGEMENT CLÉ ICI
-
-    conn = None # Initialiser conn à None
     try:
-        # Utilisez la fonction get_connection existante en lui passant la clé courte
-        conn = get_connection(db_key_for_connection) # <--- UTILISEZ LA CLÉ COURTE
-
-        if not conn:
-            print(f"Erreur: Impossible de se connecter à la base de données pour la clé '{db_key_for_connection}'")
-            return {}
-
-        cursor = conn.cursor()
+        catalog = get_station_catalog(processing_type)
 
         for bassin, stations_in_bassin in STATIONS_BY_BASSIN.items():
             for station_name in stations_in_bassin:
                 # Le nom de la table dans la DB est le nom exact de la station après strip()
-                table_name_in_db = station_name.strip()
-                
-                try:
-                    # Vérifier l'existence de la table
-                    cursor.execute(sql.SQL("""
-                        SELECT EXISTS (
-                            SELECT 1
-                            FROM information_schema.tables
-                            WHERE table_schema = 'public' AND table_name = {table_name}
-                        );
-                    """).format(table_name=sql.Literal(table_name_in_db)))
-
-                    table_exists = cursor.fetchone()[0]
-
-                    if table_exists:
-                        # Si la table existe, vérifier si elle contient des données
-                        # Utiliser sql.Identifier pour citer le nom de table car il peut contenir espaces/majuscules
-                        count_query = sql.SQL("SELECT COUNT(*) FROM {};").format(sql.Identifier(table_name_in_db))
-                        cursor.execute(count_query)
-                        count = cursor.fetchone()[0]
-
-                        if count > 0:
-                            stations_by_bassin_with_data[bassin].append(station_name)
-                    
-                except psycopg2.Error as e_table:
-                    print(f"Erreur lors de la vérification de la table '{table_name_in_db}' dans la base de données '{db_key_for_connection}': {e_table}")
-                    continue
+                entry = catalog.get(station_name.strip())
+                if entry and entry['row_count'] > 0:
+                    stations_by_bassin_with_data[bassin].append(station_name)
 
         for bassin in stations_by_bassin_with_data:
             stations_by_bassin_with_data[bassin].sort()
 
-    except ValueError as ve: # Capture spécifiquement l'erreur de get_connection
+    except ValueError as ve: # Capture spécifiquement l'erreur de configuration de la base
         print(f"Erreur de configuration de la base de données: {ve}")
         traceback.print_exc()
     except psycopg2.Error as e:
@@ -6934,9 +6896,6 @@ def get_stations_with_data(processing_type: str = 'before') -> Dict[str, List[st
     except Exception as e:
         print(f"Erreur inattendue dans get_stations_with_data: {e}")
         traceback.print_exc()
-    finally:
-        if conn:
-            conn.close()
 
     return stations_by_bassin_with_data
 
@@ -7054,6 +7013,522 @@ def get_connection(db_key: str):
         print(f"Erreur de connexion à la base de données '{db_name}': {e}")
         raise # Relaisser l'exception pour que l'appelant la gère
 
+# Configuration des pools de connexions (une instance par clé de base et par processus)
+DB_POOL_CONFIG = {
+    'minconn': int(os.getenv('DB_POOL_MINCONN', 1)),
+    'maxconn': int(os.getenv('DB_POOL_MAXCONN', 8)),
+    'checkout_timeout': float(os.getenv('DB_POOL_CHECKOUT_TIMEOUT', 30)), # secondes d'attente max d'une connexion libre
+    'healthcheck_after': float(os.getenv('DB_POOL_HEALTHCHECK_AFTER', 30)) # inactivité (s) au-delà de laquelle on vérifie la connexion
+}
+
+
+class StationConnectionPool:
+    """
+    Pool de connexions pour une base (clé de DB_NAMES), borné à `maxconn` connexions.
+    Les connexions sont vérifiées au moment de l'emprunt si elles sont restées inactives trop longtemps,
+    et remplacées si elles sont cassées.
+    """
+
+    def __init__(self, db_key: str, minconn: int, maxconn: int, checkout_timeout: float, healthcheck_after: float):
+        db_name = DB_NAMES.get(db_key)
+        if not db_name:
+            raise ValueError(f"Clé de base de données inconnue ou non configurée: '{db_key}'. "
+                             f"Clés disponibles: {list(DB_NAMES.keys())}")
+
+        config = DB_CONFIG.copy()
+        config['database'] = db_name
+
+        self.db_key = db_key
+        self.maxconn = maxconn
+        self.checkout_timeout = checkout_timeout
+        self.healthcheck_after = healthcheck_after
+        self._pool = pg_pool.ThreadedConnectionPool(minconn, maxconn, **config)
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self._last_used = {}
+        self.metrics = {
+            'checkouts': 0,
+            'in_use': 0,
+            'timeouts': 0,
+            'healthcheck_failures': 0,
+            'replaced_connections': 0,
+            'total_wait_seconds': 0.0,
+            'max_wait_seconds': 0.0,
+        }
+
+    def _is_healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+        last_used = self._last_used.get(id(conn))
+        if last_used is not None and time.monotonic() - last_used < self.healthcheck_after:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            if not conn.autocommit:
+                conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self):
+        wait_start = time.monotonic()
+        if not self._slots.acquire(timeout=self.checkout_timeout):
+            with self._lock:
+                self.metrics['timeouts'] += 1
+            raise pg_pool.PoolError(f"Aucune connexion libre pour '{self.db_key}' après {self.checkout_timeout}s "
+                                    f"(taille maximale: {self.maxconn}).")
+        try:
+            conn = self._pool.getconn()
+            if not self._is_healthy(conn):
+                with self._lock:
+                    self.metrics['healthcheck_failures'] += 1
+                    self.metrics['replaced_connections'] += 1
+                self._last_used.pop(id(conn), None)
+                self._pool.putconn(conn, close=True)
+                conn = self._pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+
+        waited = time.monotonic() - wait_start
+        with self._lock:
+            self.metrics['checkouts'] += 1
+            self.metrics['in_use'] += 1
+            self.metrics['total_wait_seconds'] += waited
+            self.metrics['max_wait_seconds'] = max(self.metrics['max_wait_seconds'], waited)
+        return conn
+
+    def putconn(self, conn):
+        try:
+            broken = bool(conn.closed)
+            if not broken:
+                try:
+                    # Remettre la connexion dans un état neutre avant de la rendre au pool
+                    conn.rollback()
+                    conn.autocommit = False
+                except psycopg2.Error:
+                    broken = True
+            if broken:
+                self._last_used.pop(id(conn), None)
+            else:
+                self._last_used[id(conn)] = time.monotonic()
+            self._pool.putconn(conn, close=broken)
+        finally:
+            with self._lock:
+                self.metrics['in_use'] -= 1
+            self._slots.release()
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            metrics = dict(self.metrics)
+        metrics['maxconn'] = self.maxconn
+        metrics['idle'] = len(self._pool._pool)
+        metrics['open_connections'] = len(self._pool._used) + len(self._pool._pool)
+        return metrics
+
+    def closeall(self):
+        self._pool.closeall()
+
+
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+_POOLS_PID = os.getpid()
+
+
+def _get_pool(db_key: str) -> StationConnectionPool:
+    """Retourne (en le créant au besoin) le pool de la clé donnée pour le processus courant."""
+    global _POOLS_PID
+    with _POOLS_LOCK:
+        if _POOLS_PID != os.getpid():
+            # Processus forké (ex: worker gunicorn): les sockets du parent ne doivent pas être réutilisées
+            _POOLS.clear()
+            _POOLS_PID = os.getpid()
+        if db_key not in _POOLS:
+            _POOLS[db_key] = StationConnectionPool(db_key, **DB_POOL_CONFIG)
+        return _POOLS[db_key]
+
+
+@contextmanager
+def db_connection(db_key: str):
+    """
+    Emprunte une connexion au pool de la base `db_key` et la rend automatiquement en sortie de bloc.
+
+    Exemple:
+        with db_connection('after') as conn:
+            df = pd.read_sql(query, conn)
+
+    Raises:
+        ValueError: Si la clé de base de données est inconnue.
+        psycopg2.pool.PoolError: Si aucune connexion ne se libère avant le délai configuré.
+    """
+    pool = _get_pool(db_key)
+    conn = pool.getconn()
+    try:
+        yield conn
+    finally:
+        pool.putconn(conn)
+
+
+def get_pool_metrics() -> Dict[str, Dict]:
+    """Retourne les métriques des pools de connexions du processus courant, par clé de base."""
+    with _POOLS_LOCK:
+        pools = dict(_POOLS) if _POOLS_PID == os.getpid() else {}
+    return {db_key: pool.snapshot() for db_key, pool in pools.items()}
+
+
+def close_all_pools():
+    """Ferme toutes les connexions des pools du processus courant."""
+    with _POOLS_LOCK:
+        for pool in _POOLS.values():
+            pool.closeall()
+        _POOLS.clear()
+
+
+############################ Catalogue des stations ############################
+# Une table 'station_catalog' par base de séries temporelles (raw, before, after) tient, pour
+# chaque table de station, le nombre de lignes et l'étendue temporelle. Elle est mise à jour
+# par les écritures (save_to_database, réinitialisation) et lue en une seule requête.
+
+CATALOG_PROCESSING_TYPES = ('raw', 'before', 'after')
+STATION_CATALOG_TABLE = 'station_catalog'
+STATION_CATALOG_TTL = float(os.getenv('STATION_CATALOG_TTL', 60)) # secondes de validité du cache
+
+_CATALOG_CACHE = {} # processing_type -> (instant de lecture, catalogue)
+_CATALOG_CACHE_LOCK = threading.Lock()
+
+
+def _ensure_station_catalog_table(cursor):
+    """Crée la table du catalogue si elle n'existe pas encore dans la base courante."""
+    cursor.execute(sql.SQL("""
+        CREATE TABLE IF NOT EXISTS {} (
+            station_table varchar(255) PRIMARY KEY,
+            row_count bigint NOT NULL DEFAULT 0,
+            first_datetime timestamp,
+            last_datetime timestamp,
+            updated_at timestamptz NOT NULL DEFAULT now()
+        )
+    """).format(sql.Identifier(STATION_CATALOG_TABLE)))
+
+
+def refresh_station_catalog(conn, table_name: str):
+    """
+    Recalcule l'entrée du catalogue d'une table de station (nombre de lignes, premier et dernier
+    horodatage) dans la base de la connexion fournie. Appelée après chaque écriture sur la table.
+    """
+    with conn.cursor() as cursor:
+        _ensure_station_catalog_table(cursor)
+        # "Datetime" est stocké en texte sur les tables existantes: le cast rend MIN/MAX chronologiques
+        cursor.execute(sql.SQL("""
+            INSERT INTO {catalog} (station_table, row_count, first_datetime, last_datetime, updated_at)
+            SELECT %s, COUNT(*), MIN("Datetime"::text::timestamp), MAX("Datetime"::text::timestamp), now()
+            FROM {table}
+            ON CONFLICT (station_table) DO UPDATE SET
+                row_count = EXCLUDED.row_count,
+                first_datetime = EXCLUDED.first_datetime,
+                last_datetime = EXCLUDED.last_datetime,
+                updated_at = EXCLUDED.updated_at
+        """).format(catalog=sql.Identifier(STATION_CATALOG_TABLE), table=sql.Identifier(table_name)),
+            (table_name,))
+    if not conn.autocommit:
+        conn.commit()
+
+
+def invalidate_station_catalog(processing_type: Optional[str] = None):
+    """Vide le cache du catalogue pour un type de traitement (ou pour tous si None)."""
+    with _CATALOG_CACHE_LOCK:
+        if processing_type is None:
+            _CATALOG_CACHE.clear()
+        else:
+            _CATALOG_CACHE.pop(processing_type, None)
+
+
+def get_station_catalog(processing_type: str = 'after', use_cache: bool = True) -> Dict[str, Dict]:
+    """
+    Retourne le catalogue des tables de stations d'une base en une seule requête.
+    Les tables présentes en base mais encore absentes du catalogue (créées avant son introduction)
+    y sont ajoutées une fois, puis servies depuis le catalogue.
+
+    Args:
+        processing_type: 'raw', 'before' ou 'after'.
+        use_cache: Si True, réutilise le résultat en mémoire pendant STATION_CATALOG_TTL secondes.
+    Returns:
+        Dictionnaire {nom de table: {'row_count', 'first_datetime', 'last_datetime'}}.
+    """
+    if processing_type not in CATALOG_PROCESSING_TYPES:
+        raise ValueError(f"Type de traitement '{processing_type}' sans catalogue. Utilisez {CATALOG_PROCESSING_TYPES}.")
+
+    if use_cache:
+        with _CATALOG_CACHE_LOCK:
+            cached = _CATALOG_CACHE.get(processing_type)
+        if cached and time.monotonic() - cached[0] < STATION_CATALOG_TTL:
+            return cached[1]
+
+    from config import STATIONS_BY_BASSIN
+    station_tables = sorted({name.strip() for names in STATIONS_BY_BASSIN.values() for name in names})
+
+    catalog_query = sql.SQL("""
+        SELECT c.relname, cat.row_count, cat.first_datetime, cat.last_datetime
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace AND n.nspname = 'public'
+        LEFT JOIN {catalog} cat ON cat.station_table = c.relname
+        WHERE c.relkind = 'r' AND c.relname = ANY(%s)
+    """).format(catalog=sql.Identifier(STATION_CATALOG_TABLE))
+
+    catalog = {}
+    with db_connection(processing_type) as conn:
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            _ensure_station_catalog_table(cursor)
+            cursor.execute(catalog_query, (station_tables,))
+            rows = cursor.fetchall()
+
+        uncatalogued = [table for table, row_count, _, _ in rows if row_count is None]
+        for table in uncatalogued:
+            refresh_station_catalog(conn, table)
+        if uncatalogued:
+            logging.info(f"Catalogue '{processing_type}': {len(uncatalogued)} table(s) ajoutée(s): {uncatalogued}")
+            with conn.cursor() as cursor:
+                cursor.execute(catalog_query, (station_tables,))
+                rows = cursor.fetchall()
+
+    for table, row_count, first_datetime, last_datetime in rows:
+        catalog[table] = {'row_count': row_count or 0,
+                          'first_datetime': first_datetime,
+                          'last_datetime': last_datetime}
+
+    with _CATALOG_CACHE_LOCK:
+        _CATALOG_CACHE[processing_type] = (time.monotonic(), catalog)
+    return catalog
+
+
+############################ Registre des fichiers ingérés ############################
+# Une table 'ingestion_ledger' par base de séries temporelles mémorise chaque fichier ingéré
+# (empreinte SHA-256 du contenu, station, étendue temporelle, nombre de lignes). Un fichier
+# identique n'est pas réingéré, et les lignes d'un nouveau fichier déjà couvertes par l'étendue
+# d'un fichier précédent de la station ne sont pas réécrites.
+
+INGESTION_LEDGER_TABLE = 'ingestion_ledger'
+
+
+def _ensure_ingestion_ledger_table(cursor):
+    """Crée la table du registre des fichiers ingérés si elle n'existe pas encore dans la base courante."""
+    cursor.execute(sql.SQL("""
+        CREATE TABLE IF NOT EXISTS {} (
+            station varchar(255) NOT NULL,
+            file_hash char(64) NOT NULL,
+            filename text,
+            span_start timestamp,
+            span_end timestamp,
+            rows_read bigint NOT NULL DEFAULT 0,
+            rows_saved bigint NOT NULL DEFAULT 0,
+            rows_inserted bigint,
+            method varchar(16),
+            ingested_at timestamptz NOT NULL DEFAULT now(),
+            PRIMARY KEY (station, file_hash)
+        )
+    """).format(sql.Identifier(INGESTION_LEDGER_TABLE)))
+
+
+def _purge_stale_ledger_entries(cursor, station: str):
+    """Oublie les fichiers d'une station dont la table a été supprimée (réinitialisation)."""
+    cursor.execute(sql.SQL("DELETE FROM {} WHERE station = %s AND to_regclass(%s) IS NULL").format(
+        sql.Identifier(INGESTION_LEDGER_TABLE)), (station, sql.Identifier(station).as_string(cursor)))
+
+
+def find_ingested_file(conn, station: str, file_hash: str) -> Optional[Dict]:
+    """
+    Cherche un fichier de même contenu déjà ingéré pour la station.
+
+    Returns:
+        Dictionnaire {'filename', 'span_start', 'span_end', 'rows_read', 'rows_saved', 'rows_inserted',
+                      'method', 'ingested_at'} ou None
+    """
+    station = station.strip()
+    keys = ('filename', 'span_start', 'span_end', 'rows_read', 'rows_saved', 'rows_inserted', 'method', 'ingested_at')
+    with conn.cursor() as cursor:
+        _ensure_ingestion_ledger_table(cursor)
+        _purge_stale_ledger_entries(cursor, station)
+        cursor.execute(sql.SQL("SELECT {} FROM {} WHERE station = %s AND file_hash = %s").format(
+            sql.SQL(', ').join(sql.Identifier(key) for key in keys), sql.Identifier(INGESTION_LEDGER_TABLE)),
+            (station, file_hash))
+        row = cursor.fetchone()
+    if not conn.autocommit:
+        conn.commit()
+    return dict(zip(keys, row)) if row else None
+
+
+def get_ingested_spans(conn, station: str) -> List[tuple]:
+    """
+    Étendues temporelles (début, fin) des fichiers déjà ingérés pour la station, fusionnées en
+    intervalles disjoints triés.
+    """
+    station = station.strip()
+    with conn.cursor() as cursor:
+        _ensure_ingestion_ledger_table(cursor)
+        _purge_stale_ledger_entries(cursor, station)
+        cursor.execute(sql.SQL("""
+            SELECT span_start, span_end FROM {} WHERE station = %s AND span_start IS NOT NULL
+            ORDER BY span_start
+        """).format(sql.Identifier(INGESTION_LEDGER_TABLE)), (station,))
+        rows = cursor.fetchall()
+    if not conn.autocommit:
+        conn.commit()
+
+    spans = []
+    for span_start, span_end in rows:
+        if spans and span_start <= spans[-1][1]:
+            spans[-1] = (spans[-1][0], max(spans[-1][1], span_end))
+        else:
+            spans.append((span_start, span_end))
+    return spans
+
+
+def record_ingested_file(conn, station: str, file_hash: str, filename: Optional[str], span_start, span_end,
+                         rows_read: int, rows_saved: int, rows_inserted: Optional[int], method: str):
+    """Enregistre (ou met à jour) un fichier ingéré avec succès dans le registre de la base de la connexion."""
+    with conn.cursor() as cursor:
+        _ensure_ingestion_ledger_table(cursor)
+        cursor.execute(sql.SQL("""
+            INSERT INTO {} (station, file_hash, filename, span_start, span_end, rows_read, rows_saved,
+                            rows_inserted, method, ingested_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, now())
+            ON CONFLICT (station, file_hash) DO UPDATE SET
+                filename = EXCLUDED.filename,
+                span_start = EXCLUDED.span_start,
+                span_end = EXCLUDED.span_end,
+                rows_read = EXCLUDED.rows_read,
+                rows_saved = EXCLUDED.rows_saved,
+                rows_inserted = EXCLUDED.rows_inserted,
+                method = EXCLUDED.method,
+                ingested_at = EXCLUDED.ingested_at
+        """).format(sql.Identifier(INGESTION_LEDGER_TABLE)),
+            (station.strip(), file_hash, filename, span_start, span_end, rows_read, rows_saved, rows_inserted, method))
+    if not conn.autocommit:
+        conn.commit()
+
+
+def get_merge_ingestion_start(conn, station: str, since) -> Optional[datetime]:
+    """
+    Début le plus ancien des fichiers ingérés en mode 'merge' (valeurs existantes éventuellement
+    modifiées) pour la station depuis `since`, ou None.
+    """
+    with conn.cursor() as cursor:
+        _ensure_ingestion_ledger_table(cursor)
+        cursor.execute(sql.SQL("""
+            SELECT min(span_start) FROM {} WHERE station = %s AND method = 'merge' AND ingested_at > %s
+        """).format(sql.Identifier(INGESTION_LEDGER_TABLE)), (station.strip(), since))
+        span_start = cursor.fetchone()[0]
+    if not conn.autocommit:
+        conn.commit()
+    return span_start
+
+
+############################ Repères de traitement (watermarks) ############################
+# Une table 'processing_watermarks' de la base 'after' mémorise, par station, le dernier horodatage
+# brut traité, le nombre de lignes brutes traitées et l'empreinte des paramètres (limites, version
+# des algorithmes, coordonnées). Un nouveau traitement ne recalcule alors que les données ajoutées
+# depuis, avec une marge (voir pipeline.process_station).
+
+PROCESSING_WATERMARKS_TABLE = 'processing_watermarks'
+PROCESSING_WATERMARKS_DB_KEY = 'after'
+
+
+def _ensure_processing_watermarks_table(cursor):
+    """Crée la table des repères de traitement si elle n'existe pas encore dans la base courante."""
+    cursor.execute(sql.SQL("""
+        CREATE TABLE IF NOT EXISTS {} (
+            station varchar(255) PRIMARY KEY,
+            params_hash char(40) NOT NULL,
+            processed_until timestamp NOT NULL,
+            raw_rows bigint NOT NULL,
+            rows_at_full_rebuild bigint NOT NULL,
+            processing_params jsonb NOT NULL DEFAULT '{{}}'::jsonb,
+            mode varchar(16),
+            processed_at timestamptz NOT NULL DEFAULT now()
+        )
+    """).format(sql.Identifier(PROCESSING_WATERMARKS_TABLE)))
+
+
+def get_processing_watermark(conn, station: str) -> Optional[Dict]:
+    """
+    Repère de traitement d'une station, ou None. Un repère dont la table 'after' de la station
+    a été supprimée (réinitialisation) est effacé.
+
+    Returns:
+        Dictionnaire {'params_hash', 'processed_until', 'raw_rows', 'rows_at_full_rebuild',
+                      'processing_params', 'mode', 'processed_at'} ou None
+    """
+    station = station.strip()
+    keys = ('params_hash', 'processed_until', 'raw_rows', 'rows_at_full_rebuild', 'processing_params',
+            'mode', 'processed_at')
+    with conn.cursor() as cursor:
+        _ensure_processing_watermarks_table(cursor)
+        cursor.execute(sql.SQL("DELETE FROM {} WHERE station = %s AND to_regclass(%s) IS NULL").format(
+            sql.Identifier(PROCESSING_WATERMARKS_TABLE)), (station, sql.Identifier(station).as_string(cursor)))
+        cursor.execute(sql.SQL("SELECT {} FROM {} WHERE station = %s").format(
+            sql.SQL(', ').join(sql.Identifier(key) for key in keys), sql.Identifier(PROCESSING_WATERMARKS_TABLE)),
+            (station,))
+        row = cursor.fetchone()
+    if not conn.autocommit:
+        conn.commit()
+    return dict(zip(keys, row)) if row else None
+
+
+def record_processing_watermark(conn, station: str, params_hash: str, processed_until, raw_rows: int,
+                                rows_at_full_rebuild: int, processing_params: Dict, mode: str):
+    """Enregistre (ou remplace) le repère de traitement d'une station après un traitement réussi."""
+    with conn.cursor() as cursor:
+        _ensure_processing_watermarks_table(cursor)
+        cursor.execute(sql.SQL("""
+            INSERT INTO {} (station, params_hash, processed_until, raw_rows, rows_at_full_rebuild,
+                            processing_params, mode, processed_at)
+            VALUES (%s, %s, %s, %s, %s, %s::jsonb, %s, now())
+            ON CONFLICT (station) DO UPDATE SET
+                params_hash = EXCLUDED.params_hash,
+                processed_until = EXCLUDED.processed_until,
+                raw_rows = EXCLUDED.raw_rows,
+                rows_at_full_rebuild = EXCLUDED.rows_at_full_rebuild,
+                processing_params = EXCLUDED.processing_params,
+                mode = EXCLUDED.mode,
+                processed_at = EXCLUDED.processed_at
+        """).format(sql.Identifier(PROCESSING_WATERMARKS_TABLE)),
+            (station.strip(), params_hash, _to_naive_utc(processed_until).to_pydatetime(), int(raw_rows),
+             int(rows_at_full_rebuild), json.dumps(processing_params), mode))
+    if not conn.autocommit:
+        conn.commit()
+
+
+def clear_processing_watermark(conn, station: str):
+    """Efface le repère d'une station: son prochain traitement reprendra tout l'historique."""
+    with conn.cursor() as cursor:
+        _ensure_processing_watermarks_table(cursor)
+        cursor.execute(sql.SQL("DELETE FROM {} WHERE station = %s").format(
+            sql.Identifier(PROCESSING_WATERMARKS_TABLE)), (station.strip(),))
+    if not conn.autocommit:
+        conn.commit()
+
+
+def count_station_rows(conn, station: str, end=None) -> int:
+    """Nombre de lignes de la table d'une station (jusqu'à `end` inclus si fourni), 0 si elle n'existe pas."""
+    table_name = station.strip()
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (sql.Identifier(table_name).as_string(cursor),))
+        if not cursor.fetchone()[0]:
+            count = 0
+        elif end is None:
+            cursor.execute(sql.SQL("SELECT count(*) FROM {}").format(sql.Identifier(table_name)))
+            count = cursor.fetchone()[0]
+        else:
+            condition, param = _datetime_bound_condition('<=', end, _datetime_key_format(cursor, table_name))
+            cursor.execute(sql.SQL('SELECT count(*) FROM {} WHERE ').format(sql.Identifier(table_name)) + condition,
+                           (param,))
+            count = cursor.fetchone()[0]
+    if not conn.autocommit:
+        conn.commit()
+    return count
+
+
 def load_raw_station_data(station_name: str, processing_type: str = 'raw') -> pd.DataFrame:
     """
     Charge les données brutes d'une station depuis la base de données appropriée ('before' ou 'after').
@@ -7066,44 +7541,39 @@ def load_raw_station_data(station_name: str, processing_type: str = 'raw') -> pd
     # NEW LINE: Use 'processing_type' directly, as it is already the correct short key ('before' or 'after')
     db_key_for_connection = processing_type
 
-    conn = None
     df = pd.DataFrame()
     try:
-        # CORRECTION HERE: Pass db_key_for_connection (the short key)
-        conn = get_connection(db_key_for_connection)
-        if not conn:
-            # Better error message to indicate which key failed
-            raise ConnectionError(f"Impossible de se connecter à la base de données pour la clé '{db_key_for_connection}'.")
-
-        table_name = station_name.strip()
+        # Connexion empruntée au pool de la base (clé courte), rendue en fin de bloc
+        with db_connection(db_key_for_connection) as conn:
+            table_name = station_name.strip()
         
-        # Ensure get_station_columns also uses the short key
-        db_columns_info = get_station_columns(station_name, processing_type) # Use processing_type here too
-        if not db_columns_info:
-            warnings.warn(f"Impossible de récupérer la configuration des colonnes pour la station '{station_name}' avec le type de traitement '{processing_type}'. Retourne un DataFrame vide.")
-            return pd.DataFrame() # Return empty DF if column config is missing
+            # Ensure get_station_columns also uses the short key
+            db_columns_info = get_station_columns(station_name, processing_type) # Use processing_type here too
+            if not db_columns_info:
+                warnings.warn(f"Impossible de récupérer la configuration des colonnes pour la station '{station_name}' avec le type de traitement '{processing_type}'. Retourne un DataFrame vide.")
+                return pd.DataFrame() # Return empty DF if column config is missing
 
-        db_columns = list(db_columns_info.keys())
+            db_columns = list(db_columns_info.keys())
         
-        column_identifiers = [sql.Identifier(col) for col in db_columns]
+            column_identifiers = [sql.Identifier(col) for col in db_columns]
         
-        query = sql.SQL("SELECT {} FROM {};").format(
-            sql.SQL(', ').join(column_identifiers),
-            sql.Identifier(table_name)
-        )
+            query = sql.SQL("SELECT {} FROM {};").format(
+                sql.SQL(', ').join(column_identifiers),
+                sql.Identifier(table_name)
+            )
         
-        df = pd.read_sql(query.as_string(conn), conn, index_col='Datetime')
+            df = pd.read_sql(query.as_string(conn), conn, index_col='Datetime')
         
-        df.index = pd.to_datetime(df.index, utc=True, errors='coerce')
-        initial_rows_after_load = len(df)
-        df.dropna(subset=[df.index.name], inplace=True)
-        if len(df) < initial_rows_after_load:
-            warnings.warn(f"Suppression de {initial_rows_after_load - len(df)} lignes avec index Datetime invalide après chargement pour la station {station_name}.")
+            df.index = pd.to_datetime(df.index, utc=True, errors='coerce')
+            initial_rows_after_load = len(df)
+            df.dropna(subset=[df.index.name], inplace=True)
+            if len(df) < initial_rows_after_load:
+                warnings.warn(f"Suppression de {initial_rows_after_load - len(df)} lignes avec index Datetime invalide après chargement pour la station {station_name}.")
 
-        # Renommer la colonne 'Rel_H_Pct' en 'Rel_H_%' pour le pipeline d'interpolation
-        if 'Rel_H_Pct' in df.columns and 'Rel_H_%' not in df.columns:
-            df.rename(columns={'Rel_H_Pct': 'Rel_H_%'}, inplace=True)
-            warnings.warn(f"Colonne 'Rel_H_Pct' renommée en 'Rel_H_%' pour le traitement de la station {station_name}.")
+            # Renommer la colonne 'Rel_H_Pct' en 'Rel_H_%' pour le pipeline d'interpolation
+            if 'Rel_H_Pct' in df.columns and 'Rel_H_%' not in df.columns:
+                df.rename(columns={'Rel_H_Pct': 'Rel_H_%'}, inplace=True)
+                warnings.warn(f"Colonne 'Rel_H_Pct' renommée en 'Rel_H_%' pour le traitement de la station {station_name}.")
 
     except ValueError as ve: # Specifically catch ValueError from get_connection
         warnings.warn(f"Erreur de configuration de la base de données lors du chargement des données brutes pour la station '{station_name}': {ve}")
@@ -7111,328 +7581,268 @@ def load_raw_station_data(station_name: str, processing_type: str = 'raw') -> pd
     except Exception as e:
         warnings.warn(f"Erreur lors du chargement des données brutes pour la station '{station_name}': {e}")
         traceback.print_exc()
-    finally:
-        if conn:
-            conn.close()
     return df
 
 
     ############################################################# 26 Juillet 2025 ################
 
+def get_pg_type(python_type_str: str) -> str:
+    """Convertit un type Python en un type PostgreSQL."""
+    type_map = {
+        'timestamp(0) PRIMARY KEY': 'timestamp(0) PRIMARY KEY',
+        'timestamp': 'timestamp',
+        'date': 'date',
+        'integer': 'integer',
+        'float': 'double precision',
+        'boolean': 'boolean',
+        'varchar(255)': 'varchar(255)',
+        'varchar(255) NOT NULL': 'varchar(255) NOT NULL',
+        'serial primary key unique': 'SERIAL PRIMARY KEY'
+    }
+    return type_map.get(python_type_str.lower(), 'text')
+
+
+############################ Registre des schémas de stations ############################
+# Les dispositions de colonnes sont déclarées une seule fois par groupe de stations, puis
+# compilées à l'import en entrées StationSchema indexées par (station, processing_type).
+
+# Colonnes d'horodatage des stations dont le fichier fournit Year/Month/Day/Hour/Minute
+_DATETIME_PART_COLUMNS = {
+    'Datetime': 'timestamp(0) PRIMARY KEY', # Limité aux minutes
+    'Year': 'integer',
+    'Month': 'integer',
+    'Day': 'integer',
+    'Hour': 'integer',
+    'Minute': 'integer',
+}
+
+# Colonnes d'horodatage des stations dont le fichier fournit une colonne Date
+_DATETIME_DATE_COLUMNS = {
+    'Datetime': 'timestamp(0) PRIMARY KEY',
+    'Date': 'date', # Garde Date comme date pure
+}
+
+# Colonnes ajoutées par le pipeline d'interpolation (lever/coucher du soleil)
+_ASTRAL_COLUMNS = {
+    'sunrise_time_utc': 'timestamp',
+    'sunset_time_utc': 'timestamp',
+    'Is_Daylight': 'boolean',
+    'Daylight_Duration': 'float',
+}
+
+# (stations, colonnes 'raw', colonnes 'before'/'after')
+_STATION_SCHEMA_GROUPS = (
+    # Bassin DANO et DASSARI (stations complètes)
+    (('Dreyer Foundation', 'Bankandi', 'Wahablé', 'Fafo', 'Yabogane',
+      'Nagasséga', 'Koundri', 'Koupendri', 'Pouri', 'Fandohoun', 'Ouriyori 1'),
+     {**_DATETIME_PART_COLUMNS,
+      'Rain_01_mm': 'float', 'Rain_02_mm': 'float',
+      'Air_Temp_Deg_C': 'float', 'Rel_H_Pct': 'float', 'Solar_R_W/m^2': 'float',
+      'Wind_Sp_m/sec': 'float', 'Wind_Dir_Deg': 'float'},
+     {**_DATETIME_PART_COLUMNS,
+      'Rain_01_mm': 'float', 'Rain_02_mm': 'float', 'Rain_mm': 'float',
+      'Air_Temp_Deg_C': 'float', 'Rel_H_Pct': 'float', 'Solar_R_W/m^2': 'float',
+      'Wind_Sp_m/sec': 'float', 'Wind_Dir_Deg': 'float',
+      **_ASTRAL_COLUMNS}),
+    # Bassin DANO (pluviomètres seuls)
+    (('Lare', 'Tambiri 2'),
+     {**_DATETIME_PART_COLUMNS,
+      'Rain_01_mm': 'float', 'Rain_02_mm': 'float'},
+     {**_DATETIME_PART_COLUMNS,
+      'Rain_01_mm': 'float', 'Rain_02_mm': 'float', 'Rain_mm': 'float'}),
+    (('Tambiri 1',),
+     {**_DATETIME_PART_COLUMNS,
+      'Rain_mm': 'float', 'BP_mbar_Avg': 'float', 'Air_Temp_Deg_C': 'float',
+      'Rel_H_Pct': 'float', 'Wind_Sp_m/sec': 'float', 'Wind_Dir_Deg': 'float'},
+     {**_DATETIME_PART_COLUMNS,
+      'Rain_mm': 'float', 'BP_mbar_Avg': 'float', 'Air_Temp_Deg_C': 'float',
+      'Rel_H_Pct': 'float', 'Wind_Sp_m/sec': 'float', 'Wind_Dir_Deg': 'float'}),
+    # Bassin VEA SISSILI
+    (('Oualem', 'Nebou', 'Nabugubulle', 'Gwosi', 'Doninga', 'Bongo Soe', 'Aniabiisi'),
+     {**_DATETIME_DATE_COLUMNS,
+      'Rain_mm': 'float', 'Air_Temp_Deg_C': 'float', 'Rel_H_Pct': 'float',
+      'Solar_R_W/m^2': 'float', 'Wind_Sp_m/sec': 'float', 'Wind_Dir_Deg': 'float',
+      'BP_mbar_Avg': 'float'},
+     {**_DATETIME_DATE_COLUMNS,
+      'Rain_mm': 'float', 'Air_Temp_Deg_C': 'float', 'Rel_H_Pct': 'float',
+      'Solar_R_W/m^2': 'float', 'Wind_Sp_m/sec': 'float', 'Wind_Dir_Deg': 'float',
+      'BP_mbar_Avg': 'float',
+      **_ASTRAL_COLUMNS}),
+    (('Manyoro',),
+     {**_DATETIME_DATE_COLUMNS,
+      'Rain_01_mm': 'float', 'Rain_02_mm': 'float', 'Air_Temp_Deg_C': 'float',
+      'Rel_H_Pct': 'float', 'Solar_R_W/m^2': 'float', 'Wind_Sp_m/sec': 'float',
+      'Wind_Dir_Deg': 'float'},
+     {**_DATETIME_DATE_COLUMNS,
+      'Rain_01_mm': 'float', 'Rain_02_mm': 'float', 'Air_Temp_Deg_C': 'float',
+      'Rel_H_Pct': 'float', 'Solar_R_W/m^2': 'float', 'Wind_Sp_m/sec': 'float',
+      'Wind_Dir_Deg': 'float',
+      **_ASTRAL_COLUMNS}),
+    (('Atampisi',),
+     {**_DATETIME_DATE_COLUMNS,
+      'Rain_01_mm': 'float', 'Rain_02_mm': 'float', 'Rain_mm': 'float',
+      'Air_Temp_Deg_C': 'float', 'Rel_H_Pct': 'float', 'Solar_R_W/m^2': 'float',
+      'Wind_Sp_m/sec': 'float', 'Wind_Dir_Deg': 'float'},
+     {**_DATETIME_DATE_COLUMNS,
+      'Rain_01_mm': 'float', 'Rain_02_mm': 'float', 'Rain_mm': 'float',
+      'Air_Temp_Deg_C': 'float', 'Rel_H_Pct': 'float', 'Solar_R_W/m^2': 'float',
+      'Wind_Sp_m/sec': 'float', 'Wind_Dir_Deg': 'float',
+      **_ASTRAL_COLUMNS}),
+    (('Aniabisi',),
+     {**_DATETIME_DATE_COLUMNS,
+      'Rain_mm': 'float', 'Air_Temp_Deg_C': 'float', 'Rel_H_Pct': 'float',
+      'Solar_R_W/m^2': 'float', 'Wind_Sp_m/sec': 'float', 'Wind_Dir_Deg': 'float'},
+     {**_DATETIME_DATE_COLUMNS,
+      'Rain_mm': 'float', 'Air_Temp_Deg_C': 'float', 'Rel_H_Pct': 'float',
+      'Solar_R_W/m^2': 'float', 'Wind_Sp_m/sec': 'float', 'Wind_Dir_Deg': 'float',
+      **_ASTRAL_COLUMNS}),
+)
+
+# Table consolidée des plages manquantes ('missing_ranges', une par base missing_*):
+# même disposition pour toutes les stations, horodatages typés (UTC naïf)
+_MISSING_RANGES_COLUMNS = {
+    'id': 'serial primary key unique',
+    'station': 'varchar(255) not null',
+    'variable': 'varchar(255) not null',
+    'start_time': 'timestamp not null',
+    'end_time': 'timestamp not null',
+    'duration': 'integer',
+    'unit': 'varchar(255)',
+    'count': 'integer',
+}
+
+MISSING_PROCESSING_TYPES = ('missing_before', 'missing_after')
+ANY_STATION = '*' # Clé de station générique du registre (tables missing_*)
+SCHEMA_VERSION_PREFIX = 'schema_version=' # Préfixe du commentaire de table portant la version
+
+# Noms de colonnes du pipeline qui n'ont pas d'équivalent direct en base
+_COLUMN_ALIASES = {
+    'Rel_H_%': 'Rel_H_Pct',
+    'Rel_H': 'Rel_H_Pct',
+}
+
+
+class StationSchema(NamedTuple):
+    """Schéma compilé d'une table de station pour un type de traitement donné."""
+    station: str
+    processing_type: str
+    columns: Dict[str, str]          # Colonne -> type déclaré, dans l'ordre de la table
+    column_order: tuple              # Ordre des colonnes de la table
+    pg_types: Dict[str, str]         # Colonne -> type PostgreSQL (via get_pg_type)
+    rename_map: Dict[str, str]       # Nom en minuscules (ou alias) -> nom exact en base
+    insert_columns: tuple            # Colonnes fournies à l'INSERT (sans l'id SERIAL)
+    pk_column: Optional[str]         # 'Datetime', 'id' ou None
+    version: str                     # Empreinte de la disposition (12 caractères hexadécimaux)
+
+
+def _compile_station_schema(station: str, processing_type: str, columns: Dict[str, str]) -> StationSchema:
+    """Précalcule toutes les informations dérivées d'une disposition de colonnes."""
+    columns = dict(columns)
+    column_order = tuple(columns)
+    pg_types = {col: get_pg_type(dtype) for col, dtype in columns.items()}
+
+    rename_map = {col.lower(): col for col in column_order}
+    for alias, target in _COLUMN_ALIASES.items():
+        if target in columns:
+            rename_map[alias.lower()] = target
+
+    if processing_type in MISSING_PROCESSING_TYPES and 'id' in columns:
+        pk_column = 'id'
+        insert_columns = tuple(col for col in column_order if col != 'id')
+    else:
+        pk_column = 'Datetime' if 'Datetime' in columns else None
+        insert_columns = column_order
+
+    layout = ';'.join(f"{col}:{dtype}" for col, dtype in columns.items())
+    version = hashlib.sha1(layout.encode('utf-8')).hexdigest()[:12]
+
+    return StationSchema(station, processing_type, columns, column_order, pg_types,
+                         rename_map, insert_columns, pk_column, version)
+
+
+def _compile_schema_registry() -> Dict[tuple, StationSchema]:
+    """Construit le registre {(station, processing_type): StationSchema} à partir des déclarations."""
+    registry = {}
+    for stations, raw_columns, processed_columns in _STATION_SCHEMA_GROUPS:
+        for station in stations:
+            registry[(station, 'raw')] = _compile_station_schema(station, 'raw', raw_columns)
+            for processing_type in ('before', 'after'):
+                registry[(station, processing_type)] = _compile_station_schema(
+                    station, processing_type, processed_columns)
+    for processing_type in MISSING_PROCESSING_TYPES:
+        registry[(ANY_STATION, processing_type)] = _compile_station_schema(
+            ANY_STATION, processing_type, _MISSING_RANGES_COLUMNS)
+    return registry
+
+
+SCHEMA_REGISTRY = _compile_schema_registry()
+
+
+def get_station_schema(station: str, processing_type: str) -> Optional[StationSchema]:
+    """
+    Retourne le schéma compilé d'une station pour un type de traitement, ou None s'il est inconnu.
+    Les tables missing_* partagent une entrée générique, quelle que soit la station.
+    """
+    if processing_type in MISSING_PROCESSING_TYPES:
+        return SCHEMA_REGISTRY.get((ANY_STATION, processing_type))
+    return SCHEMA_REGISTRY.get((station.strip(), processing_type))
+
+
 def get_station_columns(station: str, processing_type: str) -> Dict[str, str]:
     """Retourne les colonnes attendues pour une station donnée selon le type de traitement"""
-    
-    # Nettoyage du nom de la station
-    station = station.strip()
+    schema = get_station_schema(station, processing_type)
+    # Copie superficielle: les appelants peuvent modifier le dictionnaire sans altérer le registre
+    return dict(schema.columns) if schema else {}
+
+
+def check_table_schema_version(conn, table_name: str, station: str, processing_type: str) -> Dict[str, Optional[str]]:
+    """
+    Compare la version de schéma enregistrée sur une table (COMMENT ON TABLE) à celle du registre.
+    Une table sans commentaire (créée avant le registre) est comparée colonne par colonne puis
+    estampillée si sa disposition correspond.
+
+    Returns:
+        Dictionnaire {'status': 'current' | 'outdated' | 'missing' | 'unknown',
+                      'expected_version', 'table_version'}
+    """
+    schema = get_station_schema(station, processing_type)
+    if schema is None:
+        return {'status': 'unknown', 'expected_version': None, 'table_version': None}
+
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT obj_description(to_regclass(%s), 'pg_class'), to_regclass(%s) IS NOT NULL",
+                       (sql.Identifier(table_name).as_string(conn),) * 2)
+        comment, table_exists = cursor.fetchone()
+        if not table_exists:
+            return {'status': 'missing', 'expected_version': schema.version, 'table_version': None}
+
+        table_version = None
+        if comment and comment.startswith(SCHEMA_VERSION_PREFIX):
+            table_version = comment[len(SCHEMA_VERSION_PREFIX):]
+        else:
+            cursor.execute("""
+                SELECT column_name FROM information_schema.columns
+                WHERE table_schema = 'public' AND table_name = %s
+                ORDER BY ordinal_position
+            """, (table_name,))
+            table_columns = tuple(row[0] for row in cursor.fetchall())
+            if table_columns == schema.column_order:
+                _stamp_schema_version(cursor, table_name, schema)
+                table_version = schema.version
+
+    status = 'current' if table_version == schema.version else 'outdated'
+    if status == 'outdated':
+        warnings.warn(f"La table '{table_name}' ({processing_type}) a été créée avec une ancienne disposition "
+                      f"de colonnes (version {table_version}, attendue {schema.version}).")
+    return {'status': status, 'expected_version': schema.version, 'table_version': table_version}
+
+
+
+def _stamp_schema_version(cursor, table_name: str, schema: StationSchema):
+    """Enregistre la version du schéma du registre en commentaire de la table."""
+    cursor.execute(sql.SQL("COMMENT ON TABLE {} IS {}").format(
+        sql.Identifier(table_name), sql.Literal(f"{SCHEMA_VERSION_PREFIX}{schema.version}")))
 
-    #RAW DATA
-    if processing_type == 'raw':
-        # Bassin DANO
-        if station in ['Dreyer Foundation', 'Bankandi', 'Wahablé', 'Fafo', 'Yabogane']:
-            return {
-                "Datetime": 'timestamp(0) PRIMARY KEY', # <--- MODIFIÉ ICI  JUSTE POUR SE LIMITER A MINUTES
-                'Year': 'integer',
-                'Month': 'integer', 
-                'Day': 'integer',
-                'Hour': 'integer',
-                'Minute': 'integer',
-                'Rain_01_mm': 'float',
-                'Rain_02_mm': 'float',
-                'Air_Temp_Deg_C': 'float',
-                'Rel_H_Pct': 'float', 
-                'Solar_R_W/m^2': 'float',
-                'Wind_Sp_m/sec': 'float',
-                'Wind_Dir_Deg': 'float'
-            }
-        elif station in ['Lare', 'Tambiri 2']:
-            return {
-                'Datetime': 'timestamp(0) PRIMARY KEY', # <--- MODIFIÉ ICI
-                'Year': 'integer',
-                'Month': 'integer', 
-                'Day': 'integer',
-                'Hour': 'integer',
-                'Minute': 'integer',
-                'Rain_01_mm': 'float',
-                'Rain_02_mm': 'float'
-            }
-        elif station == 'Tambiri 1':
-            return {
-                'Datetime': 'timestamp(0) PRIMARY KEY', # <--- MODIFIÉ ICI
-                'Year': 'integer',
-                'Month': 'integer', 
-                'Day': 'integer',
-                'Hour': 'integer',
-                'Minute': 'integer',
-                'Rain_mm': 'float',
-                'BP_mbar_Avg': 'float',
-                'Air_Temp_Deg_C': 'float',
-                'Rel_H_Pct': 'float', 
-                'Wind_Sp_m/sec': 'float',
-                'Wind_Dir_Deg': 'float'
-            }
-        # Bassin DASSARI
-        elif station in ['Nagasséga', 'Koundri', 'Koupendri', 'Pouri', 'Fandohoun']:
-            return {
-                'Datetime': 'timestamp(0) PRIMARY KEY', # <--- MODIFIÉ ICI
-                'Year': 'integer',
-                'Month': 'integer', 
-                'Day': 'integer',
-                'Hour': 'integer',
-                'Minute': 'integer',
-                'Rain_01_mm': 'float',
-                'Rain_02_mm': 'float',
-                'Air_Temp_Deg_C': 'float',
-                'Rel_H_Pct': 'float', 
-                'Solar_R_W/m^2': 'float',
-                'Wind_Sp_m/sec': 'float',
-                'Wind_Dir_Deg': 'float'
-            }
-        elif station == 'Ouriyori 1':
-            return {
-                'Datetime': 'timestamp(0) PRIMARY KEY', # <--- MODIFIÉ ICI
-                'Year': 'integer',
-                'Month': 'integer', 
-                'Day': 'integer',
-                'Hour': 'integer',
-                'Minute': 'integer',
-                'Rain_01_mm': 'float',
-                'Rain_02_mm': 'float',
-                'Air_Temp_Deg_C': 'float',
-                'Rel_H_Pct': 'float', 
-                'Solar_R_W/m^2': 'float',
-                'Wind_Sp_m/sec': 'float',
-                'Wind_Dir_Deg': 'float'
-            }
-        # Bassin VEA SISSILI
-        elif station in ['Oualem', 'Nebou', 'Nabugubulle', 'Gwosi', 'Doninga', 'Bongo Soe', 'Aniabiisi']:
-            return {
-                'Datetime': 'timestamp(0) PRIMARY KEY', # <--- MODIFIÉ ICI
-                'Date': 'date', # Garde Date comme date pure
-                'Rain_mm': 'float',
-                'Air_Temp_Deg_C': 'float',
-                'Rel_H_Pct': 'float', 
-                'Solar_R_W/m^2': 'float',
-                'Wind_Sp_m/sec': 'float',
-                'Wind_Dir_Deg': 'float',
-                'BP_mbar_Avg': 'float'
-            }
-
-
-        elif station == 'Manyoro':
-            return {
-                'Datetime': 'timestamp(0) PRIMARY KEY', # <--- MODIFIÉ ICI
-                'Date': 'date',
-                'Rain_01_mm': 'float',
-                'Rain_02_mm': 'float',
-                'Air_Temp_Deg_C': 'float',
-                'Rel_H_Pct': 'float', 
-                'Solar_R_W/m^2': 'float',
-                'Wind_Sp_m/sec': 'float',
-                'Wind_Dir_Deg': 'float',
-                #'BP_mbar_Avg': 'float'
-            }
-        elif station == 'Atampisi':
-            return {
-                'Datetime': 'timestamp(0) PRIMARY KEY', # <--- MODIFIÉ ICI
-                'Date': 'date',
-                'Rain_01_mm': 'float',
-                'Rain_02_mm': 'float',
-                'Rain_mm': 'float',
-                'Air_Temp_Deg_C': 'float',
-                'Rel_H_Pct': 'float', 
-                'Solar_R_W/m^2': 'float',
-                'Wind_Sp_m/sec': 'float',
-                'Wind_Dir_Deg': 'float'
-            }
-        elif station == 'Aniabisi':
-            return {
-                'Datetime': 'timestamp(0) PRIMARY KEY', # <--- MODIFIÉ ICI
-                'Date': 'date',
-                'Rain_mm': 'float',
-                'Air_Temp_Deg_C': 'float',
-                'Rel_H_Pct': 'float', 
-                'Solar_R_W/m^2': 'float',
-                'Wind_Sp_m/sec': 'float',
-                'Wind_Dir_Deg': 'float'
-            }
-    
-    # AFTER_PROCESSING
-    elif   processing_type == 'before' or processing_type == 'after':
-        # Bassin DANO
-        if station in ['Dreyer Foundation', 'Bankandi', 'Wahablé', 'Fafo', 'Yabogane']:
-            return {
-                'Datetime': 'timestamp(0) PRIMARY KEY', # <--- MODIFIÉ ICI
-                'Year': 'integer',
-                'Month': 'integer', 
-                'Day': 'integer',
-                'Hour': 'integer',
-                'Minute': 'integer',
-                'Rain_01_mm': 'float',
-                'Rain_02_mm': 'float',
-                'Rain_mm': 'float',
-                'Air_Temp_Deg_C': 'float',
-                'Rel_H_Pct': 'float', 
-                'Solar_R_W/m^2': 'float',
-                'Wind_Sp_m/sec': 'float',
-                'Wind_Dir_Deg': 'float',
-                'sunrise_time_utc': 'timestamp', # Ces colonnes peuvent rester timestamp (elles ne sont pas forcément à la minute)
-                'sunset_time_utc': 'timestamp',   # ou passer à timestamp(0) si c'est votre exigence pour elles aussi.
-                'Is_Daylight': 'boolean',
-                'Daylight_Duration': 'float'
-            }
-        elif station in ['Lare', 'Tambiri 2']:
-            return {
-                'Datetime': 'timestamp(0) PRIMARY KEY', # <--- MODIFIÉ ICI
-                'Year': 'integer',
-                'Month': 'integer', 
-                'Day': 'integer',
-                'Hour': 'integer',
-                'Minute': 'integer',
-                'Rain_01_mm': 'float',
-                'Rain_02_mm': 'float',
-                'Rain_mm': 'float'
-            }
-        elif station == 'Tambiri 1':
-            return {
-                'Datetime': 'timestamp(0) PRIMARY KEY', # <--- MODIFIÉ ICI
-                'Year': 'integer',
-                'Month': 'integer', 
-                'Day': 'integer',
-                'Hour': 'integer',
-                'Minute': 'integer',
-                'Rain_mm': 'float',
-                'BP_mbar_Avg': 'float',
-                'Air_Temp_Deg_C': 'float',
-                'Rel_H_Pct': 'float', 
-                'Wind_Sp_m/sec': 'float',
-                'Wind_Dir_Deg': 'float'
-            }
-        # Bassin DASSARI
-        elif station in ['Nagasséga', 'Koundri', 'Koupendri', 'Pouri', 'Fandohoun']:
-            return {
-                'Datetime': 'timestamp(0) PRIMARY KEY', # <--- MODIFIÉ ICI
-                'Year': 'integer',
-                'Month': 'integer', 
-                'Day': 'integer',
-                'Hour': 'integer',
-                'Minute': 'integer',
-                'Rain_01_mm': 'float',
-                'Rain_02_mm': 'float',
-                'Rain_mm': 'float',
-                'Air_Temp_Deg_C': 'float',
-                'Rel_H_Pct': 'float', 
-                'Solar_R_W/m^2': 'float',
-                'Wind_Sp_m/sec': 'float',
-                'Wind_Dir_Deg': 'float',
-                'sunrise_time_utc': 'timestamp',
-                'sunset_time_utc': 'timestamp',
-                'Is_Daylight': 'boolean',
-                'Daylight_Duration': 'float'
-            }
-        elif station == 'Ouriyori 1':
-            return {
-                'Datetime': 'timestamp(0) PRIMARY KEY', # <--- MODIFIÉ ICI
-                'Year': 'integer',
-                'Month': 'integer', 
-                'Day': 'integer',
-                'Hour': 'integer',
-                'Minute': 'integer',
-                'Rain_01_mm': 'float',
-                'Rain_02_mm': 'float',
-                'Rain_mm': 'float',
-                'Air_Temp_Deg_C': 'float',
-                'Rel_H_Pct': 'float', 
-                'Solar_R_W/m^2': 'float',
-                'Wind_Sp_m/sec': 'float',
-                'Wind_Dir_Deg': 'float',
-                'sunrise_time_utc': 'timestamp',
-                'sunset_time_utc': 'timestamp',
-                'Is_Daylight': 'boolean',
-                'Daylight_Duration': 'float'
-            }
-        # Bassin VEA SISSILI
-        elif station in ['Oualem', 'Nebou', 'Nabugubulle',  'Gwosi', 'Doninga', 'Bongo Soe', 'Aniabiisi']:
-            return {
-                'Datetime': 'timestamp(0) PRIMARY KEY', # <--- MODIFIÉ ICI
-                'Date': 'date',
-                'Rain_mm': 'float',
-                # 'Rain_mm': 'float', # Cette ligne est un doublon, elle devrait être supprimée ou corrigée si c'est une autre colonne.
-                'Air_Temp_Deg_C': 'float',
-                'Rel_H_Pct': 'float', 
-                'Solar_R_W/m^2': 'float',
-                'Wind_Sp_m/sec': 'float',
-                'Wind_Dir_Deg': 'float',
-                'BP_mbar_Avg': 'float',
-                'sunrise_time_utc': 'timestamp',
-                'sunset_time_utc': 'timestamp',
-                'Is_Daylight': 'boolean',
-                'Daylight_Duration': 'float'
-            }
-
-        elif station == 'Manyoro':
-            return {
-                'Datetime': 'timestamp(0) PRIMARY KEY', # <--- MODIFIÉ ICI
-                'Date': 'date',
-                'Rain_01_mm': 'float',
-                'Rain_02_mm': 'float',
-                'Air_Temp_Deg_C': 'float',
-                'Rel_H_Pct': 'float', 
-                'Solar_R_W/m^2': 'float',
-                'Wind_Sp_m/sec': 'float',
-                'Wind_Dir_Deg': 'float',
-                #'BP_mbar_Avg': 'float'
-                'sunrise_time_utc': 'timestamp',
-                'sunset_time_utc': 'timestamp',
-                'Is_Daylight': 'boolean',
-                'Daylight_Duration': 'float'
-            }
-        elif station == 'Atampisi':
-            return {
-                'Datetime': 'timestamp(0) PRIMARY KEY', # <--- MODIFIÉ ICI
-                'Date': 'date',
-                'Rain_01_mm': 'float',
-                'Rain_02_mm': 'float',
-                'Rain_mm': 'float',
-                'Air_Temp_Deg_C': 'float',
-                'Rel_H_Pct': 'float', 
-                'Solar_R_W/m^2': 'float',
-                'Wind_Sp_m/sec': 'float',
-                'Wind_Dir_Deg': 'float',
-                'sunrise_time_utc': 'timestamp',
-                'sunset_time_utc': 'timestamp',
-                'Is_Daylight': 'boolean',
-                'Daylight_Duration': 'float'
-            }
-    
-        elif station == 'Aniabisi': # Cette clause est également redondante si déjà dans la liste ci-dessus
-            return {
-                'Datetime': 'timestamp(0) PRIMARY KEY', # <--- MODIFIÉ ICI
-                'Date': 'date',
-                'Rain_mm': 'float',
-                'Air_Temp_Deg_C': 'float',
-                'Rel_H_Pct': 'float', 
-                'Solar_R_W/m^2': 'float',
-                'Wind_Sp_m/sec': 'float',
-                'Wind_Dir_Deg': 'float',
-                'sunrise_time_utc': 'timestamp',
-                'sunset_time_utc': 'timestamp',
-                'Is_Daylight': 'boolean',
-                'Daylight_Duration': 'float'
-            }
-
-    elif processing_type == 'missing_before' or processing_type == 'missing_after':
-        return{
-            'id': 'serial primary key unique',
-            'station': 'varchar(255) not null',
-            'variable': 'varchar(255) not null',
-            'start_time': 'timestamp(0) not null',      
-            'end_time': 'timestamp(0) not null',
-            'duration': 'integer',  
-            'unit': 'varchar(255)',
-            'count': 'integer',
-        }
-    
-    return {}
 
 def initialize_database():
     """Initialise simplement les bases de données si elles n'existent pas"""
@@ -7499,107 +7909,116 @@ def initialize_database():
         traceback.print_exc() 
         return False
     
-def get_pg_type(python_type_str: str) -> str:
-    """Convertit un type Python en un type PostgreSQL."""
-    type_map = {
-        'timestamp(0) PRIMARY KEY': 'timestamp(0) PRIMARY KEY',
-        'timestamp': 'timestamp',
-        'date': 'date',
-        'integer': 'integer',
-        'float': 'double precision',
-        'boolean': 'boolean',
-        'varchar(255)': 'varchar(255)',
-        'varchar(255) NOT NULL': 'varchar(255) NOT NULL',
-        'serial primary key unique': 'SERIAL PRIMARY KEY'
-    }
-    return type_map.get(python_type_str.lower(), 'text')
+def _build_create_table_query(table_name: str, columns_config: Dict[str, str], processing_type: str) -> tuple:
+    """
+    Construit la requête CREATE TABLE d'une table de station.
+
+    Returns:
+        tuple: (requête SQL, booléen indiquant si une clé primaire a été définie)
+    """
+    column_defs = []
+    primary_key_defined = False
+
+    # Prioritize 'id' for 'missing_before/after' as SERIAL PRIMARY KEY
+    if processing_type in ['missing_before', 'missing_after'] and 'id' in columns_config:
+        # Ensure 'id' is defined as SERIAL PRIMARY KEY
+        column_defs.append(f'"id" SERIAL PRIMARY KEY UNIQUE')
+        primary_key_defined = True
+        # Add other columns from config, excluding 'id' if already added
+        for col, dtype in columns_config.items():
+            if col != 'id':
+                pg_type = get_pg_type(dtype)
+                column_defs.append(f'"{col}" {pg_type}')
+
+    # Then 'Datetime' for 'before/after' tables
+    elif 'Datetime' in columns_config:
+        for col, dtype in columns_config.items():
+            pg_type = get_pg_type(dtype)
+            if col == 'Datetime':
+                column_defs.append(f'"{col}" {pg_type} PRIMARY KEY')
+                primary_key_defined = True
+            else:
+                column_defs.append(f'"{col}" {pg_type}')
+    else:
+        # General case: add all columns from config
+        for col, dtype in columns_config.items():
+            pg_type = get_pg_type(dtype)
+            column_defs.append(f'"{col}" {pg_type}')
+
+    create_query = f"""
+        CREATE TABLE "{table_name}" (
+            {', '.join(column_defs)}
+        )
+    """
+    return create_query, primary_key_defined
 
 
-def create_station_table(station: str, processing_type: str = 'before'):
+def create_station_table(station: str, processing_type: str = 'before', conn=None):
     """
     Crée la table dans la base de données si elle n'existe pas,
     avec une clé primaire sur 'Datetime' ou 'id' selon le type de traitement.
+
+    Args:
+        conn: Connexion déjà empruntée par l'appelant (ex: save_to_database). La table est alors
+              créée sur cette connexion, sans second emprunt au pool; sinon une connexion est empruntée.
     """
+    if conn is None:
+        try:
+            with db_connection(processing_type) as conn:
+                return create_station_table(station, processing_type, conn=conn)
+        except ValueError as ve:
+            print(f"Erreur de configuration de la base de données lors de la création de table pour '{station.strip()}': {ve}")
+            traceback.print_exc()
+            return False
+        except Exception as e:
+            print(f"Erreur lors de la création de la table '{station.strip()}': {e}")
+            traceback.print_exc()
+            return False
+
     table_name = station.strip()
 
-    columns_config = get_station_columns(station, processing_type)
-    if not columns_config:
+    schema = get_station_schema(station, processing_type)
+    if schema is None:
         print(f"Error: Configuration des colonnes manquante pour {station}. Impossible de créer la table.")
         return False
-    
-    db_key_for_connection = processing_type 
+    columns_config = schema.columns
 
+    previous_autocommit = conn.autocommit
     try:
-        with get_connection(db_key_for_connection) as conn:
-            if not conn:
-                print(f"Erreur: Impossible d'obtenir la connexion pour la clé '{db_key_for_connection}'.")
-                return False
-            conn.autocommit = True
-            with conn.cursor() as cursor:
-                # Vérifier si la table existe
-                cursor.execute("""
-                    SELECT EXISTS (
-                        SELECT FROM information_schema.tables 
-                        WHERE table_schema = 'public' AND table_name = %s
-                    )
-                """, (table_name,))
-                table_exists = cursor.fetchone()[0]
-                
-                if not table_exists:
-                    column_defs = []
-                    primary_key_defined = False
-
-                    # Prioritize 'id' for 'missing_before/after' as SERIAL PRIMARY KEY
-                    if processing_type in ['missing_before', 'missing_after'] and 'id' in columns_config:
-                        # Ensure 'id' is defined as SERIAL PRIMARY KEY
-                        column_defs.append(f'"id" SERIAL PRIMARY KEY UNIQUE')
-                        primary_key_defined = True
-                        # Add other columns from config, excluding 'id' if already added
-                        for col, dtype in columns_config.items():
-                            if col != 'id':
-                                pg_type = get_pg_type(dtype)
-                                column_defs.append(f'"{col}" {pg_type}')
-                        
-                    # Then 'Datetime' for 'before/after' tables
-                    elif 'Datetime' in columns_config:
-                        for col, dtype in columns_config.items():
-                            pg_type = get_pg_type(dtype)
-                            if col == 'Datetime':
-                                column_defs.append(f'"{col}" {pg_type} PRIMARY KEY')
-                                primary_key_defined = True
-                            else:
-                                column_defs.append(f'"{col}" {pg_type}')
-                    else:
-                        # General case: add all columns from config
-                        for col, dtype in columns_config.items():
-                            pg_type = get_pg_type(dtype)
-                            column_defs.append(f'"{col}" {pg_type}')
-
-                    if not primary_key_defined:
-                         print(f"Attention: Aucune clé primaire (Datetime ou id) détectée pour la table '{table_name}'. "
-                               "L'insertion avec ON CONFLICT pourrait échouer si aucune contrainte UNIQUE n'existe.")
-                    
-                    create_query = f"""
-                        CREATE TABLE "{table_name}" (
-                            {', '.join(column_defs)}
-                        )
-                    """
-                   
-                    print(f"\nℹ️ La table '{table_name}' n'existe pas, création...")
-                    print(f"Executing table creation query for '{table_name}':\n{create_query}")
-                    cursor.execute(create_query)
-                    print(f"Table '{table_name}' créée avec succès")
-                else:
-                    print(f"Table '{table_name}' existe déjà")
-                return True
-    except ValueError as ve: 
-        print(f"Erreur de configuration de la base de données lors de la création de table pour '{table_name}': {ve}")
-        traceback.print_exc()
-        return False
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            # Vérifier si la table existe
+            cursor.execute("""
+                SELECT EXISTS (
+                    SELECT FROM information_schema.tables 
+                    WHERE table_schema = 'public' AND table_name = %s
+                )
+            """, (table_name,))
+            table_exists = cursor.fetchone()[0]
+            
+            if not table_exists:
+                create_query, primary_key_defined = _build_create_table_query(table_name, columns_config, processing_type)
+
+                if not primary_key_defined:
+                     print(f"Attention: Aucune clé primaire (Datetime ou id) détectée pour la table '{table_name}'. "
+                           "L'insertion avec ON CONFLICT pourrait échouer si aucune contrainte UNIQUE n'existe.")
+               
+                print(f"\nℹ️ La table '{table_name}' n'existe pas, création...")
+                print(f"Executing table creation query for '{table_name}':\n{create_query}")
+                cursor.execute(create_query)
+                _stamp_schema_version(cursor, table_name, schema)
+                print(f"Table '{table_name}' créée avec succès (schéma {schema.version})")
+            else:
+                print(f"Table '{table_name}' existe déjà")
+        if table_exists:
+            check_table_schema_version(conn, table_name, station, processing_type)
+        return True
     except Exception as e:
         print(f"Erreur lors de la création de la table '{table_name}': {e}")
         traceback.print_exc()
         return False
+    finally:
+        conn.autocommit = previous_autocommit
 
 
 import pandas as pd
@@ -8322,28 +8741,675 @@ import traceback
 
 
 
-def save_to_database(df: pd.DataFrame, station: str, conn, processing_type: str = 'raw') -> bool:
+# Méthodes d'insertion disponibles pour save_to_database
+INGEST_METHODS = ('copy', 'batch', 'merge')
+
+
+def _isoformat_timestamp_series(series: pd.Series) -> pd.Series:
+    """
+    Équivalent vectorisé de `x.isoformat(timespec='microseconds')` appliqué à toute une colonne.
+    Le décalage horaire est écrit au format '+HH:MM' comme le fait isoformat().
+    """
+    if not pd.api.types.is_datetime64_any_dtype(series):
+        return series.map(lambda x: x.isoformat(timespec='microseconds') if pd.notna(x) else None)
+
+    if getattr(series.dt, 'tz', None) is None:
+        return series.dt.strftime('%Y-%m-%dT%H:%M:%S.%f')
+
+    formatted = series.dt.strftime('%Y-%m-%dT%H:%M:%S.%f%z')
+    return formatted.str.replace(r'([+-]\d{2})(\d{2})$', r'\1:\2', regex=True)
+
+
+# Chaînes considérées comme des valeurs manquantes dans les fichiers bruts
+NAN_VALUE_STRINGS = ['NaN', 'NAN', 'nan', '', ' ', '#VALUE!', '-', 'NULL', 'null', 'N/A', 'NA', 'None', 'NONE', 'NV', 'N.V.', '#DIV/0!']
+
+
+def _coerce_columns_for_wire(df_processed: pd.DataFrame, columns_config: Dict[str, str],
+                             insert_columns: List[str]) -> pd.DataFrame:
+    """
+    Convertit en une seule passe vectorisée les colonnes à insérer vers le format attendu par PostgreSQL,
+    en se basant sur la configuration de get_station_columns.
+
+    Types produits par colonne:
+    - float / double precision / real: float (NaN = NULL)
+    - integer: Int64 (les valeurs décimales sont mises à NULL)
+    - boolean: boolean (type nullable pandas)
+    - timestamp: chaîne ISO 8601 à la microseconde (équivalent de isoformat())
+    - date: chaîne 'YYYY-MM-DD'
+    - autres types, dont le timestamp(0) de la clé 'Datetime': str(valeur), format historique des tables;
+      une colonne datetime64 naïve tronquée à la minute est écrite 'YYYY-MM-DD HH:MM' (format des tables brutes)
+    Les valeurs manquantes restent NaN/NA/None et sont envoyées comme NULL.
+    """
+    wire_columns = {}
+    for col in insert_columns:
+        pg_base_type = columns_config.get(col, 'text').split()[0].lower()
+        series = df_processed[col]
+
+        # Seules les colonnes objet peuvent contenir des marqueurs textuels de valeurs manquantes
+        if series.dtype == object:
+            series = series.mask(series.isin(NAN_VALUE_STRINGS))
+
+        if pg_base_type in ['float', 'double precision', 'real', 'integer']:
+            numeric = pd.to_numeric(series, errors='coerce')
+            coerced_count = int((series.notna() & numeric.isna()).sum())
+            if coerced_count:
+                logging.warning(f"Colonne '{col}': {coerced_count} valeurs non numériques converties en NULL. "
+                                f"Exemples: {series[series.notna() & numeric.isna()].unique()[:5].tolist()}")
+            if pg_base_type == 'integer':
+                fractional = numeric.notna() & (numeric % 1 != 0)
+                if fractional.any():
+                    logging.warning(f"Colonne '{col}' contient des décimales mais le type attendu est INTEGER. "
+                                    f"{int(fractional.sum())} valeurs mises à NULL.")
+                    numeric = numeric.mask(fractional)
+                numeric = numeric.astype('Int64')
+            wire_columns[col] = numeric
+        elif pg_base_type in ['timestamp', 'timestamp with time zone']:
+            wire_columns[col] = _isoformat_timestamp_series(pd.to_datetime(series, errors='coerce'))
+        elif pg_base_type == 'date':
+            wire_columns[col] = pd.to_datetime(series, errors='coerce').dt.strftime('%Y-%m-%d')
+        elif pg_base_type == 'boolean':
+            if pd.api.types.is_bool_dtype(series):
+                wire_columns[col] = series.astype('boolean')
+            else:
+                valid = series.notna()
+                wire_columns[col] = series.where(valid, False).astype(bool).astype('boolean').mask(~valid)
+        elif pd.api.types.is_datetime64_any_dtype(series) and getattr(series.dt, 'tz', None) is None:
+            minute_only = bool((series.dropna().dt.second == 0).all() and (series.dropna().dt.microsecond == 0).all())
+            wire_columns[col] = series.dt.strftime('%Y-%m-%d %H:%M' if minute_only else '%Y-%m-%d %H:%M:%S').where(series.notna(), None)
+        else:
+            wire_columns[col] = series.astype(str).where(series.notna(), None)
+
+    df_wire = pd.DataFrame(wire_columns, index=df_processed.index)
+
+    null_counts = df_wire.isna().sum()
+    for col, null_count in null_counts[null_counts > 0].items():
+        logging.info(f"- {col}: {null_count}/{len(df_wire)} valeurs NULL ({null_count / len(df_wire) * 100:.2f}%)")
+
+    return df_wire
+
+
+def _wire_frame_to_rows(df_wire: pd.DataFrame) -> List[tuple]:
+    """Transforme un DataFrame converti en tuples Python (None pour NULL) pour execute_batch."""
+    float32_columns = [col for col in df_wire.columns if df_wire[col].dtype == 'float32']
+    if float32_columns:
+        # float(np.float32(23.4)) vaut 23.399999618530273: on repasse par la représentation décimale
+        # la plus courte, celle qu'écrit déjà le chemin COPY
+        df_wire = df_wire.assign(**{col: df_wire[col].astype(str).astype('float64') for col in float32_columns})
+    return list(df_wire.astype(object).where(df_wire.notna(), None).itertuples(index=False, name=None))
+
+
+def _wire_frame_to_csv(df_wire: pd.DataFrame) -> pd.DataFrame:
+    """Prépare un DataFrame converti pour l'écriture CSV de COPY (booléens en 't'/'f', NULL non quotés)."""
+    bool_columns = [col for col in df_wire.columns if pd.api.types.is_bool_dtype(df_wire[col])]
+    if not bool_columns:
+        return df_wire
+    df_csv = df_wire.copy()
+    for col in bool_columns:
+        df_csv[col] = df_wire[col].map({True: 't', False: 'f'}).astype(object).where(df_wire[col].notna(), None)
+    return df_csv
+
+
+def _copy_insert_dataframe(conn, table_name: str, df_wire: pd.DataFrame,
+                           conflict_column: Optional[str] = None) -> tuple:
+    """
+    Insère un DataFrame déjà converti par _coerce_columns_for_wire avec COPY ... FROM STDIN
+    depuis un tampon mémoire.
+
+    Les lignes sont d'abord copiées dans une table temporaire de staging (supprimée au COMMIT),
+    puis fusionnées dans la table cible avec un seul INSERT ... SELECT. Si `conflict_column`
+    est fourni, la clause ON CONFLICT (...) DO NOTHING est appliquée comme dans le chemin execute_batch.
+    Si une transaction est déjà ouverte sur `conn`, l'insertion y participe et l'appelant la valide;
+    sinon la fonction ouvre et valide sa propre transaction.
+
+    Returns:
+        tuple: (nombre de lignes réellement insérées, durée en secondes)
+    """
+    insert_columns = df_wire.columns.tolist()
+    buffer = io.StringIO()
+    _wire_frame_to_csv(df_wire).to_csv(buffer, index=False, header=False, na_rep='')
+    buffer.seek(0)
+
+    staging_table = f"_staging_{uuid.uuid4().hex[:12]}"
+    cols_sql = sql.SQL(', ').join(sql.Identifier(col) for col in insert_columns)
+    conflict_sql = sql.SQL('')
+    if conflict_column:
+        conflict_sql = sql.SQL(' ON CONFLICT ({}) DO NOTHING').format(sql.Identifier(conflict_column))
+
+    # autocommit ne peut pas être modifié pendant une transaction ouverte (set_session)
+    owns_transaction = conn.status == psycopg2.extensions.STATUS_READY
+    previous_autocommit = conn.autocommit
+    start_time = time.perf_counter()
+    if owns_transaction:
+        conn.autocommit = False
+    try:
+        with conn.cursor() as cursor:
+            # Table de staging sans contraintes ni valeurs par défaut (pas de consommation de séquence SERIAL)
+            cursor.execute(sql.SQL("CREATE TEMP TABLE {} ON COMMIT DROP AS SELECT {} FROM {} WITH NO DATA").format(
+                sql.Identifier(staging_table), cols_sql, sql.Identifier(table_name)))
+            cursor.copy_expert(
+                sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv, NULL '')").format(
+                    sql.Identifier(staging_table), cols_sql).as_string(conn),
+                buffer
+            )
+            cursor.execute(sql.SQL("INSERT INTO {} ({}) SELECT {} FROM {}{}").format(
+                sql.Identifier(table_name), cols_sql, cols_sql, sql.Identifier(staging_table), conflict_sql))
+            inserted = cursor.rowcount
+        if owns_transaction:
+            conn.commit()
+    except Exception:
+        if owns_transaction:
+            conn.rollback()
+        raise
+    finally:
+        if owns_transaction:
+            conn.autocommit = previous_autocommit
+
+    return inserted, time.perf_counter() - start_time
+
+
+def _merge_upsert_dataframe(conn, table_name: str, df_wire: pd.DataFrame, key_column: str) -> Dict:
+    """
+    Fusionne un DataFrame converti par _coerce_columns_for_wire dans la table cible:
+    COPY vers une table temporaire (non journalisée), puis une seule requête qui insère les
+    nouvelles clés et met à jour uniquement les lignes existantes dont une valeur a changé.
+    En cas de clé répétée dans le fichier, la dernière occurrence l'emporte.
+
+    Returns:
+        Dictionnaire {'inserted', 'updated', 'unchanged', 'elapsed_seconds'}
+    """
+    insert_columns = df_wire.columns.tolist()
+    if key_column not in insert_columns:
+        raise ValueError(f"La colonne clé '{key_column}' est absente des colonnes à fusionner.")
+    value_columns = [col for col in insert_columns if col != key_column]
+
+    buffer = io.StringIO()
+    _wire_frame_to_csv(df_wire).to_csv(buffer, index=False, header=False, na_rep='')
+    buffer.seek(0)
+
+    staging_table = f"_merge_{uuid.uuid4().hex[:12]}"
+    staging = sql.Identifier(staging_table)
+    target = sql.Identifier(table_name)
+    key = sql.Identifier(key_column)
+    cols_sql = sql.SQL(', ').join(sql.Identifier(col) for col in insert_columns)
+
+    if value_columns:
+        conflict_action = sql.SQL("DO UPDATE SET {} WHERE ({}) IS DISTINCT FROM ({})").format(
+            sql.SQL(', ').join(sql.SQL("{} = EXCLUDED.{}").format(sql.Identifier(col), sql.Identifier(col))
+                               for col in value_columns),
+            sql.SQL(', ').join(sql.SQL("{}.{}").format(target, sql.Identifier(col)) for col in value_columns),
+            sql.SQL(', ').join(sql.SQL("EXCLUDED.{}").format(sql.Identifier(col)) for col in value_columns))
+    else:
+        conflict_action = sql.SQL("DO NOTHING")
+
+    # xmax = 0 distingue une ligne insérée d'une ligne mise à jour dans RETURNING
+    merge_query = sql.SQL("""
+        WITH source AS (
+            SELECT DISTINCT ON ({key}) {cols}
+            FROM {staging}
+            ORDER BY {key}, _row_order DESC
+        ), merged AS (
+            INSERT INTO {target} ({cols})
+            SELECT {cols} FROM source
+            ON CONFLICT ({key}) {conflict_action}
+            RETURNING (xmax = 0) AS is_insert
+        )
+        SELECT
+            (SELECT COUNT(*) FROM source),
+            COUNT(*) FILTER (WHERE is_insert),
+            COUNT(*) FILTER (WHERE NOT is_insert)
+        FROM merged
+    """).format(key=key, cols=cols_sql, staging=staging, target=target, conflict_action=conflict_action)
+
+    # Même gestion de transaction que _copy_insert_dataframe
+    owns_transaction = conn.status == psycopg2.extensions.STATUS_READY
+    previous_autocommit = conn.autocommit
+    start_time = time.perf_counter()
+    if owns_transaction:
+        conn.autocommit = False
+    try:
+        with conn.cursor() as cursor:
+            # Les tables temporaires ne sont pas journalisées (WAL): équivalent d'une table UNLOGGED privée
+            cursor.execute(sql.SQL("CREATE TEMP TABLE {} ON COMMIT DROP AS SELECT {} FROM {} WITH NO DATA").format(
+                staging, cols_sql, target))
+            cursor.execute(sql.SQL("ALTER TABLE {} ADD COLUMN _row_order bigserial").format(staging))
+            cursor.copy_expert(
+                sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv, NULL '')").format(staging, cols_sql).as_string(conn),
+                buffer
+            )
+            cursor.execute(merge_query)
+            source_rows, inserted, updated = cursor.fetchone()
+        if owns_transaction:
+            conn.commit()
+    except Exception:
+        if owns_transaction:
+            conn.rollback()
+        raise
+    finally:
+        if owns_transaction:
+            conn.autocommit = previous_autocommit
+
+    return {'inserted': inserted, 'updated': updated, 'unchanged': source_rows - inserted - updated,
+            'elapsed_seconds': time.perf_counter() - start_time}
+
+
+def _wire_values_equal(incoming: pd.Series, existing: pd.Series) -> np.ndarray:
+    """
+    Compare deux colonnes au format de _coerce_columns_for_wire (NULL = NULL).
+    Les colonnes numériques sont comparées à la précision float32 près (mesures chargées en float32,
+    voir config.METEO_DTYPES).
+    """
+    if pd.api.types.is_numeric_dtype(incoming) and pd.api.types.is_numeric_dtype(existing) \
+            and not pd.api.types.is_bool_dtype(incoming):
+        return np.isclose(incoming.to_numpy(dtype='float64', na_value=np.nan),
+                          existing.to_numpy(dtype='float64', na_value=np.nan),
+                          rtol=1e-6, atol=0.0, equal_nan=True)
+    incoming_values = incoming.astype(object).to_numpy()
+    existing_values = existing.astype(object).to_numpy()
+    both_null = pd.isna(incoming_values) & pd.isna(existing_values)
+    return both_null | (incoming_values == existing_values)
+
+
+def analyze_ingest_overlap(conn, table_name: str, df_wire: pd.DataFrame, columns_config: Dict[str, str],
+                           key_column: str = 'Datetime', keep: str = 'first') -> Dict:
+    """
+    Analyse avant écriture du recouvrement entre un lot à ingérer et la table existante.
+    Une seule requête lit les lignes existantes comprises entre la plus petite et la plus grande
+    clé du lot (index de clé primaire); la comparaison des valeurs est ensuite vectorisée.
+
+    Args:
+        conn: Connexion psycopg2 vers la base cible
+        table_name: Table cible (doit exister)
+        df_wire: Lot déjà converti par _coerce_columns_for_wire
+        columns_config: Types des colonnes (schéma de la station), pour convertir les lignes existantes
+        key_column: Clé primaire textuelle ('Datetime'); son format trie les dates chronologiquement
+        keep: Occurrence retenue pour une clé répétée dans le lot ('first' comme ON CONFLICT DO NOTHING,
+              'last' comme le mode 'merge')
+
+    Returns:
+        Dictionnaire {'incoming' (clés distinctes du lot), 'duplicates' (clés répétées dans le lot),
+                      'new', 'overlapping', 'identical', 'conflicting' (clés existantes dont une valeur diffère),
+                      'start', 'end', 'elapsed_seconds'}
+    """
+    start_time = time.perf_counter()
+    keys = df_wire[key_column]
+    df_incoming = df_wire[keys.notna()].drop_duplicates(subset=[key_column], keep=keep)
+    result = {'incoming': len(df_incoming), 'duplicates': int(keys.notna().sum()) - len(df_incoming),
+              'new': len(df_incoming), 'overlapping': 0, 'identical': 0, 'conflicting': 0,
+              'start': None, 'end': None, 'elapsed_seconds': 0.0}
+    if df_incoming.empty:
+        return result
+
+    result['start'], result['end'] = df_incoming[key_column].min(), df_incoming[key_column].max()
+    columns = df_wire.columns.tolist()
+    query = sql.SQL("SELECT {} FROM {} WHERE {} BETWEEN %s AND %s").format(
+        sql.SQL(', ').join(sql.Identifier(col) for col in columns),
+        sql.Identifier(table_name), sql.Identifier(key_column))
+    with conn.cursor() as cursor:
+        cursor.execute(query, (result['start'], result['end']))
+        existing_rows = cursor.fetchall()
+
+    if existing_rows:
+        df_existing = _coerce_columns_for_wire(pd.DataFrame.from_records(existing_rows, columns=columns),
+                                               columns_config, columns)
+        df_pairs = df_incoming.merge(df_existing, on=key_column, how='inner', suffixes=('', '__existing'))
+        differs = np.zeros(len(df_pairs), dtype=bool)
+        for col in columns:
+            if col != key_column:
+                differs |= ~_wire_values_equal(df_pairs[col], df_pairs[f"{col}__existing"])
+        result['overlapping'] = len(df_pairs)
+        result['conflicting'] = int(differs.sum())
+        result['identical'] = result['overlapping'] - result['conflicting']
+        result['new'] = result['incoming'] - result['overlapping']
+
+    result['elapsed_seconds'] = time.perf_counter() - start_time
+    return result
+
+
+############################ Plages manquantes consolidées ############################
+# Une table 'missing_ranges' par phase (bases missing_before et missing_after) remplace les
+# tables par station. Index (station, variable, start_time) pour les lectures filtrées et
+# (start_time, end_time) pour les requêtes par période toutes stations confondues.
+
+MISSING_RANGES_TABLE = 'missing_ranges'
+
+_MISSING_RANGES_READY = set() # (pid, phase) dont la table et les index ont été vérifiés
+
+
+def _validate_missing_phase(phase: str):
+    if phase not in MISSING_PROCESSING_TYPES:
+        raise ValueError(f"Phase de plages manquantes inconnue: '{phase}'. Utilisez {MISSING_PROCESSING_TYPES}.")
+
+
+def _ensure_missing_ranges_table(conn, phase: str):
+    """
+    Crée la table consolidée et ses index si nécessaire. À la création, les anciennes tables
+    par station de la base sont recopiées (horodatages texte convertis en timestamp).
+    """
+    if (os.getpid(), phase) in _MISSING_RANGES_READY:
+        return
+    from config import STATIONS_BY_BASSIN
+
+    previous_autocommit = conn.autocommit
+    conn.autocommit = False
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (MISSING_RANGES_TABLE,))
+            already_exists = cursor.fetchone()[0]
+            cursor.execute(sql.SQL("""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    id bigserial PRIMARY KEY,
+                    station varchar(255) NOT NULL,
+                    variable varchar(255) NOT NULL,
+                    start_time timestamp NOT NULL,
+                    end_time timestamp NOT NULL,
+                    duration integer,
+                    unit varchar(255),
+                    count integer
+                )
+            """).format(table=sql.Identifier(MISSING_RANGES_TABLE)))
+            cursor.execute(sql.SQL("CREATE INDEX IF NOT EXISTS {} ON {} (station, variable, start_time)").format(
+                sql.Identifier(f"{MISSING_RANGES_TABLE}_station_variable_start_idx"), sql.Identifier(MISSING_RANGES_TABLE)))
+            cursor.execute(sql.SQL("CREATE INDEX IF NOT EXISTS {} ON {} (start_time, end_time)").format(
+                sql.Identifier(f"{MISSING_RANGES_TABLE}_period_idx"), sql.Identifier(MISSING_RANGES_TABLE)))
+
+            if not already_exists:
+                station_tables = sorted({name.strip() for names in STATIONS_BY_BASSIN.values() for name in names})
+                cursor.execute("""
+                    SELECT table_name FROM information_schema.tables
+                    WHERE table_schema = 'public' AND table_name = ANY(%s)
+                """, (station_tables,))
+                legacy_tables = [row[0] for row in cursor.fetchall()]
+                for legacy_table in legacy_tables:
+                    cursor.execute(sql.SQL("""
+                        INSERT INTO {table} (station, variable, start_time, end_time, duration, unit, count)
+                        SELECT station, variable, start_time::text::timestamp, end_time::text::timestamp,
+                               duration, unit, count
+                        FROM {legacy}
+                    """).format(table=sql.Identifier(MISSING_RANGES_TABLE), legacy=sql.Identifier(legacy_table)))
+                if legacy_tables:
+                    logging.info(f"Plages manquantes '{phase}': {len(legacy_tables)} table(s) par station "
+                                 f"recopiée(s) dans '{MISSING_RANGES_TABLE}'.")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.autocommit = previous_autocommit
+    _MISSING_RANGES_READY.add((os.getpid(), phase))
+
+
+def save_missing_ranges(df: pd.DataFrame, station: str, conn, phase: str, stats: Optional[Dict] = None,
+                        since=None) -> bool:
+    """
+    Remplace les plages manquantes d'une station dans la table consolidée de la phase, en une
+    transaction (DELETE de la station puis COPY). Un retraitement ne duplique donc pas les plages,
+    et un DataFrame vide efface les plages devenues obsolètes.
+
+    Args:
+        df: Plages issues de _collect_missing_ranges_for_df (start_time/end_time texte ou datetime).
+        phase: 'missing_before' ou 'missing_after'.
+        stats: Rempli avec les métriques d'écriture, ou avec 'error' en cas d'échec.
+        since: Si fourni, seules les plages commençant à partir de cette date sont remplacées
+               (retraitement incrémental); `df` ne doit alors contenir que ces plages.
+    """
+    _validate_missing_phase(phase)
+    schema = get_station_schema(station, phase)
+    insert_columns = list(schema.insert_columns)
+    station = station.strip()
+
+    df_store = df.reindex(columns=insert_columns).copy() if df is not None else pd.DataFrame(columns=insert_columns)
+    df_store['station'] = station
+    for col in ('start_time', 'end_time'):
+        # Les plages arrivent formatées selon la station ('%Y-%m-%d %H:%M', '%Y-%m-%d', ...)
+        times = pd.to_datetime(df_store[col], errors='coerce', format='mixed')
+        if getattr(times.dt, 'tz', None) is not None:
+            times = times.dt.tz_convert('UTC').dt.tz_localize(None)
+        df_store[col] = times
+    invalid = df_store['start_time'].isna() | df_store['end_time'].isna() | df_store['variable'].isna()
+    if invalid.any():
+        logging.warning(f"{int(invalid.sum())} plage(s) sans variable ou horodatage valide ignorée(s) pour '{station}' ({phase}).")
+        df_store = df_store[~invalid]
+
+    df_wire = _coerce_columns_for_wire(df_store, schema.columns, insert_columns)
+
+    _ensure_missing_ranges_table(conn, phase)
+    previous_autocommit = conn.autocommit
+    conn.autocommit = False
+    start = time.perf_counter()
+    try:
+        with conn.cursor() as cursor:
+            if since is None:
+                cursor.execute(sql.SQL("DELETE FROM {} WHERE station = %s").format(sql.Identifier(MISSING_RANGES_TABLE)),
+                               (station,))
+            else:
+                cursor.execute(sql.SQL("DELETE FROM {} WHERE station = %s AND start_time >= %s").format(
+                    sql.Identifier(MISSING_RANGES_TABLE)), (station, _to_naive_utc(since).to_pydatetime()))
+            deleted = cursor.rowcount
+        inserted = 0
+        if not df_wire.empty:
+            # La copie s'exécute dans la transaction du DELETE: suppression et insertion sont atomiques
+            inserted, _ = _copy_insert_dataframe(conn, MISSING_RANGES_TABLE, df_wire)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logging.error(f"Erreur lors de l'enregistrement des plages manquantes de '{station}' ({phase}): {e}")
+        traceback.print_exc()
+        if stats is not None:
+            stats['error'] = str(e)
+        return False
+    finally:
+        conn.autocommit = previous_autocommit
+
+    elapsed = time.perf_counter() - start
+    logging.info(f"Plages manquantes '{phase}' de '{station}': {deleted} remplacée(s) par {inserted} en {elapsed:.2f} s.")
+    if stats is not None:
+        stats.update({'method': 'copy', 'rows_prepared': len(df_wire), 'rows_inserted': inserted,
+                      'rows_deleted': deleted, 'elapsed_seconds': elapsed,
+                      'rows_per_second': len(df_wire) / elapsed if elapsed > 0 else float(len(df_wire))})
+    return True
+
+
+def load_missing_ranges(phase: str, station: Optional[str] = None, variables: Optional[List[str]] = None,
+                        start=None, end=None) -> pd.DataFrame:
+    """
+    Lit les plages manquantes d'une phase, filtrées côté SQL (requêtes servies par les index).
+
+    Args:
+        station: Station à lire (toutes si None).
+        variables: Variables à lire (toutes si None).
+        start, end: Période; une plage est retenue si elle chevauche [start, end].
+    Returns:
+        DataFrame (id, station, variable, start_time, end_time, duration, unit, count),
+        start_time/end_time en datetime64.
+    """
+    _validate_missing_phase(phase)
+    conditions, params = [], []
+    if station is not None:
+        conditions.append(sql.SQL("station = %s"))
+        params.append(station.strip())
+    if variables is not None:
+        conditions.append(sql.SQL("variable = ANY(%s)"))
+        params.append(list(variables))
+    if end is not None:
+        conditions.append(sql.SQL("start_time <= %s"))
+        params.append(_to_naive_utc(end).to_pydatetime())
+    if start is not None:
+        conditions.append(sql.SQL("end_time >= %s"))
+        params.append(_to_naive_utc(start).to_pydatetime())
+
+    query = sql.SQL("SELECT {} FROM {}").format(
+        sql.SQL(', ').join(sql.Identifier(col) for col in _MISSING_RANGES_COLUMNS),
+        sql.Identifier(MISSING_RANGES_TABLE))
+    if conditions:
+        query += sql.SQL(" WHERE ") + sql.SQL(" AND ").join(conditions)
+    query += sql.SQL(" ORDER BY station, variable, start_time")
+
+    with db_connection(phase) as conn:
+        _ensure_missing_ranges_table(conn, phase)
+        df = pd.read_sql(query.as_string(conn), conn, params=params or None)
+    for col in ('start_time', 'end_time'):
+        df[col] = pd.to_datetime(df[col])
+    return df
+
+
+def verify_missing_ranges_roundtrip(phase: str = 'missing_before', station: str = '__verification_missing_ranges') -> Dict:
+    """
+    Vérifie sur la base réelle le remplacement des plages manquantes par save_missing_ranges:
+    écriture complète d'un DataFrame non vide, puis remplacement incrémental (`since`) des plages
+    récentes, chaque étape étant relue avec load_missing_ranges. Les plages de la station de
+    vérification sont supprimées à la fin.
+
+    Returns:
+        Dictionnaire {'full_rows', 'incremental_rows', 'passed'}
+    Raises:
+        AssertionError: Si une écriture échoue ou si les plages relues diffèrent des plages écrites.
+    """
+    def ranges(rows):
+        return pd.DataFrame(rows, columns=['variable', 'start_time', 'end_time', 'duration', 'unit', 'count'])
+
+    def stored(df):
+        return sorted(zip(df['variable'], pd.to_datetime(df['start_time']), pd.to_datetime(df['end_time']), df['count']))
+
+    full = ranges([
+        ('Air_Temp_Deg_C', '2020-01-01 00:10', '2020-01-01 02:00', 1.83, 'heures', 12),
+        ('Rel_H_%', '2020-01-03 05:00', '2020-01-03 05:30', 0.5, 'heures', 4),
+        ('Air_Temp_Deg_C', '2020-01-05 12:00', '2020-01-05 13:00', 1.0, 'heures', 7),
+    ])
+    since = pd.Timestamp('2020-01-04')
+    recent = ranges([
+        ('Air_Temp_Deg_C', '2020-01-05 12:00', '2020-01-05 15:00', 3.0, 'heures', 19),
+        ('Solar_R_W/m^2', '2020-01-06 08:00', '2020-01-06 09:00', 1.0, 'heures', 7),
+    ])
+    result = {'full_rows': 0, 'incremental_rows': 0, 'passed': False}
+    try:
+        with db_connection(phase) as conn:
+            stats = {}
+            assert save_missing_ranges(full, station, conn, phase, stats=stats), stats.get('error')
+        result['full_rows'] = len(load_missing_ranges(phase, station=station))
+        assert stored(load_missing_ranges(phase, station=station)) == stored(full), "Plages relues différentes après l'écriture complète."
+
+        with db_connection(phase) as conn:
+            stats = {}
+            assert save_missing_ranges(recent, station, conn, phase, stats=stats, since=since), stats.get('error')
+        expected = pd.concat([full[pd.to_datetime(full['start_time']) < since], recent], ignore_index=True)
+        reloaded = load_missing_ranges(phase, station=station)
+        result['incremental_rows'] = len(reloaded)
+        assert stored(reloaded) == stored(expected), "Plages relues différentes après le remplacement incrémental."
+        result['passed'] = True
+    finally:
+        with db_connection(phase) as conn:
+            save_missing_ranges(None, station, conn, phase)
+    print(f"Plages manquantes ({phase}): {result['full_rows']} écrites puis {result['incremental_rows']} après "
+          f"remplacement depuis {since.date()} - {'OK' if result['passed'] else 'ÉCHEC'}")
+    return result
+
+
+def summarize_missing_ranges(phase: str, start=None, end=None, stations: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Résumé des lacunes par station et variable, calculé par une seule requête d'agrégation.
+
+    Returns:
+        DataFrame (station, variable, range_count, missing_values, total_gap_hours,
+                   longest_gap_hours, first_gap_start, last_gap_end)
+    """
+    _validate_missing_phase(phase)
+    conditions, params = [], []
+    if stations is not None:
+        conditions.append(sql.SQL("station = ANY(%s)"))
+        params.append([s.strip() for s in stations])
+    if end is not None:
+        conditions.append(sql.SQL("start_time <= %s"))
+        params.append(_to_naive_utc(end).to_pydatetime())
+    if start is not None:
+        conditions.append(sql.SQL("end_time >= %s"))
+        params.append(_to_naive_utc(start).to_pydatetime())
+
+    query = sql.SQL("""
+        SELECT station, variable,
+               COUNT(*) AS range_count,
+               COALESCE(SUM(count), 0) AS missing_values,
+               SUM(EXTRACT(EPOCH FROM end_time - start_time)) / 3600.0 AS total_gap_hours,
+               MAX(EXTRACT(EPOCH FROM end_time - start_time)) / 3600.0 AS longest_gap_hours,
+               MIN(start_time) AS first_gap_start,
+               MAX(end_time) AS last_gap_end
+        FROM {}
+    """).format(sql.Identifier(MISSING_RANGES_TABLE))
+    if conditions:
+        query += sql.SQL(" WHERE ") + sql.SQL(" AND ").join(conditions)
+    query += sql.SQL(" GROUP BY station, variable ORDER BY station, variable")
+
+    with db_connection(phase) as conn:
+        _ensure_missing_ranges_table(conn, phase)
+        return pd.read_sql(query.as_string(conn), conn, params=params or None)
+
+
+def _update_catalog_after_write(conn, station: str, table_name: str, processing_type: str):
+    """
+    Met à jour le catalogue après une écriture réussie sur une table de station et invalide le cache.
+    Les tables jetables (benchmarks) et les bases sans catalogue (missing_*) sont ignorées.
+    Un échec est journalisé sans faire échouer la sauvegarde.
+    """
+    if processing_type not in CATALOG_PROCESSING_TYPES or table_name != station.strip():
+        return
+    try:
+        refresh_station_catalog(conn, table_name)
+    except psycopg2.Error as e:
+        logging.warning(f"Mise à jour du catalogue impossible pour '{table_name}' ({processing_type}): {e}")
+    finally:
+        invalidate_station_catalog(processing_type)
+
+
+def save_to_database(df: pd.DataFrame, station: str, conn, processing_type: str = 'raw',
+                     method: str = 'copy', stats: Optional[Dict] = None, table_name: Optional[str] = None,
+                     refresh_catalog: bool = True, check_overlap: bool = True) -> bool:
     """
     Sauvegarde un DataFrame dans la base de données, avec vérifications complètes et journalisation détaillée.
     La connexion à la base de données est passée en argument.
+
+    Args:
+        method: 'copy' (par défaut) envoie les données par COPY ... FROM STDIN vers une table
+                temporaire puis les fusionne avec la même clause ON CONFLICT ;
+                'batch' conserve l'ancien chemin execute_batch par lots de 10 000 lignes ;
+                'merge' met aussi à jour les lignes existantes dont une valeur a changé
+                (fichier corrigé) et compte les lignes insérées, mises à jour et inchangées.
+        stats: Dictionnaire optionnel rempli avec les métriques d'insertion
+               (rows_prepared, rows_inserted, elapsed_seconds, rows_per_second, method;
+               plus rows_updated et rows_unchanged en mode 'merge'), ou avec 'error' en cas d'échec.
+        table_name: Table cible si elle diffère du nom de la station (ex: tables de benchmark).
+        refresh_catalog: Si False, le catalogue n'est pas recalculé après l'écriture; l'appelant
+                         (ingestion par blocs) le met à jour une seule fois à la fin.
+        check_overlap: Si la table existe déjà (clé 'Datetime'), analyse le recouvrement avec les
+                       données en place avant d'écrire (stats['overlap'], voir analyze_ingest_overlap).
+                       Un lot entièrement redondant n'est pas écrit (stats['skipped'] = True).
     """
+    if method not in INGEST_METHODS:
+        raise ValueError(f"Méthode d'insertion inconnue: '{method}'. Méthodes disponibles: {INGEST_METHODS}")
+
+    # Les plages manquantes vont dans la table consolidée de la phase (remplacement par station),
+    # y compris quand le DataFrame est vide afin d'effacer les plages obsolètes
+    if processing_type in MISSING_PROCESSING_TYPES and table_name is None:
+        if not conn:
+            raise ConnectionError(f"Connexion à la base de données non fournie ou nulle pour '{processing_type}'")
+        return save_missing_ranges(df, station, conn, processing_type, stats=stats)
+
     try:
         if df.empty:
             logging.warning(f"DataFrame vide reçu pour la station '{station}' ({processing_type}), aucune donnée à sauvegarder.")
             return True
 
-        table_name = station.strip()
+        table_name = (table_name or station).strip()
 
         db_key = processing_type 
 
         if not conn:
             raise ConnectionError(f"Connexion à la base de données non fournie ou nulle pour '{processing_type}'")
 
-        columns_config = get_station_columns(station, processing_type)
-        if not columns_config:
+        schema = get_station_schema(station, processing_type)
+        if schema is None:
             raise ValueError(f"Configuration des colonnes manquante pour la station '{station}' ({processing_type}). Impossible de sauvegarder.")
 
-        expected_columns = list(columns_config.keys())
+        columns_config = schema.columns
+        expected_columns = list(schema.column_order)
 
         if isinstance(df.index, pd.DatetimeIndex):
             df_processed = df.reset_index()
@@ -8357,32 +9423,15 @@ def save_to_database(df: pd.DataFrame, station: str, conn, processing_type: str
             logging.warning(f"La colonne 'Datetime' est introuvable après la conversion de l'index pour la station {station}, et 'id' n'est pas non plus présent.")
 
 
-        df_column_rename_map = {}
-        for df_col in df_processed.columns: 
-            if df_col == 'Rel_H_%':
-                df_column_rename_map[df_col] = 'Rel_H_Pct'
-            elif df_col.lower() == 'rel_h': 
-                 df_column_rename_map[df_col] = 'Rel_H_Pct'
-
-        if df_column_rename_map:
-            df_processed = df_processed.rename(columns=df_column_rename_map) 
-            logging.debug(f"Colonnes du DataFrame renommées: {df_column_rename_map}")
-
         logging.info("\n" + "="*50)
         logging.info("VÉRIFICATION DES NOMS DE COLONNES (CASSE ET CORRESPONDANCE)")
         logging.info("="*50)
-        
-        column_mapping_expected = {col.lower(): col for col in expected_columns}
-        new_df_columns = []
-        for col_df in df_processed.columns: 
-            if col_df in expected_columns: 
-                new_df_columns.append(col_df)
-            elif col_df.lower() in column_mapping_expected: 
-                new_df_columns.append(column_mapping_expected[col_df.lower()])
-            else: 
-                new_df_columns.append(col_df)
-        
-        df_processed.columns = new_df_columns 
+
+        # Alias (Rel_H_%, Rel_H) et différences de casse résolus par la table précalculée du registre
+        df_processed.columns = [
+            col_df if col_df in columns_config else schema.rename_map.get(str(col_df).lower(), col_df)
+            for col_df in df_processed.columns
+        ]
 
         df_cols_after_norm = df_processed.columns.tolist() 
         missing_in_df = set(expected_columns) - set(df_cols_after_norm)
@@ -8412,120 +9461,33 @@ def save_to_database(df: pd.DataFrame, station: str, conn, processing_type: str
         logging.info("\nOrdre final des colonnes:" + str(df_processed.columns.tolist())) 
         logging.info("="*50 + "\n")
 
+        # Determine the columns to be actually inserted into the database
+        # This is where we ensure 'id' (SERIAL PK) is not included if it's auto-generated.
+        # ('id' SERIAL des tables missing_* exclu, précalculé par le registre)
+        insert_columns = list(schema.insert_columns)
+
         logging.info("\n" + "="*50)
-        logging.info("VÉRIFICATION DES TYPES DE DONNÉES ET VALEURS ANORMALES")
+        logging.info("CONVERSION VECTORISÉE DES TYPES (FORMAT POSTGRESQL)")
         logging.info("="*50)
-        
-        nan_value_strings = ['NaN', 'NAN', 'nan', '', ' ', '#VALUE!', '-', 'NULL', 'null', 'N/A', 'NA', 'None', 'NONE', 'NV', 'N.V.', '#DIV/0!']
-        
-        for col, pg_type_str in columns_config.items():
-            if col not in df_processed.columns: 
-                logging.warning(f"\n⚠️ Colonne '{col}' non trouvée - ignorée")
-                continue
 
-            original_dtype = str(df_processed[col].dtype) 
-            pg_base_type = pg_type_str.split()[0].lower()
-            
-            logging.info(f"\nColonne: {col}")
-            logging.info(f"- Type Pandas original: {original_dtype}")
-            logging.info(f"- Type PostgreSQL attendu: {pg_base_type}")
-            
-            try:
-                df_processed[col] = df_processed[col].replace(nan_value_strings, np.nan) 
-                
-                if pg_base_type in ['timestamp', 'date']:
-                    df_processed[col] = pd.to_datetime(df_processed[col], errors='coerce') 
-                    logging.info("- Converti en datetime")
-                elif pg_base_type in ['float', 'integer', 'double precision', 'real']: 
-                    df_processed[col] = pd.to_numeric(df_processed[col], errors='coerce') 
-                    if pg_base_type == 'integer' and pd.api.types.is_float_dtype(df_processed[col]):
-                        if (df_processed[col].notna() & (df_processed[col] % 1 != 0)).any():
-                            logging.warning(f"Colonne '{col}' contient des décimales mais le type attendu est INTEGER. Les valeurs seront tronquées ou mises à NaN.")
-                        df_processed[col] = df_processed[col].astype('Int64', errors='coerce') 
-                    logging.info("- Converti en numérique")
-                elif pg_base_type == 'boolean':
-                    df_processed[col] = df_processed[col].apply(lambda x: bool(x) if pd.notna(x) else None) 
-                    logging.info("- Converti en booléen")
-                
-                null_count = df_processed[col].isna().sum() 
-                logging.info(f"- Valeurs NULL après conversion: {null_count}/{len(df_processed)} ({null_count/len(df_processed)*100:.2f}%)") 
-                
-                if null_count > 0:
-                    sample_null = df_processed[df_processed[col].isna()].head(3) 
-                    logging.info("- Exemple de lignes avec NULL:\n" + sample_null[[col]].to_string())
-                    
-            except Exception as e:
-                logging.error(f"\n❌ ERREUR DE CONVERSION pour '{col}': {str(e)}")
-                problematic_vals = df_processed[col][df_processed[col].notna() & pd.to_numeric(df_processed[col], errors='coerce').isna()]
-                if not problematic_vals.empty:
-                    logging.error("- Valeurs problématiques:" + str(problematic_vals.unique()[:5]))
-                traceback.print_exc()
+        # Étape unique: chaque colonne est convertie une seule fois au format attendu par la base
+        df_wire = _coerce_columns_for_wire(df_processed, columns_config, insert_columns)
 
         logging.info("\nRésumé des types après conversion:")
-        logging.info(str(df_processed.dtypes)) 
+        logging.info(str(df_wire.dtypes))
         logging.info("="*50 + "\n")
 
-        logging.info("\n" + "="*50)
-        logging.info("PRÉPARATION DES DONNÉES POUR INSERTION")
-        logging.info("="*50)
-        
         data_to_insert = []
-        type_converters = []
-        
-        # Determine the columns to be actually inserted into the database
-        # This is where we ensure 'id' (SERIAL PK) is not included if it's auto-generated.
-        insert_columns = []
-        if processing_type in ['missing_before', 'missing_after']:
-            # For 'missing' tables, 'id' is SERIAL, so don't include it in INSERT statement
-            insert_columns = [col for col in expected_columns if col != 'id']
-        else:
-            insert_columns = expected_columns # For 'before'/'after', all expected columns are inserted
-
-        # Create type converters only for columns that will be inserted
-        for col in insert_columns:
-            pg_type_str = columns_config.get(col, 'text')
-            pg_base_type = pg_type_str.split()[0].lower()
-
-            if pg_base_type in ['timestamp', 'timestamp with time zone']:
-                type_converters.append(lambda x: x.isoformat(timespec='microseconds') if pd.notna(x) else None)
-            elif pg_base_type == 'date':
-                type_converters.append(lambda x: x.strftime('%Y-%m-%d') if pd.notna(x) else None)
-            elif pg_base_type in ['float', 'double precision', 'real']:
-                type_converters.append(lambda x: float(x) if pd.notna(x) else None)
-            elif pg_base_type == 'integer':
-                type_converters.append(lambda x: int(x) if pd.notna(x) and pd.api.types.is_integer(x) else None)
-            elif pg_base_type == 'boolean':
-                type_converters.append(lambda x: bool(x) if pd.notna(x) else None)
-            else:
-                type_converters.append(lambda x: str(x) if pd.notna(x) else None)
-
-        for i, row_tuple in enumerate(df_processed.itertuples(index=False)):
-            try:
-                # Get values from df_processed corresponding to `insert_columns`
-                row_values_for_insert = []
-                for col_name in insert_columns:
-                    # Find the index of the column in the df_processed.columns
-                    # This is safer than assuming the order of row_tuple matches insert_columns directly
-                    col_idx_in_df_processed = df_processed.columns.get_loc(col_name)
-                    row_values_for_insert.append(row_tuple[col_idx_in_df_processed])
-
-                converted_row_values = [type_converters[j](row_values_for_insert[j]) for j in range(len(insert_columns))]
-                data_to_insert.append(tuple(converted_row_values))
-                
-                if i < 2:
-                    logging.debug(f"\nExemple ligne {i}:")
-                    for j, col in enumerate(insert_columns): # Use insert_columns here
-                        val = converted_row_values[j]
-                        logging.debug(f"- {col}: {val} ({type(val).__name__ if val is not None else 'NULL'})")
-                        
-            except Exception as e:
-                logging.error(f"\n❌ ERREUR lors de la préparation de la ligne {i}: {str(e)}")
-                logging.error("Valeurs brutes de la ligne problématique (peut différer après conversion de type):")
-                logging.error(str(df_processed.iloc[i].to_dict()))
-                traceback.print_exc()
-                continue
-
-        logging.info(f"\nTotal lignes préparées: {len(data_to_insert)}")
+        if method == 'batch':
+            # Seul le chemin execute_batch a besoin de tuples Python; ils sont produits en un seul passage
+            data_to_insert = _wire_frame_to_rows(df_wire)
+            for i, row in enumerate(data_to_insert[:2]):
+                logging.debug(f"\nExemple ligne {i}:")
+                for col, val in zip(insert_columns, row):
+                    logging.debug(f"- {col}: {val} ({type(val).__name__ if val is not None else 'NULL'})")
+
+        rows_prepared = len(df_wire)
+        logging.info(f"\nTotal lignes préparées: {rows_prepared} (méthode '{method}')")
         logging.info("="*50 + "\n")
 
         if not conn:
@@ -8545,11 +9507,11 @@ def save_to_database(df: pd.DataFrame, station: str, conn, processing_type: str
             if not table_exists:
                 # TOUJOURS créer la table pour missing_before/missing_after
                 if processing_type in ['missing_before', 'missing_after']:
-                    if not create_station_table(station, processing_type):
+                    if not create_station_table(station, processing_type, conn=conn):
                         raise Exception(f"Échec création table '{table_name}'")
                 # Pour les autres types, seulement créer si le DataFrame n'est pas vide
                 elif not df.empty:
-                    if not create_station_table(station, processing_type):
+                    if not create_station_table(station, processing_type, conn=conn):
                         raise Exception(f"Échec création table '{table_name}'")
                 else:
                     return True  # Ne pas créer de table vide pour before/after
@@ -8562,26 +9524,10 @@ def save_to_database(df: pd.DataFrame, station: str, conn, processing_type: str
                 logging.info("✅ Table créée avec succès")
 
             # ========== DÉTECTION ET CONSTRUCTION DE LA REQUÊTE SQL ==========
-            pk_col = None
-            cols_to_insert_in_query = [] 
-            
-            if processing_type in ['raw', 'before', 'after']:
-                if 'Datetime' in columns_config: 
-                    pk_col = 'Datetime'
-                    logging.info(f"✅ Clé primaire détectée pour '{processing_type}': '{pk_col}'")
-                    cols_to_insert_in_query = expected_columns # All columns, including Datetime PK
-                else:
-                    logging.warning(f"⚠️ 'Datetime' n'est pas configuré comme PK pour '{processing_type}'.")
-                    cols_to_insert_in_query = expected_columns # Fallback to all columns
-            elif processing_type in ['missing_before', 'missing_after']:
-                if 'id' in columns_config: 
-                    pk_col = 'id'
-                    # Exclude 'id' from insert columns as it's SERIAL
-                    cols_to_insert_in_query = [col for col in expected_columns if col != 'id']
-                    logging.info(f"✅ Clé primaire détectée pour '{processing_type}': '{pk_col}' (SERIAL, non incluse dans l'INSERT direct)")
-                else:
-                    logging.warning(f"⚠️ 'id' n'est pas configuré comme PK pour '{processing_type}'.")
-                    cols_to_insert_in_query = expected_columns # Fallback to all columns
+            pk_col = schema.pk_column
+            cols_to_insert_in_query = insert_columns
+            if pk_col:
+                logging.info(f"✅ Clé primaire du registre pour '{processing_type}': '{pk_col}' (schéma {schema.version})")
             
             # Fallback if PK not detected by the processing_type logic
             if not pk_col:
@@ -8641,6 +9587,72 @@ def save_to_database(df: pd.DataFrame, station: str, conn, processing_type: str
             logging.info(f"\nNombre de colonnes attendues pour l'insertion (basé sur la requête SQL): {len(cols_to_insert_in_query)}")
             logging.info(f"Nombre de valeurs dans chaque ligne de data_to_insert: {len(data_to_insert[0]) if data_to_insert else 0}")
             
+            if check_overlap and table_exists and pk_col == 'Datetime' and not df_wire.empty:
+                overlap = analyze_ingest_overlap(conn, table_name, df_wire[cols_to_insert_in_query], columns_config,
+                                                 pk_col, keep='last' if method == 'merge' else 'first')
+                logging.info(f"Recouvrement avec '{table_name}' ({overlap['start']} -> {overlap['end']}): "
+                             f"{overlap['new']} nouvelles, {overlap['identical']} identiques, "
+                             f"{overlap['conflicting']} en conflit ({overlap['elapsed_seconds']:.2f} s).")
+                if stats is not None:
+                    stats['overlap'] = overlap
+                # Aucune nouvelle clé et, hors 'merge', les conflits seraient ignorés par ON CONFLICT DO NOTHING
+                if overlap['new'] == 0 and (method != 'merge' or overlap['conflicting'] == 0):
+                    logging.info(f"Lot entièrement redondant pour '{station}': écriture ignorée.")
+                    if stats is not None:
+                        stats.update({'method': method, 'rows_prepared': rows_prepared, 'rows_inserted': 0,
+                                      'elapsed_seconds': overlap['elapsed_seconds'], 'rows_per_second': 0.0,
+                                      'skipped': True})
+                        if method == 'merge':
+                            stats.update({'rows_updated': 0, 'rows_unchanged': overlap['overlapping']})
+                    return True
+
+            if method == 'merge':
+                if df_wire.empty:
+                    logging.warning("\n⚠️ Aucune donnée à insérer!")
+                    if stats is not None:
+                        stats['error'] = "Aucune donnée à insérer"
+                    return False
+                if pk_col != 'Datetime':
+                    raise ValueError(f"Le mode 'merge' exige la clé 'Datetime' (clé détectée: {pk_col}) pour '{table_name}'.")
+
+                logging.info("="*50 + "\n")
+                merge_counts = _merge_upsert_dataframe(conn, table_name, df_wire[cols_to_insert_in_query], pk_col)
+                total_time = merge_counts['elapsed_seconds']
+                rows_per_second = rows_prepared / total_time if total_time > 0 else float(rows_prepared)
+                logging.info(f"\n✅ Fusion terminée pour '{station}': {merge_counts['inserted']} insérées, "
+                             f"{merge_counts['updated']} mises à jour, {merge_counts['unchanged']} inchangées "
+                             f"sur {rows_prepared} lignes en {total_time:.2f} secondes ({rows_per_second:,.0f} lignes/s).")
+                if stats is not None:
+                    stats.update({'method': method, 'rows_prepared': rows_prepared,
+                                  'rows_inserted': merge_counts['inserted'], 'rows_updated': merge_counts['updated'],
+                                  'rows_unchanged': merge_counts['unchanged'],
+                                  'elapsed_seconds': total_time, 'rows_per_second': rows_per_second})
+                if refresh_catalog:
+                    _update_catalog_after_write(conn, station, table_name, processing_type)
+                return True
+
+            if method == 'copy':
+                if df_wire.empty:
+                    logging.warning("\n⚠️ Aucune donnée à insérer!")
+                    if stats is not None:
+                        stats['error'] = "Aucune donnée à insérer"
+                    return False
+
+                logging.info("="*50 + "\n")
+                inserted, total_time = _copy_insert_dataframe(
+                    conn, table_name, df_wire[cols_to_insert_in_query],
+                    pk_col if pk_col == 'Datetime' else None
+                )
+                rows_per_second = rows_prepared / total_time if total_time > 0 else float(rows_prepared)
+                logging.info(f"\n✅ COPY terminé pour '{station}': {inserted}/{rows_prepared} lignes insérées "
+                             f"en {total_time:.2f} secondes ({rows_per_second:,.0f} lignes/s).")
+                if stats is not None:
+                    stats.update({'method': method, 'rows_prepared': rows_prepared, 'rows_inserted': inserted,
+                                  'elapsed_seconds': total_time, 'rows_per_second': rows_per_second})
+                if refresh_catalog:
+                    _update_catalog_after_write(conn, station, table_name, processing_type)
+                return True
+
             if data_to_insert and len(cols_to_insert_in_query) != len(data_to_insert[0]):
                 logging.error("\n❌ ERREUR: Nombre de colonnes incompatible entre la requête SQL et les données préparées!")
                 logging.error("Colonnes dans la requête SQL:" + str(cols_to_insert_in_query))
@@ -8662,6 +9674,8 @@ def save_to_database(df: pd.DataFrame, station: str, conn, processing_type: str
                     raise 
             else:
                 logging.warning("\n⚠️ Aucune donnée à insérer!")
+                if stats is not None:
+                    stats['error'] = "Aucune donnée à insérer"
                 return False
 
             logging.info("="*50 + "\n")
@@ -8690,13 +9704,22 @@ def save_to_database(df: pd.DataFrame, station: str, conn, processing_type: str
                     raise 
 
             total_time = (datetime.now() - start_time).total_seconds()
-            logging.info(f"\n✅ Traitement d'insertion terminé pour '{station}': {len(data_to_insert)} lignes préparées en {total_time:.2f} secondes.")
+            rows_per_second = len(data_to_insert) / total_time if total_time > 0 else float(len(data_to_insert))
+            logging.info(f"\n✅ Traitement d'insertion terminé pour '{station}': {len(data_to_insert)} lignes préparées en {total_time:.2f} secondes ({rows_per_second:,.0f} lignes/s).")
             logging.info("Note: Le nombre exact de lignes insérées peut différer en raison de la clause ON CONFLICT.")
+            if stats is not None:
+                # execute_batch ne permet pas de connaître le nombre de lignes réellement insérées
+                stats.update({'method': method, 'rows_prepared': len(data_to_insert), 'rows_inserted': None,
+                              'elapsed_seconds': total_time, 'rows_per_second': rows_per_second})
+            if refresh_catalog:
+                _update_catalog_after_write(conn, station, table_name, processing_type)
             return True
 
     except Exception as e:
         logging.error(f"\n❌❌❌ ERREUR CRITIQUE lors de la sauvegarde pour '{station}': {str(e)}")
         traceback.print_exc()
+        if stats is not None:
+            stats['error'] = str(e)
         
         if 'df_processed' in locals():
             logging.error("\nÉtat du DataFrame au moment de l'erreur:")
@@ -8705,69 +9728,393 @@ def save_to_database(df: pd.DataFrame, station: str, conn, processing_type: str
             
         return False
 
-def load_station_data(station_name: str, processing_type: str = 'raw') -> pd.DataFrame:
+# Ordre de persistance des sorties du pipeline (une base cible par clé)
+PIPELINE_OUTPUT_TARGETS = ('before', 'after', 'missing_before', 'missing_after')
+
+
+def _save_output_to_target(df: pd.DataFrame, station: str, processing_type: str, method: str,
+                           missing_since=None) -> Dict:
+    """Sauvegarde une sortie du pipeline sur sa propre connexion du pool et mesure la durée."""
+    result = {'success': False, 'rows': 0 if df is None else len(df), 'elapsed_seconds': 0.0,
+              'rows_inserted': None, 'error': None}
+    start = time.perf_counter()
+    try:
+        if df is None:
+            raise ValueError(f"Aucun DataFrame fourni pour '{processing_type}'.")
+        stats = {}
+        with db_connection(processing_type) as conn:
+            if processing_type in MISSING_PROCESSING_TYPES and missing_since is not None:
+                result['success'] = save_missing_ranges(df, station, conn, processing_type, stats=stats, since=missing_since)
+            else:
+                result['success'] = save_to_database(df, station, conn, processing_type, method=method, stats=stats)
+        result['rows_inserted'] = stats.get('rows_inserted')
+        if not result['success']:
+            result['error'] = stats.get('error') or "Échec de la sauvegarde (voir les journaux)."
+    except Exception as e:
+        result['error'] = str(e)
+        logging.error(f"Échec de la sauvegarde '{processing_type}' pour '{station}': {e}", exc_info=True)
+    finally:
+        result['elapsed_seconds'] = time.perf_counter() - start
+    return result
+
+
+def save_station_outputs_concurrently(station: str, outputs: Dict[str, pd.DataFrame],
+                                      method: str = 'copy', max_workers: Optional[int] = None,
+                                      missing_since=None) -> Dict:
+    """
+    Sauvegarde en parallèle les sorties du pipeline d'une station (before, after, missing_before,
+    missing_after). Chaque cible est une base différente: chaque écriture utilise sa propre
+    connexion empruntée au pool, dans un thread dédié. La durée par station devient celle de
+    l'écriture la plus longue et non plus la somme des quatre.
+
+    Args:
+        outputs: Dictionnaire {processing_type: DataFrame}.
+        method: Méthode d'insertion transmise à save_to_database.
+        max_workers: Nombre de threads (par défaut, un par cible).
+        missing_since: Pour les plages manquantes, ne remplace que celles qui commencent à partir
+                       de cette date (voir save_missing_ranges).
+    Returns:
+        Dictionnaire {'station', 'success' (toutes les cibles réussies), 'elapsed_seconds' (durée murale),
+                      'targets': {processing_type: {'success', 'rows', 'rows_inserted', 'elapsed_seconds', 'error'}}}
+    """
+    targets = [pt for pt in PIPELINE_OUTPUT_TARGETS if pt in outputs] + \
+              [pt for pt in outputs if pt not in PIPELINE_OUTPUT_TARGETS]
+    start = time.perf_counter()
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers or max(len(targets), 1),
+                            thread_name_prefix=f"save-{station.strip()}") as executor:
+        futures = {pt: executor.submit(_save_output_to_target, outputs[pt], station, pt, method, missing_since)
+                   for pt in targets}
+        for pt in targets:
+            results[pt] = futures[pt].result()
+
+    elapsed = time.perf_counter() - start
+    sequential = sum(r['elapsed_seconds'] for r in results.values())
+    logging.info(f"Sauvegarde parallèle pour '{station}': {elapsed:.2f} s "
+                 f"(somme des écritures: {sequential:.2f} s) - "
+                 + ", ".join(f"{pt}={'OK' if r['success'] else 'ÉCHEC'} ({r['elapsed_seconds']:.2f} s)"
+                             for pt, r in results.items()))
+    return {'station': station, 'success': all(r['success'] for r in results.values()),
+            'elapsed_seconds': elapsed, 'targets': results}
+
+
+def benchmark_ingest_methods(df: pd.DataFrame, station: str, processing_type: str = 'raw',
+                             methods: tuple = INGEST_METHODS) -> Dict[str, Dict]:
+    """
+    Compare les chemins d'insertion de save_to_database (COPY et execute_batch) sur un même DataFrame.
+    Chaque méthode écrit dans sa propre table jetable '<station>__bench_<méthode>', créée avec le
+    schéma de la station puis supprimée, afin que les mesures ne soient pas faussées par ON CONFLICT.
+
+    Returns:
+        Dictionnaire {méthode: {'rows_prepared', 'rows_inserted', 'elapsed_seconds', 'rows_per_second', 'success'}}
+    """
+    columns_config = get_station_columns(station, processing_type)
+    if not columns_config:
+        raise ValueError(f"Configuration des colonnes manquante pour la station '{station}' ({processing_type}).")
+
+    results = {}
+    with db_connection(processing_type) as conn:
+        conn.autocommit = True
+        for method in methods:
+            bench_table = f"{station.strip()}__bench_{method}"
+            create_query, _ = _build_create_table_query(bench_table, columns_config, processing_type)
+            with conn.cursor() as cursor:
+                cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(bench_table)))
+                cursor.execute(create_query)
+            try:
+                method_stats = {}
+                success = save_to_database(df, station, conn, processing_type,
+                                           method=method, stats=method_stats, table_name=bench_table)
+                method_stats['success'] = success
+                results[method] = method_stats
+            finally:
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(bench_table)))
+
+    for method, method_stats in results.items():
+        logging.info(f"Benchmark '{method}' pour '{station}': {method_stats.get('rows_prepared')} lignes en "
+                     f"{method_stats.get('elapsed_seconds', 0):.2f} s ({method_stats.get('rows_per_second', 0):,.0f} lignes/s)")
+    if 'copy' in results and 'batch' in results and results['batch'].get('elapsed_seconds'):
+        speedup = results['batch']['elapsed_seconds'] / max(results['copy'].get('elapsed_seconds', 0), 1e-9)
+        logging.info(f"Accélération COPY vs execute_batch: x{speedup:.1f}")
+
+    return results
+
+
+# Noms de colonnes en base -> noms utilisés par le pipeline et les visualisations
+_DB_TO_PIPELINE_COLUMNS = {'Rel_H_Pct': 'Rel_H_%'}
+_NUMERIC_PG_TYPES = ('double precision', 'integer')
+
+
+def get_station_variables(station: str, processing_type: str = 'after', numeric_only: bool = True) -> List[str]:
+    """
+    Liste les variables d'une station (noms du pipeline, ex: 'Rel_H_%') d'après le registre des
+    schémas, sans lire la table. Sert aux pages qui proposent un choix de variables.
+    """
+    schema = get_station_schema(station, processing_type)
+    if schema is None:
+        return []
+    return [
+        _DB_TO_PIPELINE_COLUMNS.get(col, col)
+        for col in schema.column_order
+        if col not in ('Datetime', 'id') and (not numeric_only or schema.pg_types[col] in _NUMERIC_PG_TYPES)
+    ]
+
+
+def _to_naive_utc(value) -> Optional[pd.Timestamp]:
+    """Convertit une borne temporelle en Timestamp UTC naïf (format de stockage des tables)."""
+    if value is None:
+        return None
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert('UTC').tz_localize(None)
+    return ts
+
+
+# Formats texte connus de la clé "Datetime" (longueur -> format strftime): tables brutes
+# ('YYYY-MM-DD HH:MM'), puis str() des horodatages naïfs ou UTC écrits par le pipeline
+_DATETIME_TEXT_FORMATS = {
+    16: '%Y-%m-%d %H:%M',
+    19: '%Y-%m-%d %H:%M:%S',
+    25: '%Y-%m-%d %H:%M:%S+00:00',
+}
+DATETIME_KEY_CAST = 'cast' # Format texte non reconnu: comparaison via "Datetime"::timestamp (sans index)
+
+
+def _datetime_key_format(cursor, table_name: str) -> Optional[str]:
+    """
+    Détermine comment comparer la clé "Datetime" d'une table à des bornes sans la convertir,
+    afin que l'index de clé primaire serve aux filtres, au tri et aux LIMIT.
+
+    Returns:
+        None si la colonne est un timestamp natif, le format strftime de ses valeurs si elle est
+        stockée en texte (ces formats trient chronologiquement), DATETIME_KEY_CAST sinon.
+    """
+    cursor.execute("""
+        SELECT data_type FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = %s AND column_name = 'Datetime'
+    """, (table_name,))
+    row = cursor.fetchone()
+    if row is None or row[0].startswith('timestamp'):
+        return None
+    cursor.execute(sql.SQL('SELECT "Datetime" FROM {} WHERE "Datetime" IS NOT NULL LIMIT 1').format(
+        sql.Identifier(table_name)))
+    sample = cursor.fetchone()
+    if sample is None:
+        return DATETIME_KEY_CAST
+    value = str(sample[0])
+    key_format = _DATETIME_TEXT_FORMATS.get(len(value))
+    if key_format is None or (key_format.endswith('+00:00') != value.endswith('+00:00')):
+        logging.warning(f"Format de 'Datetime' non reconnu pour {table_name} ({value!r}): filtres sans index.")
+        return DATETIME_KEY_CAST
+    return key_format
+
+
+def _datetime_bound_condition(operator: str, value, key_format: Optional[str]) -> tuple:
+    """Condition SQL '"Datetime" <op> %s' et son paramètre, au format de stockage de la clé."""
+    ts = _to_naive_utc(value)
+    if key_format is None:
+        return sql.SQL('"Datetime" {} %s').format(sql.SQL(operator)), ts.to_pydatetime()
+    if key_format == DATETIME_KEY_CAST:
+        return sql.SQL('"Datetime"::timestamp {} %s').format(sql.SQL(operator)), ts.to_pydatetime()
+    if '%S' not in key_format:
+        # Clés à la minute: arrondi vers l'intérieur de l'intervalle pour rester exact
+        ts = ts.ceil('min') if operator == '>=' else ts.floor('min')
+    return sql.SQL('"Datetime" {} %s').format(sql.SQL(operator)), ts.strftime(key_format)
+
+
+def _build_station_select(schema: StationSchema, table_name: str, start=None, end=None,
+                          columns: Optional[List[str]] = None, limit: Optional[int] = None,
+                          ordered: bool = False, key_format: Optional[str] = None) -> tuple:
+    """
+    Construit le SELECT d'une table de station avec projection, bornes temporelles et limite.
+    Bornes et tri portent sur "Datetime" sans conversion (index de clé primaire utilisable),
+    selon `key_format` obtenu par _datetime_key_format.
+
+    Returns:
+        tuple: (requête sql.Composed, liste des paramètres)
+    """
+    is_time_series = schema.processing_type in ['raw', 'before', 'after']
+
+    db_columns = list(schema.column_order)
+    if columns is not None:
+        requested = {schema.rename_map.get(str(col).lower()) for col in columns}
+        unknown = [col for col in columns if schema.rename_map.get(str(col).lower()) is None]
+        if unknown:
+            logging.warning(f"Colonnes inconnues ignorées pour {table_name} ({schema.processing_type}): {unknown}")
+        # Ordre de la table conservé; l'index Datetime est toujours lu
+        db_columns = [col for col in db_columns
+                      if col in requested or (is_time_series and col == 'Datetime')]
+
+    query_parts = [sql.SQL("SELECT {} FROM {}").format(
+        sql.SQL(', ').join(sql.Identifier(col) for col in db_columns),
+        sql.Identifier(table_name))]
+    params = []
+
+    if is_time_series and (start is not None or end is not None):
+        conditions = []
+        for operator, bound in (('>=', start), ('<=', end)):
+            if bound is not None:
+                condition, param = _datetime_bound_condition(operator, bound, key_format)
+                conditions.append(condition)
+                params.append(param)
+        query_parts.append(sql.SQL("WHERE ") + sql.SQL(" AND ").join(conditions))
+
+    if is_time_series and (ordered or limit is not None):
+        # Les formats texte connus trient chronologiquement: tri direct par la clé indexée
+        order_key = '"Datetime"::timestamp' if key_format == DATETIME_KEY_CAST else '"Datetime"'
+        query_parts.append(sql.SQL(f'ORDER BY {order_key}'))
+    if limit is not None:
+        query_parts.append(sql.SQL("LIMIT %s"))
+        params.append(int(limit))
+
+    return sql.SQL(' ').join(query_parts), params
+
+
+def _frame_from_station_rows(rows: list, column_names: List[str], is_time_series: bool) -> pd.DataFrame:
+    """Met un lot de lignes au même format que load_station_data (index Datetime UTC, Rel_H_%, types compacts)."""
+    from data_processing import apply_meteo_dtypes
+    df = pd.DataFrame.from_records(rows, columns=column_names)
+    if is_time_series:
+        df = df.set_index('Datetime')
+        df.index = pd.to_datetime(df.index, utc=True, errors='coerce')
+    if 'Rel_H_Pct' in df.columns and 'Rel_H_%' not in df.columns:
+        df.rename(columns={'Rel_H_Pct': 'Rel_H_%'}, inplace=True)
+    return apply_meteo_dtypes(df) if is_time_series else df
+
+
+STREAM_CHUNK_SIZE = int(os.getenv('STREAM_CHUNK_SIZE', 50000)) # lignes par bloc lues via curseur serveur
+
+
+def iter_station_data_chunks(station_name: str, processing_type: str = 'after', chunk_size: int = STREAM_CHUNK_SIZE,
+                             start=None, end=None, columns: Optional[List[str]] = None, ordered: bool = True):
+    """
+    Générateur de DataFrames successifs lus via un curseur nommé (côté serveur): seules
+    `chunk_size` lignes sont en mémoire à la fois, quelle que soit la taille de la table.
+    Chaque bloc a le même format que load_station_data (index Datetime UTC, 'Rel_H_%').
+
+    La connexion du pool reste empruntée jusqu'à épuisement ou fermeture du générateur;
+    le consommer dans une boucle for (ou appeler .close()) garantit sa restitution.
+
+    Args:
+        chunk_size: Nombre de lignes par bloc (et par aller-retour réseau).
+        start, end, columns: Mêmes filtres que load_station_data, appliqués côté SQL.
+        ordered: Trie les lignes par Datetime pour des blocs chronologiques et contigus.
+    Yields:
+        pd.DataFrame non vide par bloc.
+    """
+    if chunk_size <= 0:
+        raise ValueError(f"chunk_size doit être positif (reçu {chunk_size}).")
+
+    schema = get_station_schema(station_name, processing_type)
+    if schema is None:
+        logging.warning(f"Aucun schéma pour {station_name} ({processing_type}), rien à lire.")
+        return
+    table_name = station_name.strip()
+    is_time_series = processing_type in ['raw', 'before', 'after']
+
+    with db_connection(processing_type) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (sql.Identifier(table_name).as_string(conn),))
+            if not cursor.fetchone()[0]:
+                return
+            key_format = _datetime_key_format(cursor, table_name) if is_time_series else None
+        query, params = _build_station_select(schema, table_name, start, end, columns, ordered=ordered,
+                                              key_format=key_format)
+
+        # Les curseurs nommés n'existent que dans une transaction: pas d'autocommit ici
+        conn.autocommit = False
+        cursor_name = f"station_stream_{uuid.uuid4().hex[:12]}"
+        with conn.cursor(name=cursor_name) as cursor:
+            cursor.itersize = chunk_size
+            cursor.execute(query, params or None)
+            column_names = None
+            total_rows = 0
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                if column_names is None:
+                    column_names = [desc[0] for desc in cursor.description]
+                total_rows += len(rows)
+                yield _frame_from_station_rows(rows, column_names, is_time_series)
+        conn.rollback() # Lecture seule: fermeture de la transaction du curseur
+        logging.info(f"Lecture en flux de {station_name} ({processing_type}): {total_rows} lignes "
+                     f"en blocs de {chunk_size}.")
+
+
+def load_station_data(station_name: str, processing_type: str = 'raw', start=None, end=None,
+                      columns: Optional[List[str]] = None, limit: Optional[int] = None) -> pd.DataFrame:
     """
     Charge les données d'une station depuis la base de données PostgreSQL.
     Gère proprement le cas où la table n'existe pas encore.
+
+    Args:
+        start, end: Bornes temporelles incluses (str, datetime ou Timestamp; UTC si naïves),
+                    appliquées dans la clause WHERE sur "Datetime" (tables raw/before/after).
+        columns: Sous-ensemble de colonnes à lire (noms du pipeline ou de la base, ex: 'Rel_H_%').
+                 "Datetime" est toujours lu comme index. Les colonnes inconnues sont ignorées.
+        limit: Nombre maximal de lignes, les plus anciennes d'abord.
     """
     db_key_for_connection = processing_type
-    conn = None
     table_name = station_name.strip()
+    is_time_series = processing_type in ['raw', 'before', 'after']
 
     try:
-        conn = get_connection(db_key_for_connection)
-        if not conn:
-            raise ConnectionError(f"Impossible de se connecter à la base {db_key_for_connection}")
+        if processing_type in MISSING_PROCESSING_TYPES:
+            # Plages manquantes: table consolidée de la phase, filtrée par station (et période) en SQL
+            df = load_missing_ranges(processing_type, station=station_name, start=start, end=end)
+            if columns is not None:
+                df = df[[col for col in df.columns if col in columns]]
+            return df.head(limit) if limit is not None else df
+
+        with db_connection(db_key_for_connection) as conn:
+            # Vérifier d'abord si la table existe
+            table_exists = False
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT EXISTS (
+                        SELECT FROM information_schema.tables 
+                        WHERE table_schema = 'public' AND table_name = %s
+                    )
+                """, (table_name,))
+                table_exists = cursor.fetchone()[0]
 
-        # Vérifier d'abord si la table existe
-        table_exists = False
-        with conn.cursor() as cursor:
-            cursor.execute("""
-                SELECT EXISTS (
-                    SELECT FROM information_schema.tables 
-                    WHERE table_schema = 'public' AND table_name = %s
-                )
-            """, (table_name,))
-            table_exists = cursor.fetchone()[0]
+            schema = get_station_schema(station_name, processing_type)
 
-        if not table_exists:
-            # Pour les tables missing_*, retourner un DataFrame vide avec le bon schéma
-            if processing_type in ['missing_before', 'missing_after']:
-                columns_config = get_station_columns(station_name, processing_type)
-                if columns_config:
-                    return pd.DataFrame(columns=columns_config.keys())
-                return pd.DataFrame(columns=['id', 'station', 'variable', 'start_time', 'end_time', 'duration_hours'])
-            return pd.DataFrame()
-
-        # Si la table existe, charger les données
-        columns_config = get_station_columns(station_name, processing_type)
-        if not columns_config:
-            return pd.DataFrame()
-
-        db_columns = list(columns_config.keys())
-        column_identifiers = [sql.Identifier(col) for col in db_columns]
-
-        query = sql.SQL("SELECT {} FROM {};").format(
-            sql.SQL(', ').join(column_identifiers),
-            sql.Identifier(table_name))
-
-        # Chargement adapté au type de traitement
-        if processing_type in ['raw','before', 'after']:
-            df = pd.read_sql(query.as_string(conn), conn, index_col='Datetime')
-            df.index = pd.to_datetime(df.index, utc=True, errors='coerce')
-            
-            # Gestion spécifique des colonnes
-            if 'Rel_H_Pct' in df.columns and 'Rel_H_%' not in df.columns:
-                df.rename(columns={'Rel_H_Pct': 'Rel_H_%'}, inplace=True)
-        else:
-            df = pd.read_sql(query.as_string(conn), conn)
+            if not table_exists:
+                return pd.DataFrame()
+
+            # Si la table existe, charger les données
+            if schema is None:
+                return pd.DataFrame()
+
+            key_format = None
+            if is_time_series:
+                with conn.cursor() as cursor:
+                    key_format = _datetime_key_format(cursor, table_name)
+            query, params = _build_station_select(schema, table_name, start, end, columns, limit,
+                                                  key_format=key_format)
+            query = query.as_string(conn)
+
+            # Chargement adapté au type de traitement
+            if is_time_series:
+                df = pd.read_sql(query, conn, params=params or None, index_col='Datetime')
+                df.index = pd.to_datetime(df.index, utc=True, errors='coerce')
+            
+                # Gestion spécifique des colonnes
+                if 'Rel_H_Pct' in df.columns and 'Rel_H_%' not in df.columns:
+                    df.rename(columns={'Rel_H_Pct': 'Rel_H_%'}, inplace=True)
+
+                # Mesures en float32 et 'Station' en catégorie (config.METEO_DTYPES)
+                from data_processing import apply_meteo_dtypes
+                df = apply_meteo_dtypes(df, label=f"{station_name} ({processing_type})")
+            else:
+                df = pd.read_sql(query, conn, params=params or None)
 
-        return df
+            return df
 
     except Exception as e:
         logging.error(f"Erreur lors du chargement des données pour {station_name} ({processing_type}): {str(e)}")
         return pd.DataFrame()
-    finally:
-        if conn:
-            conn.close()
-            logging.info(f"Connexion à la DB '{db_key_for_connection}' fermée.")
\ No newline at end of file
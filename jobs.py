@@ -0,0 +1,296 @@
+import os
+import json
+import time
+import uuid
+import socket
+import logging
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import psycopg2
+from psycopg2 import sql
+
+from db import db_connection, get_connection
+
+
+# Les jobs sont enregistrés dans la base des données brutes, toujours présente
+JOBS_DB_KEY = 'raw'
+JOBS_TABLE = 'jobs'
+
+# Nombre de jobs exécutés simultanément par processus (worker gunicorn)
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+
+JOB_ACTIVE_STATUSES = ('queued', 'running')
+JOB_FINAL_STATUSES = ('succeeded', 'failed', 'interrupted')
+
+# Délai minimal entre deux écritures de l'avancement (les mises à jour intermédiaires sont regroupées)
+JOB_PROGRESS_FLUSH_SECONDS = float(os.getenv('JOB_PROGRESS_FLUSH_SECONDS', 1.0))
+
+_JOB_EXECUTOR = None
+_JOB_EXECUTOR_PID = None
+_JOB_EXECUTOR_LOCK = threading.Lock()
+_JOBS_TABLE_READY = False
+_PROGRESS_WRITER = None
+_PROGRESS_WRITER_PID = None
+
+
+def _job_owner() -> str:
+    """Identifiant du processus propriétaire d'un job: '<hôte>:<pid>'."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _get_job_executor() -> ThreadPoolExecutor:
+    """
+    Retourne le pool de threads des jobs du processus courant. Comme pour les pools de connexions,
+    un processus issu d'un fork (workers gunicorn) crée son propre pool.
+    """
+    global _JOB_EXECUTOR, _JOB_EXECUTOR_PID
+    with _JOB_EXECUTOR_LOCK:
+        if _JOB_EXECUTOR is None or _JOB_EXECUTOR_PID != os.getpid():
+            _JOB_EXECUTOR = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+            _JOB_EXECUTOR_PID = os.getpid()
+        return _JOB_EXECUTOR
+
+
+def _ensure_jobs_table(cursor):
+    """Crée la table des jobs si elle n'existe pas encore (une seule fois par processus)."""
+    global _JOBS_TABLE_READY
+    if _JOBS_TABLE_READY:
+        return
+    cursor.execute(sql.SQL("""
+        CREATE TABLE IF NOT EXISTS {table} (
+            job_id text PRIMARY KEY,
+            kind text NOT NULL,
+            status text NOT NULL,
+            items jsonb NOT NULL DEFAULT '{{}}'::jsonb,
+            result jsonb,
+            error text,
+            owner text,
+            created_at timestamptz NOT NULL DEFAULT now(),
+            started_at timestamptz,
+            finished_at timestamptz,
+            updated_at timestamptz NOT NULL DEFAULT now()
+        )
+    """).format(table=sql.Identifier(JOBS_TABLE)))
+    cursor.execute(sql.SQL("CREATE INDEX IF NOT EXISTS {} ON {} (status)").format(
+        sql.Identifier(f"{JOBS_TABLE}_status_idx"), sql.Identifier(JOBS_TABLE)))
+    _JOBS_TABLE_READY = True
+
+
+def _execute_jobs_query(query, params=None, fetch: bool = False):
+    """Exécute une requête sur la table des jobs dans sa propre transaction."""
+    with db_connection(JOBS_DB_KEY) as conn:
+        with conn.cursor() as cursor:
+            _ensure_jobs_table(cursor)
+            cursor.execute(query, params)
+            rows = cursor.fetchall() if fetch else None
+        conn.commit()
+    return rows
+
+
+class _ProgressWriter:
+    """
+    Thread d'écriture de l'avancement des jobs d'un processus, sur sa propre connexion (hors pool):
+    les threads de traitement ne font que déposer le dernier état de leur job, sans attendre la
+    base ni emprunter de connexion aux pools qu'ils utilisent déjà. Seul l'état le plus récent de
+    chaque job est écrit, au plus toutes les JOB_PROGRESS_FLUSH_SECONDS.
+    """
+
+    def __init__(self):
+        self._pending = {} # job_id -> (version, items JSON)
+        self._condition = threading.Condition()
+        self._conn = None
+        self._failures = 0
+        threading.Thread(target=self._run, name="job-progress", daemon=True).start()
+
+    def schedule(self, job_id: str, version: int, payload: str):
+        with self._condition:
+            pending = self._pending.get(job_id)
+            if pending is None or pending[0] < version:
+                self._pending[job_id] = (version, payload)
+            self._condition.notify()
+
+    def _write(self, batch: Dict[str, tuple]):
+        if self._conn is None or self._conn.closed:
+            self._conn = get_connection(JOBS_DB_KEY)
+            self._conn.autocommit = True
+        with self._conn.cursor() as cursor:
+            _ensure_jobs_table(cursor)
+            for job_id, (_, payload) in batch.items():
+                # Un job terminé garde l'état écrit avec son statut final
+                cursor.execute(sql.SQL("""
+                    UPDATE {} SET items = %s::jsonb, updated_at = now() WHERE job_id = %s AND status IN %s
+                """).format(sql.Identifier(JOBS_TABLE)), (payload, job_id, JOB_ACTIVE_STATUSES))
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                batch, self._pending = self._pending, {}
+            try:
+                self._write(batch)
+                self._failures = 0
+            except Exception as e: # le thread d'écriture ne doit jamais s'arrêter
+                self._failures += 1
+                # Les états non remplacés entre-temps sont réessayés
+                for job_id, (version, payload) in batch.items():
+                    self.schedule(job_id, version, payload)
+                if self._conn is not None:
+                    self._conn.close()
+                    self._conn = None
+                log = logging.error if self._failures >= 3 else logging.warning
+                log(f"Avancement de {len(batch)} job(s) non enregistré ({self._failures} échec(s) consécutif(s)): {e}")
+            time.sleep(min(JOB_PROGRESS_FLUSH_SECONDS * 2 ** self._failures, 30.0))
+
+
+def _get_progress_writer() -> _ProgressWriter:
+    """Retourne le thread d'écriture de l'avancement du processus courant (un par processus, comme le pool des jobs)."""
+    global _PROGRESS_WRITER, _PROGRESS_WRITER_PID
+    with _JOB_EXECUTOR_LOCK:
+        if _PROGRESS_WRITER is None or _PROGRESS_WRITER_PID != os.getpid():
+            _PROGRESS_WRITER = _ProgressWriter()
+            _PROGRESS_WRITER_PID = os.getpid()
+        return _PROGRESS_WRITER
+
+
+class JobProgress:
+    """
+    Avancement d'un job par élément (station): étape, progression (0 à 1), statut et erreur.
+    Chaque mise à jour est persistée (voir _ProgressWriter) afin que l'état survive à un redémarrage du worker.
+    """
+
+    def __init__(self, job_id: str, items: List[str]):
+        self.job_id = job_id
+        self._lock = threading.Lock()
+        self._version = 0
+        self.items = {item: {'stage': 'en attente', 'progress': 0.0, 'status': 'queued', 'error': None}
+                      for item in items}
+
+    def update(self, item: str, stage: Optional[str] = None, progress: Optional[float] = None,
+               status: Optional[str] = None, error: Optional[str] = None, **details):
+        """
+        Met à jour l'élément `item` (les champs à None sont conservés) puis confie l'état du job au
+        thread d'écriture; l'appel ne bloque jamais sur la base de données.
+        """
+        with self._lock:
+            entry = self.items.setdefault(item, {'stage': None, 'progress': 0.0, 'status': 'queued', 'error': None})
+            if stage is not None:
+                entry['stage'] = stage
+            if progress is not None:
+                entry['progress'] = round(min(max(float(progress), 0.0), 1.0), 3)
+            if status is not None:
+                entry['status'] = status
+            if error is not None:
+                entry['error'] = error
+            entry.update(details)
+            # Instantané numéroté sous le verrou: un état plus ancien ne peut pas remplacer un état plus récent
+            self._version += 1
+            version, payload = self._version, json.dumps(self.items, default=str)
+        _get_progress_writer().schedule(self.job_id, version, payload)
+
+    def snapshot(self) -> str:
+        """Retourne l'état courant des éléments, sérialisé en JSON."""
+        with self._lock:
+            return json.dumps(self.items, default=str)
+
+
+def _run_job(job_id: str, func: Callable[[JobProgress], Dict], progress: JobProgress):
+    """Exécute un job dans un thread du pool et enregistre son statut final."""
+    try:
+        _execute_jobs_query(sql.SQL("""
+            UPDATE {} SET status = 'running', started_at = now(), updated_at = now(), owner = %s WHERE job_id = %s
+        """).format(sql.Identifier(JOBS_TABLE)), (_job_owner(), job_id))
+    except psycopg2.Error as e:
+        logging.warning(f"Démarrage du job {job_id} non enregistré: {e}")
+    start = time.perf_counter()
+    status, result, error = 'succeeded', None, None
+    try:
+        result = func(progress)
+    except Exception as e:
+        status, error = 'failed', str(e)
+        logging.error(f"Échec du job {job_id}: {e}\n{traceback.format_exc()}")
+    logging.info(f"Job {job_id} terminé ({status}) en {time.perf_counter() - start:.2f} s")
+    try:
+        _execute_jobs_query(sql.SQL("""
+            UPDATE {} SET status = %s, result = %s::jsonb, error = %s, items = %s::jsonb,
+                   finished_at = now(), updated_at = now()
+            WHERE job_id = %s
+        """).format(sql.Identifier(JOBS_TABLE)),
+            (status, json.dumps(result, default=str), error, progress.snapshot(), job_id))
+    except psycopg2.Error as e:
+        logging.error(f"Statut final du job {job_id} non enregistré: {e}")
+
+
+def submit_job(kind: str, func: Callable[[JobProgress], Dict], items: List[str]) -> str:
+    """
+    Enregistre un job puis le confie au pool de threads; retourne immédiatement son identifiant.
+
+    Args:
+        kind: Type de job ('upload', 'processing', ...)
+        func: Fonction exécutée en arrière-plan; reçoit le JobProgress du job et retourne un
+              résultat sérialisable en JSON
+        items: Éléments suivis individuellement (noms de stations)
+    Returns:
+        Identifiant du job
+    """
+    job_id = uuid.uuid4().hex
+    progress = JobProgress(job_id, items)
+    _execute_jobs_query(sql.SQL("""
+        INSERT INTO {} (job_id, kind, status, items, owner) VALUES (%s, %s, 'queued', %s::jsonb, %s)
+    """).format(sql.Identifier(JOBS_TABLE)), (job_id, kind, json.dumps(progress.items), _job_owner()))
+    _get_job_executor().submit(_run_job, job_id, func, progress)
+    logging.info(f"Job {job_id} ({kind}) soumis pour {len(items)} éléments.")
+    return job_id
+
+
+def _owner_is_dead(owner: Optional[str]) -> bool:
+    """Vrai si le propriétaire est un processus de cet hôte qui n'existe plus."""
+    if not owner or ':' not in owner:
+        return False
+    host, pid = owner.rsplit(':', 1)
+    if host != socket.gethostname() or not pid.isdigit():
+        return False
+    if int(pid) == os.getpid():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        return False
+    return False
+
+
+def get_job(job_id: str) -> Optional[Dict]:
+    """
+    Retourne l'état persisté d'un job (statut, avancement par élément, résultat, erreur), ou None.
+    Un job actif dont le processus propriétaire a disparu (redémarrage du worker) est marqué 'interrupted'.
+    """
+    rows = _execute_jobs_query(sql.SQL("""
+        SELECT job_id, kind, status, items, result, error, owner, created_at, started_at, finished_at, updated_at
+        FROM {} WHERE job_id = %s
+    """).format(sql.Identifier(JOBS_TABLE)), (job_id,), fetch=True)
+    if not rows:
+        return None
+    keys = ('job_id', 'kind', 'status', 'items', 'result', 'error', 'owner',
+            'created_at', 'started_at', 'finished_at', 'updated_at')
+    job = dict(zip(keys, rows[0]))
+
+    if job['status'] in JOB_ACTIVE_STATUSES and _owner_is_dead(job['owner']):
+        job['status'] = 'interrupted'
+        job['error'] = "Le processus qui exécutait ce job s'est arrêté avant la fin."
+        _execute_jobs_query(sql.SQL("""
+            UPDATE {} SET status = %s, error = %s, finished_at = now(), updated_at = now()
+            WHERE job_id = %s AND status IN %s
+        """).format(sql.Identifier(JOBS_TABLE)), (job['status'], job['error'], job_id, JOB_ACTIVE_STATUSES))
+
+    items = job['items'] or {}
+    job['progress'] = round(sum(entry.get('progress') or 0.0 for entry in items.values()) / len(items), 3) if items else (
+        1.0 if job['status'] in JOB_FINAL_STATUSES else 0.0)
+    job['done'] = job['status'] in JOB_FINAL_STATUSES
+    for key in ('created_at', 'started_at', 'finished_at', 'updated_at'):
+        job[key] = job[key].isoformat() if job[key] else None
+    return job
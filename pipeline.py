@@ -0,0 +1,723 @@
+import os
+import json
+import time
+import queue
+import hashlib
+import logging
+import tempfile
+import multiprocessing
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+
+from config import DATA_LIMITS
+from data_processing import (apply_station_specific_preprocessing, get_station_profile, interpolation, set_station_column,
+                             find_reprocessing_anchor, _time_format_info, _missing_range_unit,
+                             INTERPOLATION_ALGORITHM_VERSION)
+from db import (save_to_database, db_connection, DB_POOL_CONFIG, _update_catalog_after_write,
+                load_station_data, save_station_outputs_concurrently, get_ingested_spans, record_ingested_file,
+                get_processing_watermark, record_processing_watermark, clear_processing_watermark,
+                count_station_rows, get_merge_ingestion_start, PROCESSING_WATERMARKS_DB_KEY)
+
+
+# Nombre de lignes lues par bloc lors de l'ingestion d'un fichier CSV.
+# La mémoire de pointe dépend de cette taille et non plus de la taille du fichier.
+INGEST_CHUNK_ROWS = 100_000
+
+# Connexions du pool laissées libres pendant une ingestion groupée (chaque thread d'ingestion garde
+# la sienne pendant tous ses fichiers): écriture de l'avancement des jobs et interrogations de /jobs/<id>
+INGEST_POOL_HEADROOM = int(os.getenv('INGEST_POOL_HEADROOM', 2))
+
+# Traitement des stations (voir process_stations): chaque station est traitée dans son propre processus,
+# l'interpolation pandas étant limitée par le GIL dans des threads.
+# 0: un processus par cœur, borné par le nombre de stations; 1 (sans délai maximal): traitement séquentiel.
+STATION_PROCESS_WORKERS = int(os.getenv('STATION_PROCESS_WORKERS', 0))
+# Durée maximale du traitement d'une station en secondes (0: pas de limite)
+STATION_PROCESS_TIMEOUT = float(os.getenv('STATION_PROCESS_TIMEOUT', 0))
+# 'spawn' par défaut: le processus parent (worker gunicorn) est multi-threadé, un fork n'y est pas sûr
+STATION_PROCESS_START_METHOD = os.getenv('STATION_PROCESS_START_METHOD', 'spawn')
+
+# Retraitement incrémental (voir process_station): historique déjà traité relu avant les nouvelles
+# données pour y trouver un point de reprise de l'interpolation
+INCREMENTAL_LOOKBACK = pd.Timedelta(days=float(os.getenv('INCREMENTAL_LOOKBACK_DAYS', 7)))
+# Croissance des données brutes depuis le dernier traitement complet au-delà de laquelle les bornes
+# des outliers (quantiles de tout l'historique) sont recalculées par un traitement complet
+INCREMENTAL_REBUILD_GROWTH = float(os.getenv('INCREMENTAL_REBUILD_GROWTH', 0.5))
+
+
+def iter_file_chunks(file_path: str, station: str, chunksize: int = INGEST_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    Lit un fichier de données brutes par blocs de lignes bornés.
+
+    Args:
+        file_path: Chemin du fichier (.csv ou .xlsx)
+        station: Nom de la station (son profil détermine les lignes d'en-tête à ignorer)
+        chunksize: Nombre maximal de lignes par bloc pour les fichiers CSV
+
+    Returns:
+        Itérateur de DataFrames bruts.
+    """
+    profile = get_station_profile(station)
+    skip_rows_count = profile.skip_rows if profile else 0
+    file_extension = file_path.lower().rsplit('.', 1)[-1]
+
+    if file_extension == 'csv':
+        with pd.read_csv(file_path, encoding_errors='replace', skiprows=skip_rows_count,
+                         chunksize=chunksize) as reader:
+            for chunk in reader:
+                yield chunk
+    elif file_extension == 'xlsx':
+        yield from iter_xlsx_chunks(file_path, skip_rows=skip_rows_count, chunksize=chunksize)
+    else:
+        raise ValueError(f"Type de fichier non supporté: '{os.path.basename(file_path)}'")
+
+
+
+def _xlsx_header(values: tuple) -> List[str]:
+    """Noms de colonnes à partir de la ligne d'en-tête, nommés et dédoublonnés comme le fait pandas."""
+    header, seen = [], {}
+    for position, value in enumerate(values):
+        name = str(value) if value is not None else f"Unnamed: {position}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        header.append(name)
+    return header
+
+
+def iter_xlsx_chunks(file_path: str, skip_rows: int = 0, chunksize: int = INGEST_CHUNK_ROWS,
+                     sheet_index: int = 0) -> Iterator[pd.DataFrame]:
+    """
+    Lit la première feuille d'un classeur .xlsx par blocs, avec le mode lecture seule d'openpyxl:
+    les lignes sont lues en flux sans construire le modèle objet complet du classeur, et la
+    mémoire reste bornée par `chunksize` lignes.
+
+    Args:
+        file_path: Chemin du fichier .xlsx
+        skip_rows: Lignes à ignorer avant la ligne d'en-tête
+        chunksize: Nombre maximal de lignes par bloc
+        sheet_index: Index de la feuille à lire (0 = première feuille, comme pd.read_excel)
+
+    Returns:
+        Itérateur de DataFrames bruts (lignes entièrement vides ignorées).
+    """
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[sheet_index].iter_rows(values_only=True)
+        for _ in range(skip_rows):
+            if next(rows, None) is None:
+                return
+        header_values = next(rows, None)
+        if header_values is None:
+            return
+        header = _xlsx_header(header_values)
+        width = len(header)
+
+        buffer = []
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            # En lecture seule, les cellules vides de fin de ligne peuvent être omises
+            if len(row) < width:
+                row = row + (None,) * (width - len(row))
+            buffer.append(row[:width])
+            if len(buffer) >= chunksize:
+                yield pd.DataFrame.from_records(buffer, columns=header)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame.from_records(buffer, columns=header)
+    finally:
+        workbook.close()
+
+
+def benchmark_xlsx_readers(n_rows: int = 200_000, chunksize: int = INGEST_CHUNK_ROWS,
+                           measure_memory: bool = True) -> Dict[str, Dict[str, float]]:
+    """
+    Compare pd.read_excel à la lecture en flux iter_xlsx_chunks sur un classeur généré
+    (colonnes d'un logger Year..Minute + 7 mesures), en durée et en pic mémoire Python.
+    Le pic mémoire est mesuré par tracemalloc lors d'un second passage, qui n'influence pas la durée.
+
+    Args:
+        n_rows: Nombre de lignes du classeur généré
+        chunksize: Taille des blocs pour iter_xlsx_chunks
+        measure_memory: Si False, seul le passage chronométré est exécuté
+    Returns:
+        Dictionnaire {'read_excel': {...}, 'streaming': {...}} avec 'seconds', 'peak_mb' et 'rows'.
+    """
+    header = ['Year', 'Month', 'Day', 'Hour', 'Minute', 'Rain_01_mm', 'Rain_02_mm', 'Air_Temp_Deg_C',
+              'Rel_H_%', 'Solar_R_W/m^2', 'Wind_Sp_m/sec', 'Wind_Dir_Deg']
+    timestamps = pd.date_range('2015-01-01', periods=n_rows, freq='5min')
+    rng = np.random.default_rng(0)
+    measures = rng.random((n_rows, len(header) - 5)) * 100
+
+    fd, workbook_path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(fd)
+    try:
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(header)
+        for ts, values in zip(timestamps, measures.tolist()):
+            sheet.append([ts.year, ts.month, ts.day, ts.hour, ts.minute] + values)
+        workbook.save(workbook_path)
+        logging.info(f"Classeur de benchmark: {n_rows} lignes, {os.path.getsize(workbook_path) / 1e6:.1f} Mo")
+
+        def read_full():
+            return len(pd.read_excel(workbook_path))
+
+        def read_streaming():
+            return sum(len(chunk) for chunk in iter_xlsx_chunks(workbook_path, chunksize=chunksize))
+
+        results = {}
+        for name, reader in (('read_excel', read_full), ('streaming', read_streaming)):
+            start = time.perf_counter()
+            rows = reader()
+            elapsed = time.perf_counter() - start
+            peak_mb = None
+            if measure_memory:
+                tracemalloc.start()
+                reader()
+                peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+                tracemalloc.stop()
+            results[name] = {'seconds': elapsed, 'peak_mb': peak_mb, 'rows': rows}
+            print(f"{name:<11} {elapsed:8.2f} s  pic mémoire "
+                  f"{'n/a' if peak_mb is None else f'{peak_mb:.1f} Mo'}  ({rows} lignes)")
+        return results
+    finally:
+        os.unlink(workbook_path)
+
+
+def file_sha256(file_path: str, block_size: int = 1 << 20) -> str:
+    """Empreinte SHA-256 du contenu d'un fichier, lu par blocs de `block_size` octets."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _naive_utc_datetimes(values: pd.Series) -> np.ndarray:
+    """Horodatages en datetime64[ns] naïfs (UTC si la série est localisée), comparables au registre."""
+    values = pd.to_datetime(values, errors='coerce')
+    if getattr(values.dt, 'tz', None) is not None:
+        values = values.dt.tz_convert('UTC').dt.tz_localize(None)
+    return values.to_numpy(dtype='datetime64[ns]')
+
+
+def _covered_rows_mask(datetimes: np.ndarray, spans: List[tuple]) -> np.ndarray:
+    """Masque des horodatages compris dans l'un des intervalles disjoints triés `spans` (bornes incluses)."""
+    if not spans or len(datetimes) == 0:
+        return np.zeros(len(datetimes), dtype=bool)
+    starts = np.array([start for start, _ in spans], dtype='datetime64[ns]')
+    ends = np.array([end for _, end in spans], dtype='datetime64[ns]')
+    position = np.searchsorted(starts, datetimes, side='right') - 1
+    inside = position >= 0
+    inside[inside] = datetimes[inside] <= ends[position[inside]]
+    return inside
+
+
+def ingest_station_file(file_path: str, station: str, conn, processing_type: str = 'raw',
+                        method: str = 'copy', chunksize: int = INGEST_CHUNK_ROWS,
+                        on_chunk: Optional[Callable[[Dict], None]] = None, file_hash: Optional[str] = None,
+                        filename: Optional[str] = None) -> Dict:
+    """
+    Ingestion en flux d'un fichier de station: chaque bloc est prétraité selon le profil de la
+    station puis écrit en base avant la lecture du bloc suivant. Le catalogue des stations est
+    recalculé une seule fois, après le dernier bloc.
+
+    Args:
+        file_path: Chemin du fichier temporaire uploadé
+        station: Nom de la station
+        conn: Connexion psycopg2 vers la base cible
+        processing_type: Clé de la base cible ('raw' par défaut)
+        method: Méthode d'insertion transmise à save_to_database ('copy', 'batch' ou 'merge')
+        chunksize: Nombre de lignes par bloc
+        on_chunk: Fonction optionnelle appelée avec une copie du récapitulatif après chaque bloc écrit
+        file_hash: Empreinte SHA-256 du fichier (file_sha256). Si fournie, le fichier est inscrit au
+                   registre des fichiers ingérés après succès et, hors mode 'merge', les lignes déjà
+                   couvertes par l'étendue d'un fichier précédent de la station ne sont pas réécrites
+                   (seule la partie non couverte, typiquement la fin d'un relevé cumulatif, est écrite).
+        filename: Nom d'origine du fichier, conservé dans le registre
+
+    Returns:
+        Dictionnaire récapitulatif: success, chunks, rows_read, rows_saved, rows_inserted,
+        rows_updated, rows_unchanged, rows_overlapping (lignes déjà en base), rows_conflicting
+        (lignes déjà en base avec des valeurs différentes), chunks_skipped (blocs entièrement
+        redondants, non écrits), rows_covered (lignes écartées car couvertes par un fichier déjà
+        ingéré), span_start, span_end (étendue temporelle du fichier), elapsed_seconds.
+    """
+    summary = {'success': True, 'chunks': 0, 'rows_read': 0, 'rows_saved': 0, 'rows_inserted': 0,
+               'rows_updated': 0, 'rows_unchanged': 0, 'rows_overlapping': 0, 'rows_conflicting': 0,
+               'chunks_skipped': 0, 'rows_covered': 0, 'span_start': None, 'span_end': None,
+               'elapsed_seconds': 0.0}
+    start_time = time.perf_counter()
+    # Les corrections ('merge') portent justement sur des périodes déjà ingérées
+    covered_spans = get_ingested_spans(conn, station) if file_hash and method != 'merge' else []
+
+    try:
+        for raw_chunk in iter_file_chunks(file_path, station, chunksize):
+            summary['chunks'] += 1
+            summary['rows_read'] += len(raw_chunk)
+            if raw_chunk.empty:
+                continue
+
+            chunk = apply_station_specific_preprocessing(raw_chunk, station)
+            del raw_chunk
+            if chunk.empty:
+                continue
+
+            if file_hash and 'Datetime' in chunk.columns:
+                datetimes = _naive_utc_datetimes(chunk['Datetime'])
+                valid = datetimes[~np.isnat(datetimes)]
+                if len(valid):
+                    chunk_start = pd.Timestamp(valid.min()).to_pydatetime()
+                    chunk_end = pd.Timestamp(valid.max()).to_pydatetime()
+                    if summary['span_start'] is None or chunk_start < summary['span_start']:
+                        summary['span_start'] = chunk_start
+                    if summary['span_end'] is None or chunk_end > summary['span_end']:
+                        summary['span_end'] = chunk_end
+                covered = _covered_rows_mask(datetimes, covered_spans)
+                if covered.any():
+                    summary['rows_covered'] += int(covered.sum())
+                    chunk = chunk[~covered]
+                    if chunk.empty:
+                        summary['chunks_skipped'] += 1
+                        continue
+
+            chunk_stats = {}
+            if not save_to_database(chunk, station, conn, processing_type, method=method,
+                                    stats=chunk_stats, refresh_catalog=False):
+                summary['success'] = False
+                logging.warning(f"Échec de sauvegarde du bloc {summary['chunks']} pour '{station}'.")
+                break
+
+            summary['rows_saved'] += chunk_stats.get('rows_prepared', len(chunk))
+            for key in ('rows_inserted', 'rows_updated', 'rows_unchanged'):
+                summary[key] += chunk_stats.get(key, 0) or 0
+            overlap = chunk_stats.get('overlap')
+            if overlap:
+                summary['rows_overlapping'] += overlap['overlapping']
+                summary['rows_conflicting'] += overlap['conflicting']
+            summary['chunks_skipped'] += int(chunk_stats.get('skipped', False))
+            logging.info(f"Bloc {summary['chunks']} de '{station}' écrit: {len(chunk)} lignes "
+                         f"({summary['rows_saved']} au total).")
+            if on_chunk is not None:
+                on_chunk(dict(summary))
+    finally:
+        if summary['rows_saved']:
+            _update_catalog_after_write(conn, station, station.strip(), processing_type)
+        summary['elapsed_seconds'] = time.perf_counter() - start_time
+
+    if file_hash and summary['success'] and summary['rows_read']:
+        record_ingested_file(conn, station, file_hash, filename, summary['span_start'], summary['span_end'],
+                             summary['rows_read'], summary['rows_saved'], summary['rows_inserted'], method)
+    return summary
+
+
+def _ingest_station_files(station: str, files: List[Tuple[str, str]], processing_type: str,
+                          method: str, chunksize: int, progress: Optional[Callable] = None,
+                          file_hashes: Optional[Dict[str, str]] = None) -> List[Dict]:
+    """
+    Ingère successivement les fichiers d'une même station sur une connexion empruntée au pool.
+    Les fichiers d'une station restent séquentiels pour ne pas écrire en concurrence sur la même table.
+    `progress` (ex: JobProgress.update) reçoit l'étape, la progression et les erreurs de la station.
+    `file_hashes` associe un chemin de fichier à son empreinte (registre des fichiers ingérés).
+
+    Returns:
+        Liste de résultats par fichier (voir ingest_uploaded_files).
+    """
+    results = []
+    for file_path, filename in files:
+        results.append({'station': station, 'filename': filename, 'success': False, 'chunks': 0,
+                        'rows_read': 0, 'rows_saved': 0, 'rows_inserted': 0, 'rows_updated': 0,
+                        'rows_unchanged': 0, 'rows_overlapping': 0, 'rows_conflicting': 0,
+                        'chunks_skipped': 0, 'rows_covered': 0, 'span_start': None, 'span_end': None,
+                        'elapsed_seconds': 0.0, 'error': None})
+    report = progress or (lambda *args, **kwargs: None)
+    try:
+        with db_connection(processing_type) as conn:
+            for position, ((file_path, filename), result) in enumerate(zip(files, results)):
+                start = time.perf_counter()
+                report(station, stage='ingestion', progress=position / len(files), status='running', filename=filename)
+                try:
+                    result.update(ingest_station_file(
+                        file_path, station, conn, processing_type, method=method, chunksize=chunksize,
+                        on_chunk=lambda summary: report(station, rows_read=summary['rows_read'],
+                                                        rows_saved=summary['rows_saved']),
+                        file_hash=(file_hashes or {}).get(file_path), filename=filename))
+                except Exception as e:
+                    result['error'] = str(e)
+                    logging.error(f"Échec de l'ingestion de '{filename}' pour '{station}': {e}", exc_info=True)
+                    # Transaction éventuellement avortée: la connexion est remise dans un état propre
+                    conn.rollback()
+                finally:
+                    result['elapsed_seconds'] = time.perf_counter() - start
+    except Exception as e:
+        logging.error(f"Connexion impossible pour l'ingestion de '{station}': {e}", exc_info=True)
+        for result in results:
+            if result['error'] is None and not result['success']:
+                result['error'] = str(e)
+
+    errors = [f"{r['filename']}: {r['error']}" for r in results if r['error']]
+    failed = bool(errors) or not all(r['success'] for r in results)
+    report(station, stage='terminé', progress=1.0, status='failed' if failed else 'succeeded',
+           error='; '.join(errors) or None, rows_read=sum(r['rows_read'] for r in results),
+           rows_saved=sum(r['rows_saved'] for r in results))
+    return results
+
+
+def ingest_uploaded_files(files: List[Tuple[str, str, str]], processing_type: str = 'raw',
+                          method: str = 'copy', max_workers: Optional[int] = None,
+                          chunksize: int = INGEST_CHUNK_ROWS, progress: Optional[Callable] = None,
+                          file_hashes: Optional[Dict[str, str]] = None) -> Dict:
+    """
+    Ingère en parallèle les fichiers d'un upload groupé. Chaque station est traitée dans son
+    propre thread avec sa propre connexion du pool; les fichiers d'une même station sont
+    traités l'un après l'autre.
+
+    Args:
+        files: Liste de tuples (chemin du fichier temporaire, nom de fichier d'origine, station)
+        processing_type: Clé de la base cible
+        method: Méthode d'insertion transmise à save_to_database
+        max_workers: Nombre de threads (par défaut: un par station). Toujours borné à la taille du pool
+                     moins INGEST_POOL_HEADROOM: chaque thread garde une connexion pendant tous ses fichiers
+        chunksize: Nombre de lignes par bloc de lecture
+        progress: Fonction optionnelle (ex: JobProgress.update) recevant l'avancement par station
+        file_hashes: Empreintes SHA-256 par chemin de fichier; les fichiers concernés sont inscrits au
+                     registre des fichiers ingérés (voir ingest_station_file)
+
+    Returns:
+        Dictionnaire {'success' (tous les fichiers réussis), 'elapsed_seconds' (durée murale),
+                      'files': [{'station', 'filename', 'success', 'chunks', 'rows_read', 'rows_saved',
+                                 'rows_inserted', 'rows_updated', 'rows_unchanged', 'rows_overlapping',
+                                 'rows_conflicting', 'chunks_skipped', 'rows_covered', 'span_start',
+                                 'span_end', 'elapsed_seconds', 'error'}, ...] dans l'ordre de la liste d'entrée}
+    """
+    files_by_station = {}
+    for position, (file_path, filename, station) in enumerate(files):
+        files_by_station.setdefault(station, []).append((position, file_path, filename))
+
+    start = time.perf_counter()
+    ordered_results = [None] * len(files)
+    pool_limit = max(1, DB_POOL_CONFIG['maxconn'] - INGEST_POOL_HEADROOM)
+    workers = max(1, min(max_workers or len(files_by_station), len(files_by_station), pool_limit))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest") as executor:
+        futures = {
+            station: executor.submit(_ingest_station_files, station,
+                                     [(file_path, filename) for _, file_path, filename in entries],
+                                     processing_type, method, chunksize, progress, file_hashes)
+            for station, entries in files_by_station.items()
+        }
+        for station, entries in files_by_station.items():
+            for (position, _, _), result in zip(entries, futures[station].result()):
+                ordered_results[position] = result
+
+    elapsed = time.perf_counter() - start
+    sequential = sum(r['elapsed_seconds'] for r in ordered_results)
+    logging.info(f"Ingestion parallèle de {len(files)} fichiers ({len(files_by_station)} stations): "
+                 f"{elapsed:.2f} s (somme des fichiers: {sequential:.2f} s)")
+    return {'success': all(r['success'] for r in ordered_results), 'elapsed_seconds': elapsed,
+            'files': ordered_results}
+
+
+def _processing_params_hash(station: str, df_gps: pd.DataFrame) -> str:
+    """Empreinte de ce dont dépendent les résultats d'une station: limites, version des algorithmes, coordonnées."""
+    coordinates = df_gps.loc[df_gps['Station'] == station, ['Lat', 'Long', 'Timezone']].head(1).to_dict('records')
+    payload = {'version': INTERPOLATION_ALGORITHM_VERSION, 'limits': DATA_LIMITS, 'coordinates': coordinates}
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _processing_params_to_json(params: Dict) -> Dict:
+    """Paramètres figés de interpolation() au format JSON (bornes NaN -> null)."""
+    return {
+        'rain_mm_created': bool(params.get('rain_mm_created')),
+        'outlier_bounds': {col: [None if pd.isna(bound) else float(bound) for bound in bounds]
+                           for col, bounds in params.get('outlier_bounds', {}).items()},
+    }
+
+
+def _processing_params_from_json(params: Dict) -> Dict:
+    return {
+        'rain_mm_created': bool(params.get('rain_mm_created')),
+        'outlier_bounds': {col: tuple(np.nan if bound is None else float(bound) for bound in bounds)
+                           for col, bounds in (params.get('outlier_bounds') or {}).items()},
+    }
+
+
+def _plan_incremental_run(station: str, params_hash: str) -> Tuple[Optional[Dict], str]:
+    """
+    Décide si une station peut être retraitée de façon incrémentale à partir de son repère.
+
+    Returns:
+        Tuple (repère enrichi de 'raw_rows_total', ou None pour un traitement complet; raison)
+    """
+    with db_connection(PROCESSING_WATERMARKS_DB_KEY) as conn:
+        watermark = get_processing_watermark(conn, station)
+    if watermark is None:
+        return None, "aucun traitement précédent"
+    if watermark['params_hash'] != params_hash:
+        return None, "limites, algorithmes ou coordonnées modifiés"
+
+    with db_connection('raw') as conn:
+        rows_until = count_station_rows(conn, station, end=watermark['processed_until'])
+        rows_total = count_station_rows(conn, station)
+        merge_start = get_merge_ingestion_start(conn, station, watermark['processed_at'])
+    if rows_until != watermark['raw_rows']:
+        return None, (f"données brutes antérieures au repère ajoutées ou supprimées "
+                      f"({watermark['raw_rows']} -> {rows_until} lignes)")
+    if merge_start is not None and merge_start <= watermark['processed_until']:
+        return None, f"mesures antérieures au repère mises à jour depuis le {merge_start}"
+    if rows_total > (1 + INCREMENTAL_REBUILD_GROWTH) * watermark['rows_at_full_rebuild']:
+        return None, "historique fortement accru depuis le dernier traitement complet (bornes des outliers recalculées)"
+    watermark['raw_rows_total'] = rows_total
+    return watermark, "nouvelles données uniquement"
+
+
+def _prepare_raw_for_interpolation(df_raw: pd.DataFrame, station: str) -> pd.DataFrame:
+    if 'Station' not in df_raw.columns:
+        set_station_column(df_raw, station)
+    # Datetime doit être l'index pour la fonction d'interpolation
+    if not isinstance(df_raw.index, pd.DatetimeIndex):
+        if 'Datetime' not in df_raw.columns:
+            raise ValueError(f"Colonne 'Datetime' manquante pour la station {station}")
+        df_raw = df_raw.set_index('Datetime')
+    return df_raw
+
+
+def process_station(station: str, df_gps: pd.DataFrame, progress: Optional[Callable] = None,
+                    incremental: bool = True) -> Dict:
+    """
+    Pipeline complet d'une station: chargement des données brutes, interpolation, puis écriture
+    parallèle des quatre sorties (before, after, missing_before, missing_after).
+
+    Un repère de traitement (watermark) est enregistré après chaque traitement réussi. Si seules
+    des données postérieures au repère ont été ajoutées depuis et que les paramètres n'ont pas
+    changé, seule une fenêtre est retraitée: INCREMENTAL_LOOKBACK d'historique plus les nouvelles
+    données, avec les paramètres figés du traitement complet (bornes des outliers, Rain_mm). Les
+    résultats à partir du point de reprise (find_reprocessing_anchor) sont fusionnés dans les tables
+    before/after, et les plages manquantes remplacées à partir de ce point. Sinon (premier
+    traitement, limites ou algorithmes modifiés, données antérieures modifiées, pas de point de
+    reprise dans la fenêtre), tout l'historique est retraité.
+
+    Args:
+        station: Nom de la station
+        df_gps: Coordonnées GPS des stations (requises par l'interpolation)
+        progress: Fonction optionnelle (ex: JobProgress.update) recevant l'étape et la progression
+        incremental: Si False, retraite toujours tout l'historique
+
+    Returns:
+        Dictionnaire {'station', 'status' ('success', 'partial', 'failed' ou 'empty'), 'message',
+                      'mode' ('full', 'incremental' ou 'up_to_date'), 'mode_reason',
+                      'elapsed_seconds', 'targets' (résultat par base cible)}
+    """
+    report = progress or (lambda *args, **kwargs: None)
+    result = {'station': station, 'status': 'failed', 'message': None, 'mode': 'full', 'mode_reason': None,
+              'elapsed_seconds': 0.0, 'targets': {}}
+    start = time.perf_counter()
+    try:
+        report(station, stage='chargement', progress=0.05, status='running')
+        params_hash = _processing_params_hash(station, df_gps)
+        watermark, result['mode_reason'] = _plan_incremental_run(station, params_hash) if incremental else (
+            None, "retraitement complet demandé")
+
+        if watermark is not None and watermark['raw_rows_total'] == watermark['raw_rows']:
+            result.update(status='success', mode='up_to_date', message="Aucune nouvelle donnée depuis le dernier traitement.")
+            return result
+
+        anchor = None
+        if watermark is not None:
+            processing_params = _processing_params_from_json(watermark['processing_params'])
+            processed_until = pd.Timestamp(watermark['processed_until']).tz_localize('UTC')
+            df_raw = _prepare_raw_for_interpolation(
+                load_station_data(station, processing_type='raw', start=processed_until - INCREMENTAL_LOOKBACK), station)
+            new_data = df_raw.index[df_raw.index > processed_until]
+            if len(new_data):
+                report(station, stage='interpolation', progress=0.2, rows_read=len(df_raw))
+                outputs = interpolation(df_raw, DATA_LIMITS, df_gps, processing_params=processing_params)
+                anchor = find_reprocessing_anchor(outputs[0], new_data.min(), _time_format_info(df_raw))
+            if anchor is None:
+                result['mode_reason'] = "aucun point de reprise dans la fenêtre relue"
+                logging.info(f"Station {station}: retraitement complet ({result['mode_reason']}).")
+
+        if anchor is None:
+            processing_params = {}
+            df_raw = load_station_data(station, processing_type='raw')
+            if df_raw.empty:
+                result.update(status='empty', message="Aucune donnée brute trouvée pour la station.")
+                return result
+            df_raw = _prepare_raw_for_interpolation(df_raw, station)
+            report(station, stage='interpolation', progress=0.2, rows_read=len(df_raw))
+            outputs = interpolation(df_raw, DATA_LIMITS, df_gps, processing_params=processing_params)
+
+        processed_until = df_raw.index.max()
+        time_format_info = _time_format_info(df_raw)
+        del df_raw
+        df_before, df_after, missing_before, missing_after = outputs
+        del outputs
+        if df_after.empty:
+            result.update(status='empty', message="Le pipeline d'interpolation n'a retourné aucune donnée.")
+            return result
+
+        missing_since = None
+        if anchor is not None:
+            # Seuls les résultats à partir du point de reprise sont réécrits
+            missing_since = anchor.floor(_missing_range_unit(time_format_info)[1])
+            df_before, df_after = df_before[df_before.index >= anchor], df_after[df_after.index >= anchor]
+            missing_before = missing_before[missing_before['start_time'] >= missing_since]
+            missing_after = missing_after[missing_after['start_time'] >= missing_since]
+            result.update(mode='incremental', mode_reason=f"reprise au {anchor}")
+        logging.info(f"Station {station}: traitement {result['mode']} ({result['mode_reason']}), "
+                     f"{len(df_after)} lignes à écrire.")
+
+        report(station, stage='sauvegarde', progress=0.7)
+        # Les quatre bases cibles sont écrites en parallèle, chacune sur sa connexion du pool. Un
+        # retraitement (repère existant) met à jour les lignes déjà écrites au lieu de les conserver.
+        save_result = save_station_outputs_concurrently(station, {
+            'before': df_before,
+            'after': df_after,
+            'missing_before': missing_before,
+            'missing_after': missing_after,
+        }, method='merge' if watermark is not None else 'copy', missing_since=missing_since)
+        result['targets'] = save_result['targets']
+        logging.info(f"Sauvegarde de {station} terminée en {save_result['elapsed_seconds']:.2f} s: "
+                     + ", ".join(f"{target}={'OK' if res['success'] else 'ÉCHEC'}"
+                                 for target, res in save_result['targets'].items()))
+
+        with db_connection(PROCESSING_WATERMARKS_DB_KEY) as conn:
+            if save_result['success']:
+                with db_connection('raw') as raw_conn:
+                    raw_rows = count_station_rows(raw_conn, station, end=processed_until)
+                record_processing_watermark(
+                    conn, station, params_hash, processed_until, raw_rows,
+                    watermark['rows_at_full_rebuild'] if anchor is not None else raw_rows,
+                    _processing_params_to_json(processing_params), result['mode'])
+            else:
+                # Écriture partielle: le prochain traitement reprendra tout l'historique
+                clear_processing_watermark(conn, station)
+
+        if save_result['success']:
+            result.update(status='success', message="Traitement et sauvegarde réussis.")
+        elif save_result['targets']['after']['success']:
+            failed = [f"{target} ({res['error']})" for target, res in save_result['targets'].items() if not res['success']]
+            result.update(status='partial', message=f"Données principales sauvegardées; échec pour: {', '.join(failed)}.")
+        else:
+            result.update(status='failed', message=save_result['targets']['after']['error'] or "Échec de la sauvegarde.")
+    except Exception as e:
+        logging.error(f"Erreur lors du traitement de la station {station}: {e}", exc_info=True)
+        result.update(status='failed', message=str(e))
+    finally:
+        result['elapsed_seconds'] = time.perf_counter() - start
+        report(station, stage='terminé', progress=1.0,
+               status='failed' if result['status'] == 'failed' else 'succeeded',
+               error=result['message'] if result['status'] == 'failed' else None,
+               outcome=result['status'], message=result['message'], mode=result['mode'])
+    return result
+
+
+def _process_station_in_child(station: str, df_gps: pd.DataFrame, messages):
+    """Point d'entrée du processus d'une station: l'avancement et le résultat transitent par `messages`."""
+    def report(item, **fields):
+        messages.put(('progress', item, fields))
+
+    messages.put(('result', station, process_station(station, df_gps, progress=report)))
+
+
+def _failed_station_result(station: str, message: str, elapsed: float) -> Dict:
+    """Résultat d'une station dont le processus a dépassé le délai ou s'est arrêté sans répondre."""
+    return {'station': station, 'status': 'failed', 'message': message, 'elapsed_seconds': elapsed, 'targets': {}}
+
+
+def process_stations(stations: List[str], df_gps: pd.DataFrame, progress: Optional[Callable] = None,
+                     max_workers: Optional[int] = None, timeout: Optional[float] = None) -> List[Dict]:
+    """
+    Traite plusieurs stations (voir process_station) en parallèle, chacune dans son propre processus
+    (au plus `max_workers` à la fois). Une station qui dépasse `timeout` secondes est arrêtée et
+    marquée en échec sans interrompre les autres. Chaque processus ouvre ses propres connexions:
+    prévoir jusqu'à max_workers * (4 + 1) connexions simultanées.
+
+    Args:
+        stations: Noms des stations
+        df_gps: Coordonnées GPS des stations (requises par l'interpolation)
+        progress: Fonction optionnelle (ex: JobProgress.update), appelée dans le processus courant
+        max_workers: Nombre de processus (par défaut STATION_PROCESS_WORKERS)
+        timeout: Durée maximale par station en secondes, comptée à partir de son démarrage
+                 (par défaut STATION_PROCESS_TIMEOUT; 0 ou None: pas de limite)
+
+    Returns:
+        Résultats de process_station, dans l'ordre de `stations`
+    """
+    report = progress or (lambda *args, **kwargs: None)
+    workers = STATION_PROCESS_WORKERS if max_workers is None else max_workers
+    workers = max(1, min(workers or os.cpu_count() or 1, len(stations)))
+    timeout = (STATION_PROCESS_TIMEOUT if timeout is None else timeout) or None
+    if not stations:
+        return []
+    if workers == 1 and timeout is None:
+        return [process_station(station, df_gps, progress=progress) for station in stations]
+
+    start = time.perf_counter()
+    context = multiprocessing.get_context(STATION_PROCESS_START_METHOD)
+    results = {}
+    waiting = list(stations)
+    running = {} # station -> (processus, instant de démarrage)
+    # File gérée par un processus serveur: un processus arrêté en cours d'écriture ne la corrompt pas
+    with context.Manager() as manager:
+        messages = manager.Queue()
+
+        def drain_messages(block_seconds: float = 0.0):
+            while True:
+                try:
+                    kind, station, payload = messages.get(timeout=block_seconds) if block_seconds else messages.get_nowait()
+                except queue.Empty:
+                    return
+                block_seconds = 0.0
+                if kind == 'progress':
+                    report(station, **payload)
+                else:
+                    results[station] = payload
+
+        try:
+            while waiting or running:
+                while waiting and len(running) < workers:
+                    station = waiting.pop(0)
+                    process = context.Process(target=_process_station_in_child, args=(station, df_gps, messages),
+                                              name=f"station-{station.strip()}", daemon=True)
+                    process.start()
+                    running[station] = (process, time.perf_counter())
+
+                drain_messages(block_seconds=0.5)
+                for station, (process, started) in list(running.items()):
+                    elapsed = time.perf_counter() - started
+                    if not process.is_alive():
+                        process.join()
+                        drain_messages()
+                        if station not in results:
+                            message = f"Le processus de traitement s'est arrêté sans résultat (code {process.exitcode})."
+                            logging.error(f"Station {station}: {message}")
+                            results[station] = _failed_station_result(station, message, elapsed)
+                            report(station, stage='terminé', progress=1.0, status='failed', error=message, outcome='failed')
+                        del running[station]
+                    elif timeout is not None and elapsed > timeout and station not in results:
+                        process.terminate()
+                        process.join()
+                        message = f"Traitement interrompu après {timeout:.0f} s (délai maximal par station)."
+                        logging.error(f"Station {station}: {message}")
+                        results[station] = _failed_station_result(station, message, elapsed)
+                        report(station, stage='terminé', progress=1.0, status='failed', error=message,
+                               outcome='failed', message=message)
+                        del running[station]
+        finally:
+            for process, _ in running.values():
+                process.terminate()
+                process.join()
+
+    elapsed = time.perf_counter() - start
+    sequential = sum(r['elapsed_seconds'] for r in results.values())
+    logging.info(f"Traitement parallèle de {len(stations)} stations ({workers} processus): "
+                 f"{elapsed:.2f} s (somme des stations: {sequential:.2f} s)")
+    return [results[station] for station in stations]